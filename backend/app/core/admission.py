@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import time
+
+from app.core.config import ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT
+
+# Bounded concurrency in front of the API. A request either takes one of
+# `max_inflight` slots right away, waits in a bounded FIFO for up to
+# `queue_timeout`, or is turned away so the caller can answer cheaply
+# (app.main). A released slot passes straight to the oldest waiter.
+# All state is touched from the event loop only, so there are no locks.
+
+class AdmissionController:
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout: float):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._waits: Deque[float] = deque(maxlen=1024)
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.max_inflight or bool(self._waiters)
+
+    async def acquire(self, wait: bool = True) -> Optional[float]:
+        # Seconds spent queued, or None when not admitted.
+        if not self.saturated():
+            self.in_flight += 1
+            self._admit(0.0)
+            return 0.0
+        if not wait or len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return None
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not fut.done():
+                self._waiters.remove(fut)
+                fut.cancel()
+                self.timed_out += 1
+                return None
+            # granted as the timer fired: the slot is ours
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(fut)
+                fut.cancel()
+            raise
+        waited = time.perf_counter() - started
+        self._admit(waited)
+        return waited
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self._waits.append(waited)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        pct = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000.0, 2) if waits else None
+        return {
+            "max_inflight": self.max_inflight,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_ms": {"p50": pct(0.5), "p99": pct(0.99), "max": pct(1.0)},
+        }
+
+ADMISSION = AdmissionController(ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Optional
+import hashlib
+import hmac
+import time
+
+from app.core.config import AUTH_SECRET, AUTH_TOKEN_TTL
+
+# Bearer tokens "<user_id>.<expires>.<signature>", signed with AUTH_SECRET by
+# whatever logs users in (or scripts/issue_user_token.py). The signature is
+# HMAC-SHA256 over "<user_id>.<expires>", hex encoded.
+
+def auth_enabled() -> bool:
+    return bool(AUTH_SECRET)
+
+def _signature(user_id: str, expires: int) -> str:
+    return hmac.new(AUTH_SECRET.encode("utf-8"), f"{user_id}.{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+def issue_token(user_id: str, ttl_seconds: int = AUTH_TOKEN_TTL) -> str:
+    expires = int(time.time()) + ttl_seconds
+    return f"{user_id}.{expires}.{_signature(user_id, expires)}"
+
+def token_user(token: str, now: Optional[float] = None) -> Optional[str]:
+    # The user a valid, unexpired token was issued for; None otherwise.
+    if not AUTH_SECRET:
+        return None
+    parts = token.rsplit(".", 2)
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    user_id, expires, signature = parts[0], int(parts[1]), parts[2]
+    if not user_id or expires < (time.time() if now is None else now):
+        return None
+    if not hmac.compare_digest(signature, _signature(user_id, expires)):
+        return None
+    return user_id
+
+def bearer_user(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token_user(token.strip())
@@ -1,40 +1,161 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Any, Dict, Optional
-
-CACHE: Dict[str, Dict[str, Any]] = {}
-
-def cache_get_fresh(key: str) -> Optional[Dict[str, Any]]:
-    item = CACHE.get(key)
-    if not item:
-        return None
-    expires_at = item.get("expires_at")
-    if not expires_at:
-        return None
-    if datetime.utcnow().timestamp() >= float(expires_at):
-        return None
-    return item.get("value")
-
-def cache_get_last_known(key: str) -> Optional[Dict[str, Any]]:
-    item = CACHE.get(key)
-    if not item:
-        return None
-    return item.get("last_known")
-
-def cache_set(key: str, value: Dict[str, Any], ttl_seconds: int) -> None:
-    now_ts = datetime.utcnow().timestamp()
-    CACHE[key] = {
-        "value": value,
-        "expires_at": now_ts + ttl_seconds,
-        "last_known": value,
-        "last_known_at": now_ts
-    }
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+import threading
+import time
+
+from app.core.config import CACHE_MAX_ENTRIES, CACHE_STRIPES
+from app.core.timing import timed_source
+from app.core.tracing import set_attr, span
+
+# In-process cache shared by every executor thread. Entries are immutable
+# records replaced whole, so a read is one dict lookup that sees value,
+# expiry and timestamp from the same write. Writes take the lock of the
+# key's stripe only; unrelated keys never wait on each other.
+# Past max_entries a stripe evicts CLOCK-style: reads only set a referenced
+# bit (no lock, no reordering), and eviction walks the stripe in insertion
+# order, giving referenced keys a second chance.
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: float
+    stored_at: float
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) < self.expires_at
+
+    def stored_at_iso(self) -> str:
+        return datetime.utcfromtimestamp(self.stored_at).replace(microsecond=0).isoformat() + "Z"
+
+class StripedCache:
+    def __init__(self, stripes: int = 64, max_entries: int = 0):
+        n = 1
+        while n < stripes:
+            n <<= 1
+        self._mask = n - 1
+        self._maps: List[Dict[str, CacheEntry]] = [{} for _ in range(n)]
+        self._referenced: List[Set[str]] = [set() for _ in range(n)]
+        self._locks = [threading.Lock() for _ in range(n)]
+        self.max_entries = max_entries
+        self._stripe_max = -(-max_entries // n) if max_entries > 0 else 0
+        self.evicted = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        i = hash(key) & self._mask
+        entry = self._maps[i].get(key)
+        if entry is not None and self._stripe_max:
+            self._referenced[i].add(key)
+        return entry
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(value, now + ttl_seconds, now)
+        i = hash(key) & self._mask
+        with self._locks[i]:
+            m = self._maps[i]
+            m[key] = entry
+            if self._stripe_max and len(m) > self._stripe_max:
+                self._evict(i, key)
+        return entry
+
+    def _evict(self, i: int, keep: str) -> None:
+        # Caller holds the stripe lock. Entries are never moved, so a
+        # concurrent reader sees a key either where it was or gone.
+        m, ref = self._maps[i], self._referenced[i]
+        excess = len(m) - self._stripe_max
+        victims = []
+        for k in m:
+            if len(victims) >= excess:
+                break
+            if k == keep:
+                continue
+            if k in ref:
+                ref.discard(k)
+            else:
+                victims.append(k)
+        if len(victims) < excess:
+            # everything was referenced: fall back to insertion order
+            victims.extend([k for k in m if k != keep and k not in victims][:excess - len(victims)])
+        for k in victims:
+            del m[k]
+            ref.discard(k)
+        self.evicted += len(victims)
+
+    def delete(self, key: str) -> None:
+        i = hash(key) & self._mask
+        with self._locks[i]:
+            self._maps[i].pop(key, None)
+            self._referenced[i].discard(key)
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._maps)
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [len(m) for m in self._maps]
+        return {"stripes": len(sizes), "entries": sum(sizes), "largest_stripe": max(sizes),
+                "max_entries": self.max_entries, "evicted": self.evicted}
+
+CACHE = StripedCache(CACHE_STRIPES, CACHE_MAX_ENTRIES)
+
+def cache_entry(key: str) -> Optional[CacheEntry]:
+    return CACHE.get(key)
+
+def cache_get_fresh(key: str) -> Optional[Any]:
+    entry = CACHE.get(key)
+    return entry.value if entry is not None and entry.fresh() else None
+
+def cache_get_last_known(key: str) -> Optional[Any]:
+    entry = CACHE.get(key)
+    return entry.value if entry is not None else None
+
+def cache_set(key: str, value: Any, ttl_seconds: int) -> CacheEntry:
+    return CACHE.set(key, value, ttl_seconds)
 
 def cache_last_known_at_iso(key: str) -> Optional[str]:
-    item = CACHE.get(key)
-    if not item:
-        return None
-    ts = item.get("last_known_at")
-    if not isinstance(ts, (int, float)):
-        return None
-    return datetime.utcfromtimestamp(ts).replace(microsecond=0).isoformat() + "Z"
\ No newline at end of file
+    entry = CACHE.get(key)
+    return entry.stored_at_iso() if entry is not None else None
+
+def cache_stats() -> Dict[str, Any]:
+    return CACHE.stats()
+
+class StaleData(Exception):
+    # Raised by a fetch function that could only produce an out-of-date
+    # result (e.g. stored rows after a failed upstream sync). cached_fetch
+    # serves `data` flagged stale and does not store it as fresh.
+    def __init__(self, data: Any, cause: Optional[Exception] = None):
+        super().__init__(str(cause) if cause is not None else "stale data")
+        self.data = data
+
+def cached_fetch(key: str, ttl: int, fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    with span("cache.fetch", {"cache.key": key, "cache.ttl_seconds": ttl}) as sp, timed_source(key) as timing:
+        data, info = _cached_fetch(key, ttl, fn, timing)
+        set_attr(sp, "cache.hit", info["hit"])
+        set_attr(sp, "cache.stale", info["stale"])
+        set_attr(sp, "cache.from_fallback", info["from_fallback"])
+        return data, info
+
+def _cached_fetch(key: str, ttl: int, fn: Callable[[], Any], timing: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    entry = CACHE.get(key)
+    if entry is not None and entry.value and entry.fresh():
+        timing["hit"] = True
+        return entry.value, {"hit": True, "stale": False, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": entry.stored_at_iso()}
+
+    # If not fresh, we execute the function.
+    # This is usually called from an executor thread.
+    try:
+        data = fn()
+        if data is not None:
+            stored = CACHE.set(key, data, ttl)
+            return data, {"hit": False, "stale": False, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": stored.stored_at_iso()}
+    except StaleData as e:
+        print(f"Error fetching {key}: {e}")
+        if e.data is not None:
+            return e.data, {"hit": False, "stale": True, "from_fallback": True, "ttl_seconds": ttl, "last_known_at": entry.stored_at_iso() if entry is not None else None}
+    except Exception as e:
+        print(f"Error fetching {key}: {e}")
+
+    entry = CACHE.get(key)
+    if entry is not None and entry.value is not None:
+        return entry.value, {"hit": False, "stale": True, "from_fallback": True, "ttl_seconds": ttl, "last_known_at": entry.stored_at_iso()}
+
+    return None, {"hit": False, "stale": True, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": None}
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Sequence
+import sys
+
+import msgpack
+
+# Columnar wire format for series (MessagePack):
+#   {"n": count, "t": bin int64 LE epoch seconds (UTC; midnight for dates),
+#    "v": bin float64 LE (NaN for missing), ...passthrough fields}
+# Clients read "t"/"v" straight into typed arrays; nothing is per-point.
+MSGPACK_MEDIA_TYPES = ("application/x-msgpack", "application/msgpack", "application/vnd.msgpack")
+MSGPACK_MEDIA_TYPE = MSGPACK_MEDIA_TYPES[0]
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAN = float("nan")
+
+def wants_msgpack(accept: Optional[str], format_: Optional[str] = None) -> bool:
+    if format_:
+        return format_.lower() == "msgpack"
+    if not accept:
+        return False
+    return any(t in accept for t in MSGPACK_MEDIA_TYPES)
+
+def _epoch_seconds(d: str) -> int:
+    if len(d) == 10:
+        return (date.fromisoformat(d).toordinal() - _EPOCH_ORDINAL) * 86400
+    dt = datetime.fromisoformat(d.rstrip("Z"))
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+def _le_bytes(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+def columns_from_points(points: Sequence[Dict[str, Any]], value_key: str = "value") -> Dict[str, Any]:
+    t = array("q", [_epoch_seconds(p["date"]) for p in points])
+    v = array("d", [x if isinstance(x, (int, float)) else _NAN for x in (p.get(value_key) for p in points)])
+    return {"n": len(points), "t": _le_bytes(t), "v": _le_bytes(v)}
+
+def columns_from_arrays(dates: Sequence[str], values: Sequence[Optional[float]]) -> Dict[str, Any]:
+    t = array("q", [_epoch_seconds(d) for d in dates])
+    v = array("d", [x if isinstance(x, (int, float)) else _NAN for x in values])
+    return {"n": len(dates), "t": _le_bytes(t), "v": _le_bytes(v)}
+
+def pack(doc: Dict[str, Any]) -> bytes:
+    return msgpack.packb(doc, use_bin_type=True)
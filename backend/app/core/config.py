@@ -12,3 +12,168 @@ TTL_BRAPI_HISTORY = int(os.getenv("TTL_BRAPI_HISTORY", str(6 * 60 * 60)))
 TTL_SGS_DAILY = int(os.getenv("TTL_SGS_DAILY", str(6 * 60 * 60)))
 TTL_SGS_SLOW = int(os.getenv("TTL_SGS_SLOW", str(24 * 60 * 60)))
 TTL_EXPECTATIONS = int(os.getenv("TTL_EXPECTATIONS", str(24 * 60 * 60)))
+
+# Upstream politeness: max simultaneous requests per host
+BCB_MAX_CONCURRENCY = int(os.getenv("BCB_MAX_CONCURRENCY", "4"))
+BRAPI_MAX_CONCURRENCY = int(os.getenv("BRAPI_MAX_CONCURRENCY", "4"))
+
+# Batch series endpoint
+BATCH_MAX_SERIES = int(os.getenv("BATCH_MAX_SERIES", "100"))
+
+# Upstream rate limits (token bucket per provider). A daily quota of 0 means
+# calls are counted but not capped.
+BRAPI_RATE_PER_MINUTE = float(os.getenv("BRAPI_RATE_PER_MINUTE", "60"))
+BRAPI_BURST = int(os.getenv("BRAPI_BURST", "10"))
+BRAPI_DAILY_QUOTA = int(os.getenv("BRAPI_DAILY_QUOTA", "0"))
+BCB_RATE_PER_MINUTE = float(os.getenv("BCB_RATE_PER_MINUTE", "120"))
+BCB_BURST = int(os.getenv("BCB_BURST", "20"))
+BCB_DAILY_QUOTA = int(os.getenv("BCB_DAILY_QUOTA", "0"))
+# Share of the daily quota kept for homepage-critical calls
+UPSTREAM_RESERVE_FRACTION = float(os.getenv("UPSTREAM_RESERVE_FRACTION", "0.2"))
+# How long a critical call may wait for a token before falling back to last_known
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2"))
+# How long a background call (batch, export, pollers) may wait for a token
+RATE_LIMIT_BACKGROUND_MAX_WAIT = float(os.getenv("RATE_LIMIT_BACKGROUND_MAX_WAIT", "30"))
+
+# Payload history (append-only, time-travel via ?at=)
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join("data", "history"))
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+
+# Correlation / beta engine
+CORRELATION_WINDOWS = [int(w) for w in os.getenv("CORRELATION_WINDOWS", "20,60,120").split(",") if w.strip()]
+CORRELATION_MAX_TICKERS = int(os.getenv("CORRELATION_MAX_TICKERS", "10"))
+# Series kept in the shared engine (LRU beyond the core ones)
+CORRELATION_MAX_SERIES = int(os.getenv("CORRELATION_MAX_SERIES", "40"))
+
+# Volatility engine
+VOL_WINDOWS = [int(w) for w in os.getenv("VOL_WINDOWS", "20,60,120,252").split(",") if w.strip()]
+VOL_EWMA_LAMBDA = float(os.getenv("VOL_EWMA_LAMBDA", "0.94"))
+VOL_MAX_TICKERS = int(os.getenv("VOL_MAX_TICKERS", "20"))
+
+# Charts
+TTL_BRAPI_INTRADAY = int(os.getenv("TTL_BRAPI_INTRADAY", "300"))
+CHART_DEFAULT_POINTS = int(os.getenv("CHART_DEFAULT_POINTS", "300"))
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+
+# Series export (streamed in date chunks)
+EXPORT_CHUNK_DAYS = int(os.getenv("EXPORT_CHUNK_DAYS", str(5 * 365)))
+EXPORT_DEFAULT_START = os.getenv("EXPORT_DEFAULT_START", "1980-01-01")
+
+# Raw upstream response cache (ETag / Last-Modified revalidation)
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join("data", "http"))
+HTTP_CACHE_MEMORY_ENTRIES = int(os.getenv("HTTP_CACHE_MEMORY_ENTRIES", "256"))
+# Disk tier bounds: least recently used files go first past the size cap, and
+# files not used for HTTP_CACHE_MAX_AGE seconds are swept (0 disables either)
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+HTTP_CACHE_SWEEP_INTERVAL = int(os.getenv("HTTP_CACHE_SWEEP_INTERVAL", "3600"))
+
+# Profiling (opt-in): PROFILE_REQUESTS=1 profiles every request; otherwise a
+# request is profiled when it sends X-Profile: <PROFILE_ADMIN_TOKEN>.
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0").strip().lower() in ("1", "true", "yes")
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "").strip()
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Tracing: TRACE_EXPORTER=none|file|otlp. Spans follow the OTLP/JSON shape so
+# a collector (otlphttp receiver or otlpjsonfile) can ingest them directly.
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").strip().lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("data", "traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "fundamentos-backend")
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "2"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "2048"))
+
+# Watchlists
+WATCHLIST_MAX_TICKERS = int(os.getenv("WATCHLIST_MAX_TICKERS", "50"))
+WATCHLIST_MAX_USERS = int(os.getenv("WATCHLIST_MAX_USERS", "10000"))
+WATCHLIST_ACTIVE_SECONDS = int(os.getenv("WATCHLIST_ACTIVE_SECONDS", str(60 * 60)))
+# Watchlist routes act only for the user named in a signed bearer token
+# ("<user_id>.<expires>.<hmac>", see app.core.auth and
+# scripts/issue_user_token.py). Without a secret they answer 503.
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", str(30 * 24 * 3600)))
+# Tickers per BRAPI /quote call; free plans may only allow 1
+BRAPI_QUOTE_BATCH_SIZE = int(os.getenv("BRAPI_QUOTE_BATCH_SIZE", "10"))
+# How long a ticker BRAPI doesn't know is remembered (and not re-fetched)
+TTL_BRAPI_NOT_FOUND = int(os.getenv("TTL_BRAPI_NOT_FOUND", str(6 * 60 * 60)))
+
+# Adaptive TTLs: expire keys at the next moment new data can appear (B3
+# session, SGS publication times, IBGE/BCB release days). The TTL_* values
+# above remain the fallback and the in-session refresh rate.
+ADAPTIVE_TTL_ENABLED = os.getenv("ADAPTIVE_TTL_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+ADAPTIVE_TTL_MIN = int(os.getenv("ADAPTIVE_TTL_MIN", "30"))
+ADAPTIVE_TTL_MAX = int(os.getenv("ADAPTIVE_TTL_MAX", str(4 * 24 * 60 * 60)))
+# Polling rate inside a release window, until a new observation arrives
+RELEASE_POLL_TTL = int(os.getenv("RELEASE_POLL_TTL", "600"))
+RELEASE_WINDOW_MINUTES = int(os.getenv("RELEASE_WINDOW_MINUTES", "180"))
+# Optional JSON file: {"433": ["2026-11-10T09:00", ...], ...} in Brasilia time
+RELEASE_CALENDAR_PATH = os.getenv("RELEASE_CALENDAR_PATH", "").strip()
+
+# Process-wide worker pool for blocking upstream fetches (see app.core.executor).
+# Sized for upstream I/O, not requests: the per-host caps still apply inside it.
+EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", "16"))
+
+# Built frontend (vite build -> frontend/dist/public), served by this app
+FRONTEND_DIST_DIR = os.getenv("FRONTEND_DIST_DIR", "../frontend/dist/public")
+# Cache lifetime for un-hashed static files (images etc.); hashed bundles are immutable
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(60 * 60)))
+
+# Inline the current homepage snapshot into index.html so first paint needs no
+# second round trip. A cold build gets this long before the page ships without it.
+BOOTSTRAP_ENABLED = os.getenv("BOOTSTRAP_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+BOOTSTRAP_TIMEOUT = float(os.getenv("BOOTSTRAP_TIMEOUT", "1.5"))
+# Older snapshots are still inlined, but with meta.stale set
+BOOTSTRAP_MAX_AGE = int(os.getenv("BOOTSTRAP_MAX_AGE", "300"))
+
+# Local history warehouse (SQLite). Providers read it first and only ask
+# upstream for what came after the newest stored observation.
+WAREHOUSE_ENABLED = os.getenv("WAREHOUSE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+WAREHOUSE_PATH = os.getenv("WAREHOUSE_PATH", "data/warehouse.sqlite3")
+# Background backfill of full history, one upstream page per step
+BACKFILL_ENABLED = os.getenv("BACKFILL_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+BACKFILL_SGS_CODES = [int(x) for x in os.getenv("BACKFILL_SGS_CODES", "11,433,1,4391,11752").split(",") if x.strip()]
+BACKFILL_OLINDA_ENDPOINTS = [x.strip() for x in os.getenv("BACKFILL_OLINDA_ENDPOINTS", "ExpectativasMercadoInflacao12Meses").split(",") if x.strip()]
+SGS_BACKFILL_START_YEAR = int(os.getenv("SGS_BACKFILL_START_YEAR", "1980"))
+OLINDA_PAGE_SIZE = int(os.getenv("OLINDA_PAGE_SIZE", "1000"))
+BACKFILL_STEP_SECONDS = float(os.getenv("BACKFILL_STEP_SECONDS", "2"))
+BACKFILL_RETRY_SECONDS = float(os.getenv("BACKFILL_RETRY_SECONDS", "300"))
+
+# Aligned multi-series frames (/api/frames): inputs are fetched from this date
+# on and aligned once per (series set, freq); requests slice the cached frame.
+FRAME_HISTORY_START = os.getenv("FRAME_HISTORY_START", "2000-01-01")
+FRAME_MAX_SERIES = int(os.getenv("FRAME_MAX_SERIES", "10"))
+
+# Anomaly scoring for what_changed_today: z-score and percentile of each
+# move against the last ANOMALY_WINDOW moves of the same series and horizon.
+ANOMALY_WINDOW = int(os.getenv("ANOMALY_WINDOW", "252"))
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "12"))
+
+# In-process cache lock stripes (rounded up to a power of two)
+CACHE_STRIPES = int(os.getenv("CACHE_STRIPES", "64"))
+# Entry cap across all stripes (0 = unbounded). Request-shaped keys (series
+# windows, chart budgets) would otherwise grow memory without limit.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "4096"))
+
+# Admission control for /api routes. Past ADMISSION_MAX_INFLIGHT, requests
+# wait in a bounded queue for at most ADMISSION_QUEUE_TIMEOUT seconds; beyond
+# that the homepage gets its last snapshot marked stale and other routes a
+# 503 with Retry-After. Keep the in-flight limit under Starlette's threadpool
+# size (40) so sync routes queue here, where it is measured, not there.
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+# Market screener (/api/screener). Tickers default to the IBOV constituents
+# in app.services.screener; histories share the "brapi:hist:<ticker>:<range>:1d"
+# cache keys, and ranked results are rebuilt at most once per refresh cycle.
+SCREENER_TICKERS = [t.strip().upper() for t in os.getenv("SCREENER_TICKERS", "").split(",") if t.strip()]
+SCREENER_HISTORY_RANGE = os.getenv("SCREENER_HISTORY_RANGE", "3mo")
+SCREENER_REFRESH_SECONDS = int(os.getenv("SCREENER_REFRESH_SECONDS", "300"))
+SCREENER_MAX_PAGE_SIZE = int(os.getenv("SCREENER_MAX_PAGE_SIZE", "200"))
+# Until the first build after boot lands, /api/screener answers 503 with this Retry-After
+SCREENER_RETRY_AFTER = int(os.getenv("SCREENER_RETRY_AFTER", "15"))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import threading
+
+from app.core.config import EXECUTOR_MAX_WORKERS
+from app.core.timing import submit_with_context
+
+# One bounded pool for the whole process. Request handlers (async, on the
+# event loop) await work submitted here instead of each spinning up its own
+# ThreadPoolExecutor, so thread count stays flat no matter how many clients
+# are connected. Tasks submitted here must not block on other tasks in it.
+EXECUTOR = ThreadPoolExecutor(max_workers=EXECUTOR_MAX_WORKERS, thread_name_prefix="worker")
+
+def submit(fn: Callable[..., Any], *args: Any) -> Future:
+    return submit_with_context(EXECUTOR, fn, *args)
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.wrap_future(submit(fn, *args))
+
+def shutdown_executor() -> None:
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+def executor_stats() -> Dict[str, Any]:
+    return {
+        "max_workers": EXECUTOR_MAX_WORKERS,
+        "workers": len(EXECUTOR._threads),
+        "queued": EXECUTOR._work_queue.qsize(),
+        "process_threads": threading.active_count(),
+    }
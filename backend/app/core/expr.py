@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import ast
+import threading
+
+import numpy as np
+
+from app.core.resample import Series, asof, ffill as _ffill
+
+# Derived signals as expressions over named inputs, e.g.
+#   "selic - compound12(ipca_mm)"      "selic - expectations.ipca_12m"
+# Definitions are parsed once (ast, whitelisted nodes only) into a DAG in
+# which identical subexpressions are a single node and signals may refer to
+# each other by name. Values are Series (app.core.resample) or floats;
+# every operation is a numpy call over whole arrays.
+#
+# Each evaluation passes a version per input. A node recomputes only when
+# the versions of its inputs differ from its last run; otherwise the
+# memoized result is reused.
+
+class ExprError(ValueError):
+    pass
+
+Value = Union[Series, float]
+
+def _binary(op: Callable[[Any, Any], Any], a: Value, b: Value) -> Value:
+    # Series op Series is as-of aligned on the left operand's dates.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if isinstance(a, Series) and isinstance(b, Series):
+            return a.with_values(op(a.values, asof(b, a.dates)))
+        if isinstance(a, Series):
+            return a.with_values(op(a.values, b))
+        if isinstance(b, Series):
+            return b.with_values(op(a, b.values))
+        return float(op(a, b))
+
+# Functions
+
+def _series_arg(name: str, x: Value) -> Series:
+    if not isinstance(x, Series):
+        raise ExprError(f"{name}() expects a series")
+    return x
+
+def _int_arg(name: str, n: Value) -> int:
+    if isinstance(n, Series) or int(n) != n or n < 1:
+        raise ExprError(f"{name}() expects a positive integer window")
+    return int(n)
+
+def compound(x: Value, n: Value) -> Series:
+    # Rolling n-period compounding of percent rates: prod(1 + x/100) - 1, in %.
+    s, n = _series_arg("compound", x), _int_arg("compound", n)
+    if len(s) < n:
+        return Series(s.dates[:0], s.values[:0])
+    csum = np.concatenate(([0.0], np.cumsum(np.log1p(s.values / 100.0))))
+    return s.with_values(np.expm1(csum[n:] - csum[:-n]) * 100.0, n - 1)
+
+def compound12(x: Value) -> Series:
+    return compound(x, 12)
+
+def diff(x: Value, n: Value = 1) -> Series:
+    s, n = _series_arg("diff", x), _int_arg("diff", n)
+    return s.with_values(s.values[n:] - s.values[:-n], n)
+
+def pct_change(x: Value, n: Value = 1) -> Series:
+    s, n = _series_arg("pct_change", x), _int_arg("pct_change", n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return s.with_values((s.values[n:] / s.values[:-n] - 1.0) * 100.0, n)
+
+def last(x: Value) -> float:
+    if not isinstance(x, Series):
+        return float(x)
+    found = x.last()
+    return found[1] if found else float("nan")
+
+def prev(x: Value) -> float:
+    s = _series_arg("prev", x)
+    finite = s.values[np.isfinite(s.values)]
+    return float(finite[-2]) if len(finite) >= 2 else float("nan")
+
+def ffill(x: Value) -> Series:
+    s = _series_arg("ffill", x)
+    return s.with_values(_ffill(s.values))
+
+FUNCTIONS: Dict[str, Callable[..., Value]] = {
+    "compound": compound, "compound12": compound12, "diff": diff, "ffill": ffill,
+    "pct_change": pct_change, "last": last, "prev": prev,
+}
+
+_BINOPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide, ast.Pow: np.power}
+
+# DAG
+
+class Node:
+    __slots__ = ("key", "kind", "arg", "deps")
+
+    def __init__(self, key: str, kind: str, arg: Any, deps: Tuple["Node", ...]):
+        self.key = key
+        self.kind = kind  # input | const | neg | binop | call | ref
+        self.arg = arg
+        self.deps = deps
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+class SignalEngine:
+    def __init__(self, definitions: Dict[str, str]):
+        self.definitions = dict(definitions)
+        self._nodes: Dict[str, Node] = {}
+        self.roots: Dict[str, Node] = {}
+        for name, source in self.definitions.items():
+            self.roots[name] = self._compile(name, source)
+        self.order = self._toposort()
+        self.inputs = sorted({n.arg for n in self.order if n.kind == "input"})
+        self._lock = threading.Lock()
+        # node key -> (input versions, value)
+        self._memo: Dict[str, Tuple[Tuple[Any, ...], Value]] = {}
+        self.computed = 0
+        self.reused = 0
+
+    def _intern(self, key: str, kind: str, arg: Any, deps: Tuple[Node, ...]) -> Node:
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Node(key, kind, arg, deps)
+        return node
+
+    def _compile(self, name: str, source: str) -> Node:
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise ExprError(f"{name}: {e.msg}") from None
+        return self._build(name, tree.body)
+
+    def _build(self, name: str, node: ast.AST) -> Node:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return self._intern(repr(float(node.value)), "const", float(node.value), ())
+        dotted = _dotted(node)
+        if dotted is not None:
+            if dotted in self.definitions:
+                return self._intern(f"${dotted}", "ref", dotted, ())
+            return self._intern(dotted, "input", dotted, ())
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            inner = self._build(name, node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return inner
+            return self._intern(f"(-{inner.key})", "neg", None, (inner,))
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            a, b = self._build(name, node.left), self._build(name, node.right)
+            return self._intern(f"({a.key}{type(node.op).__name__}{b.key})", "binop", _BINOPS[type(node.op)], (a, b))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            fn = node.func.id
+            if fn not in FUNCTIONS:
+                raise ExprError(f"{name}: unknown function {fn}()")
+            args = tuple(self._build(name, a) for a in node.args)
+            return self._intern(f"{fn}({','.join(a.key for a in args)})", "call", fn, args)
+        raise ExprError(f"{name}: unsupported expression {ast.unparse(node)!r}")
+
+    def _toposort(self) -> List[Node]:
+        order: List[Node] = []
+        state: Dict[str, int] = {}
+
+        def visit(node: Node, path: Tuple[str, ...]) -> None:
+            if state.get(node.key) == 2:
+                return
+            if state.get(node.key) == 1:
+                raise ExprError(f"cycle in derived signals: {' -> '.join(path)}")
+            state[node.key] = 1
+            deps = node.deps
+            if node.kind == "ref":
+                deps = (self.roots[node.arg],)
+            for dep in deps:
+                visit(dep, path + (node.arg if node.kind == "ref" else dep.key,))
+            state[node.key] = 2
+            order.append(node)
+
+        for name, root in self.roots.items():
+            visit(root, (name,))
+        return order
+
+    def _deps(self, node: Node) -> Tuple[Node, ...]:
+        return (self.roots[node.arg],) if node.kind == "ref" else node.deps
+
+    def evaluate(self, inputs: Dict[str, Value], versions: Dict[str, Any]) -> Dict[str, Optional[Value]]:
+        # `versions` identifies each input's content (anything hashable that
+        # changes when the data does). Missing inputs evaluate to None.
+        with self._lock:
+            values: Dict[str, Optional[Value]] = {}
+            node_versions: Dict[str, Tuple[Any, ...]] = {}
+            for node in self.order:
+                if node.kind == "input":
+                    node_versions[node.key] = (versions.get(node.arg),)
+                    values[node.key] = inputs.get(node.arg)
+                    continue
+                if node.kind == "const":
+                    node_versions[node.key] = ()
+                    values[node.key] = node.arg
+                    continue
+                deps = self._deps(node)
+                version = tuple(node_versions[d.key] for d in deps)
+                node_versions[node.key] = version
+                memo = self._memo.get(node.key)
+                if memo is not None and memo[0] == version:
+                    values[node.key] = memo[1]
+                    self.reused += 1
+                    continue
+                args = [values[d.key] for d in deps]
+                result = None if any(a is None for a in args) else self._apply(node, args)
+                self._memo[node.key] = (version, result)
+                values[node.key] = result
+                self.computed += 1
+            return {name: values[root.key] for name, root in self.roots.items()}
+
+    def _apply(self, node: Node, args: List[Value]) -> Value:
+        if node.kind == "ref":
+            return args[0]
+        if node.kind == "neg":
+            a = args[0]
+            return a.with_values(-a.values) if isinstance(a, Series) else -a
+        if node.kind == "binop":
+            return _binary(node.arg, args[0], args[1])
+        return FUNCTIONS[node.arg](*args)
+
+    def inputs_of(self, name: str) -> List[str]:
+        seen: Dict[str, Node] = {}
+        stack = [self.roots[name]]
+        while stack:
+            node = stack.pop()
+            if node.key not in seen:
+                seen[node.key] = node
+                stack.extend(self._deps(node))
+        return sorted(n.arg for n in seen.values() if n.kind == "input")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"signals": list(self.roots), "nodes": len(self.order), "inputs": self.inputs, "computed": self.computed, "reused": self.reused}
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from app.core.config import HISTORY_DIR, HISTORY_ENABLED, HISTORY_RETENTION_DAYS
+
+# Layout under HISTORY_DIR:
+#   seg-YYYYMMDD.log  one zlib-compressed JSON payload per record, appended
+#   index.bin         fixed-size records (ts, segment day, offset, length),
+#                     in append (= time) order, so lookups are a binary search
+#                     over the mmapped file and read a single record.
+INDEX_RECORD = struct.Struct("<dIQI")
+INDEX_FILE = "index.bin"
+
+def _segment_name(day: int) -> str:
+    return f"seg-{day:08d}.log"
+
+def _day_of(ts: float) -> int:
+    return int(datetime.utcfromtimestamp(ts).strftime("%Y%m%d"))
+
+def ts_to_iso(ts: float) -> str:
+    return datetime.utcfromtimestamp(ts).replace(microsecond=0).isoformat() + "Z"
+
+def payload_fingerprint(payload: Dict[str, Any]) -> str:
+    # Two builds are the same version when their data is the same; clock
+    # fields (generated_at, fallback last_update) and cache bookkeeping change
+    # on every call and are left out.
+    def strip(x: Any) -> Any:
+        if isinstance(x, dict):
+            return {k: strip(v) for k, v in x.items() if k not in ("generated_at", "last_update", "cache")}
+        if isinstance(x, list):
+            return [strip(v) for v in x]
+        return x
+
+    body = {k: strip(payload.get(k)) for k in ("top_cards", "what_changed_today", "signals")}
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class PayloadHistory:
+    def __init__(self, root: str, retention_days: int):
+        self.root = root
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.last_fingerprint: Optional[str] = None
+        self.last_pruned_day: Optional[int] = None
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def record(self, payload: Dict[str, Any], ts: Optional[float] = None) -> bool:
+        fp = payload_fingerprint(payload)
+        if fp == self.last_fingerprint:
+            return False
+
+        ts = ts if ts is not None else time.time()
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8"))
+        day = _day_of(ts)
+
+        with self.lock:
+            if fp == self.last_fingerprint:
+                return False
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, _segment_name(day)), "ab") as seg:
+                offset = seg.tell()
+                seg.write(blob)
+            with open(self._index_path(), "ab") as idx:
+                idx.write(INDEX_RECORD.pack(ts, day, offset, len(blob)))
+            self.last_fingerprint = fp
+
+            if self.last_pruned_day != day:
+                self.last_pruned_day = day
+                self._prune(ts)
+        return True
+
+    def _read_index_entry(self, buf: Any, i: int) -> Tuple[float, int, int, int]:
+        return INDEX_RECORD.unpack_from(buf, i * INDEX_RECORD.size)
+
+    def at(self, ts: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        # Latest version recorded at or before ts, i.e. what was being served then.
+        path = self._index_path()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        n = size // INDEX_RECORD.size
+        if n == 0:
+            return None
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), n * INDEX_RECORD.size, access=mmap.ACCESS_READ) as buf:
+            lo, hi = 0, n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._read_index_entry(buf, mid)[0] <= ts:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0:
+                return None
+            rec_ts, day, offset, length = self._read_index_entry(buf, lo - 1)
+
+        try:
+            with open(os.path.join(self.root, _segment_name(day)), "rb") as seg:
+                seg.seek(offset)
+                blob = seg.read(length)
+            return rec_ts, json.loads(zlib.decompress(blob))
+        except (OSError, zlib.error, ValueError):
+            return None
+
+    def _prune(self, now_ts: float) -> None:
+        # Called with the lock held. Drops whole segments past retention and
+        # rewrites the index without their records.
+        if self.retention_days <= 0:
+            return
+        cutoff = _day_of(now_ts - timedelta(days=self.retention_days).total_seconds())
+        expired = []
+        for name in os.listdir(self.root):
+            if name.startswith("seg-") and name.endswith(".log"):
+                try:
+                    day = int(name[4:12])
+                except ValueError:
+                    continue
+                if day < cutoff:
+                    expired.append(name)
+        if not expired:
+            return
+
+        path = self._index_path()
+        tmp = path + ".tmp"
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            while True:
+                rec = src.read(INDEX_RECORD.size)
+                if len(rec) < INDEX_RECORD.size:
+                    break
+                if INDEX_RECORD.unpack(rec)[1] >= cutoff:
+                    dst.write(rec)
+        os.replace(tmp, path)
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+HISTORY = PayloadHistory(HISTORY_DIR, HISTORY_RETENTION_DAYS)
+
+def record_payload(payload: Dict[str, Any]) -> None:
+    if not HISTORY_ENABLED:
+        return
+    try:
+        HISTORY.record(payload)
+    except OSError as e:
+        print(f"Error recording payload history: {e}")
+
+def parse_at(raw: str) -> Optional[float]:
+    s = raw.strip()
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        return (dt - datetime(1970, 1, 1)).total_seconds()
+    return dt.timestamp()
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import hashlib
+import re
+import json
+import os
+import threading
+import time
+import requests
+
+from app.core.config import (
+    BCB_MAX_CONCURRENCY, BRAPI_MAX_CONCURRENCY, HTTP_CACHE_DIR, HTTP_CACHE_ENABLED,
+    HTTP_CACHE_MAX_AGE, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MEMORY_ENTRIES,
+    HTTP_CACHE_SWEEP_INTERVAL, REQUEST_TIMEOUT,
+)
+from app.core.ratelimit import acquire_for_host
+from app.core.timing import add_wait
+from app.core.tracing import KIND_CLIENT, set_attr, span
+
+HOST_MAX_CONCURRENCY = {
+    "api.bcb.gov.br": BCB_MAX_CONCURRENCY,
+    "olinda.bcb.gov.br": BCB_MAX_CONCURRENCY,
+    "brapi.dev": BRAPI_MAX_CONCURRENCY,
+}
+DEFAULT_HOST_MAX_CONCURRENCY = 4
+
+# Params that don't change the response and must not end up on disk.
+IGNORED_PARAMS = ("token",)
+
+_HOST_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+def host_slot(host: str) -> threading.BoundedSemaphore:
+    slot = _HOST_SLOTS.get(host)
+    if slot is None:
+        with _HOST_SLOTS_LOCK:
+            slot = _HOST_SLOTS.get(host)
+            if slot is None:
+                limit = HOST_MAX_CONCURRENCY.get(host, DEFAULT_HOST_MAX_CONCURRENCY)
+                slot = threading.BoundedSemaphore(max(1, limit))
+                _HOST_SLOTS[host] = slot
+    return slot
+
+def request_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    norm = sorted(
+        (str(k), str(v).strip())
+        for k, v in (params or {}).items()
+        if k not in IGNORED_PARAMS
+    )
+    raw = url + "?" + "&".join(f"{k}={v}" for k, v in norm)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    # Parsed bodies plus their validators. Memory holds the hot entries as
+    # parsed objects (a 304 costs no re-parse); disk keeps them across restarts.
+    # The disk tier is an LRU over files: `disk` maps key -> (size, last use),
+    # oldest first, and is rebuilt from file mtimes on first use.
+    def __init__(self, root: str, memory_entries: int, max_bytes: int = 0,
+                 max_age: int = 0, sweep_interval: int = 3600):
+        self.root = root
+        self.memory_entries = max(1, memory_entries)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = max(1, sweep_interval)
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.disk: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.disk_bytes = 0
+        self.disk_loaded = False
+        self.last_sweep = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"revalidated": 0, "modified": 0, "uncached": 0, "evicted": 0, "expired": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self._touch(key)
+                return entry
+            self._load_disk()
+            if self._expired(key, time.time()):
+                self._drop(key, "expired")
+                return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, entry)
+        with self.lock:
+            self._touch(key)
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.memory_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key: str, url: str, etag: Optional[str], last_modified: Optional[str], body: Any) -> None:
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "body": body}
+        self._remember(key, entry)
+        path = self._path(key)
+        tmp = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error writing http cache {url}: {e}")
+            return
+        with self.lock:
+            self._load_disk()
+            old = self.disk.pop(key, None)
+            if old:
+                self.disk_bytes -= old[0]
+            self.disk[key] = (size, time.time())
+            self.disk_bytes += size
+            self._trim()
+
+    # Disk tier helpers; callers hold self.lock.
+
+    def _load_disk(self) -> None:
+        if self.disk_loaded:
+            return
+        self.disk_loaded = True
+        found = []
+        try:
+            for sub in os.scandir(self.root):
+                if not sub.is_dir():
+                    continue
+                for f in os.scandir(sub.path):
+                    if f.name.endswith(".tmp"):
+                        try:
+                            os.remove(f.path)
+                        except OSError:
+                            pass
+                    elif f.name.endswith(".json"):
+                        st = f.stat()
+                        found.append((st.st_mtime, f.name[:-5], st.st_size))
+        except OSError:
+            pass
+        for mtime, key, size in sorted(found):
+            self.disk[key] = (size, mtime)
+            self.disk_bytes += size
+        self._trim()
+
+    def _touch(self, key: str) -> None:
+        item = self.disk.get(key)
+        if item is not None:
+            self.disk[key] = (item[0], time.time())
+            self.disk.move_to_end(key)
+
+    def _expired(self, key: str, now: float) -> bool:
+        item = self.disk.get(key)
+        return bool(self.max_age and item is not None and now - item[1] > self.max_age)
+
+    def _drop(self, key: str, reason: str) -> None:
+        item = self.disk.pop(key, None)
+        if item is None:
+            return
+        self.disk_bytes -= item[0]
+        self.entries.pop(key, None)
+        self.stats[reason] += 1
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _trim(self) -> None:
+        while self.max_bytes and self.disk_bytes > self.max_bytes and self.disk:
+            self._drop(next(iter(self.disk)), "evicted")
+        now = time.time()
+        if self.max_age and now - self.last_sweep >= self.sweep_interval:
+            self.last_sweep = now
+            while self.disk and self._expired(next(iter(self.disk)), now):
+                self._drop(next(iter(self.disk)), "expired")
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.stats, memory_entries=len(self.entries), disk_entries=len(self.disk),
+                        disk_bytes=self.disk_bytes)
+
+RESPONSE_CACHE = ResponseCache(
+    HTTP_CACHE_DIR, HTTP_CACHE_MEMORY_ENTRIES, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_AGE,
+    HTTP_CACHE_SWEEP_INTERVAL,
+)
+
+_SGS_CODE_RE = re.compile(r"bcdata\.sgs\.(\d+)")
+_BRAPI_TICKER_RE = re.compile(r"brapi\.dev/api/quote/([^/?]+)")
+
+def _span_attributes(url: str, host: str) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {"http.request.method": "GET", "url.full": url, "server.address": host}
+    m = _SGS_CODE_RE.search(url)
+    if m:
+        attrs["sgs.series_code"] = int(m.group(1))
+    m = _BRAPI_TICKER_RE.search(url)
+    if m:
+        attrs["brapi.ticker"] = m.group(1)
+    return attrs
+
+def http_get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    host = urlsplit(url).hostname or ""
+    with span("http.get", _span_attributes(url, host), kind=KIND_CLIENT) as sp:
+        return _http_get_json(url, params, host, sp)
+
+def _http_get_json(url: str, params: Optional[Dict[str, Any]], host: str, sp: Any) -> Any:
+    # All upstream calls go through here so the per-host cap and the
+    # provider rate limits hold across every request and executor in the
+    # process. A RateLimitExceeded propagates to cached_fetch, which then
+    # serves last_known.
+
+    key = request_key(url, params) if HTTP_CACHE_ENABLED else None
+    stored = RESPONSE_CACHE.get(key) if key else None
+    headers = {}
+    if stored:
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    t0 = time.perf_counter()
+    with span("upstream.wait", {"server.address": host}):
+        acquire_for_host(host)
+        slot = host_slot(host)
+        slot.acquire()
+    add_wait((time.perf_counter() - t0) * 1000.0)
+    try:
+        r = requests.get(url, params=params, headers=headers or None, timeout=REQUEST_TIMEOUT)
+    finally:
+        slot.release()
+
+    set_attr(sp, "http.response.status_code", r.status_code)
+    set_attr(sp, "http.response.body.size", len(r.content or b""))
+    if r.status_code == 304 and stored:
+        RESPONSE_CACHE.count("revalidated")
+        set_attr(sp, "http.revalidated", True)
+        return stored["body"]
+
+    r.raise_for_status()
+    body = r.json()
+
+    if key:
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if etag or last_modified:
+            RESPONSE_CACHE.count("modified")
+            RESPONSE_CACHE.put(key, url, etag, last_modified, body)
+        else:
+            RESPONSE_CACHE.count("uncached")
+    return body
+
+def http_cache_stats() -> Dict[str, Any]:
+    return RESPONSE_CACHE.snapshot() if HTTP_CACHE_ENABLED else {"enabled": False}
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+import os
+import re
+import sys
+import threading
+
+from app.core.config import PROFILE_DIR, PROFILE_INTERVAL_MS
+
+class SamplingProfiler:
+    # Stdlib-only sampler: every interval it snapshots the stacks of all other
+    # threads (request thread and executor workers alike) and counts them in
+    # collapsed "frame;frame;frame N" form, which flamegraph tools read.
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = max(interval_ms, 0.5) / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                f = frame
+                while f is not None:
+                    code = f.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{f.f_lineno})")
+                    f = f.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def save(self, label: str) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", label).strip("_") or "root"
+        name = f"profile-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{safe}.folded"
+        with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        return name
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator
+import threading
+import time
+
+from app.core.config import (
+    BCB_BURST, BCB_DAILY_QUOTA, BCB_RATE_PER_MINUTE,
+    BRAPI_BURST, BRAPI_DAILY_QUOTA, BRAPI_RATE_PER_MINUTE,
+    RATE_LIMIT_BACKGROUND_MAX_WAIT, RATE_LIMIT_MAX_WAIT, UPSTREAM_RESERVE_FRACTION,
+)
+
+# Homepage work is critical; batch endpoints and pollers run as background,
+# wait longer for tokens and are the first to be shed when a provider's
+# daily budget runs low or a critical call is queued.
+PRIORITY_CRITICAL = "critical"
+PRIORITY_BACKGROUND = "background"
+
+_PRIORITY: ContextVar[str] = ContextVar("upstream_priority", default=PRIORITY_CRITICAL)
+
+class RateLimitExceeded(Exception):
+    pass
+
+@contextmanager
+def upstream_priority(priority: str) -> Iterator[None]:
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+def run_with_priority(priority: str, fn: Callable[..., Any], *args: Any) -> Any:
+    # Executor threads don't inherit context vars, so pool tasks wrap themselves.
+    with upstream_priority(priority):
+        return fn(*args)
+
+def current_priority() -> str:
+    return _PRIORITY.get()
+
+def _utc_day() -> str:
+    return datetime.utcnow().date().isoformat()
+
+class TokenBucket:
+    def __init__(self, name: str, rate_per_minute: float, burst: int, daily_quota: int, reserve_fraction: float):
+        self.name = name
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.burst = max(1, burst)
+        self.daily_quota = max(0, daily_quota)
+        self.reserve_fraction = min(max(reserve_fraction, 0.0), 1.0)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.day = _utc_day()
+        self.used_today = 0
+        self.shed_today = 0
+        self.critical_waiting = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        day = _utc_day()
+        if day != self.day:
+            self.day = day
+            self.used_today = 0
+            self.shed_today = 0
+
+    def _shed(self, reason: str) -> RateLimitExceeded:
+        self.shed_today += 1
+        return RateLimitExceeded(f"{self.name}: {reason}")
+
+    def acquire(self, priority: str, max_wait: float = RATE_LIMIT_MAX_WAIT) -> None:
+        # Both classes wait for a token up to their own deadline. Background
+        # callers step aside only when the daily quota is in its reserve or a
+        # critical caller is already waiting on this bucket.
+        critical = priority == PRIORITY_CRITICAL
+        deadline = time.monotonic() + (max_wait if critical else RATE_LIMIT_BACKGROUND_MAX_WAIT)
+        waiting = False
+        try:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if self.daily_quota:
+                        remaining = self.daily_quota - self.used_today
+                        if remaining <= 0:
+                            raise self._shed("daily quota exhausted")
+                        if not critical and remaining <= self.daily_quota * self.reserve_fraction:
+                            raise self._shed("daily quota reserved for critical calls")
+                    if not critical and self.critical_waiting:
+                        raise self._shed("yielding to critical calls")
+
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        self.used_today += 1
+                        return
+
+                    wait = (1.0 - self.tokens) / self.rate
+                    if now + wait > deadline:
+                        raise self._shed("rate limited")
+                    if critical and not waiting:
+                        waiting = True
+                        self.critical_waiting += 1
+                time.sleep(wait)
+        finally:
+            if waiting:
+                with self.lock:
+                    self.critical_waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                "tokens": round(self.tokens, 2),
+                "burst": self.burst,
+                "rate_per_minute": round(self.rate * 60.0, 2),
+                "daily_quota": self.daily_quota or None,
+                "used_today": self.used_today,
+                "shed_today": self.shed_today,
+                "critical_waiting": self.critical_waiting,
+                "day": self.day,
+            }
+
+BUCKETS: Dict[str, TokenBucket] = {
+    "brapi": TokenBucket("brapi", BRAPI_RATE_PER_MINUTE, BRAPI_BURST, BRAPI_DAILY_QUOTA, UPSTREAM_RESERVE_FRACTION),
+    "bcb": TokenBucket("bcb", BCB_RATE_PER_MINUTE, BCB_BURST, BCB_DAILY_QUOTA, UPSTREAM_RESERVE_FRACTION),
+}
+
+HOST_PROVIDERS = {
+    "api.bcb.gov.br": "bcb",
+    "olinda.bcb.gov.br": "bcb",
+    "brapi.dev": "brapi",
+}
+
+def acquire_for_host(host: str) -> None:
+    provider = HOST_PROVIDERS.get(host)
+    if provider is None:
+        return
+    BUCKETS[provider].acquire(current_priority())
+
+def limiter_stats() -> Dict[str, Any]:
+    return {name: bucket.stats() for name, bucket in BUCKETS.items()}
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import bisect
+import json
+import time
+
+from app.core.config import (
+    ADAPTIVE_TTL_ENABLED, ADAPTIVE_TTL_MAX, ADAPTIVE_TTL_MIN, RELEASE_CALENDAR_PATH,
+    RELEASE_POLL_TTL, RELEASE_WINDOW_MINUTES,
+)
+
+# Brasilia has had no DST since 2019, so a fixed offset avoids a tzdata dependency.
+BRT = timezone(timedelta(hours=-3))
+
+B3_OPEN = dtime(10, 0)
+B3_CLOSE = dtime(18, 0)
+# Daily bars are final a little after the closing call.
+B3_BAR_FINAL = dtime(18, 30)
+
+# When each SGS series can change. Daily series publish on business days at a
+# given time; monthly/quarterly ones on a set of candidate days (IBGE's
+# calendar moves by a day or two), overridable with RELEASE_CALENDAR_PATH.
+SGS_DAILY_PUBLICATION = {
+    1: dtime(13, 30),   # USD/BRL PTAX, after the 13:10 fixing
+    11: dtime(9, 30),   # SELIC daily rate
+}
+SGS_RELEASE_DAYS = {
+    433: (dtime(9, 30), range(8, 13), None),             # IPCA, ~10th
+    4391: (dtime(10, 0), range(25, 32), None),           # PNAD unemployment, month end
+    11752: (dtime(10, 0), range(1, 8), (3, 6, 9, 12)),   # GDP, first week of the quarter's last month
+}
+EXPECTATIONS_PUBLICATION = dtime(9, 0)
+
+# code -> (newest observation date, when it first showed up), fed by the SGS
+# provider. A release window stops short polling once a newer observation
+# has arrived after its release moment.
+_OBSERVED: Dict[int, Tuple[str, float]] = {}
+
+def note_observation(code: int, last_obs: Optional[str], now: Optional[float] = None) -> None:
+    if not last_obs:
+        return
+    seen = _OBSERVED.get(code)
+    if seen is None:
+        # first sighting since boot: when it was published is unknown
+        _OBSERVED[code] = (last_obs, 0.0)
+    elif last_obs > seen[0]:
+        _OBSERVED[code] = (last_obs, time.time() if now is None else now)
+
+def _print_seen(code: int, moment: datetime) -> bool:
+    seen = _OBSERVED.get(code)
+    return seen is not None and seen[1] >= moment.timestamp()
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+@lru_cache(maxsize=16)
+def b3_holidays(year: int) -> Set[date]:
+    easter = _easter(year)
+    fixed = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (11, 20), (12, 24), (12, 25), (12, 31)]
+    days = {date(year, m, d) for m, d in fixed}
+    days.update({
+        easter - timedelta(days=48),  # Carnival Monday
+        easter - timedelta(days=47),  # Carnival Tuesday
+        easter - timedelta(days=2),   # Good Friday
+        easter + timedelta(days=60),  # Corpus Christi
+    })
+    return days
+
+def is_business_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in b3_holidays(d.year)
+
+def _days_from(d: date) -> Iterator[date]:
+    for i in range(370):
+        yield d + timedelta(days=i)
+
+def _at(d: date, t: dtime) -> datetime:
+    return datetime.combine(d, t, tzinfo=BRT)
+
+def next_business_moment(now: datetime, t: dtime) -> datetime:
+    for d in _days_from(now.astimezone(BRT).date()):
+        moment = _at(d, t)
+        if moment > now and is_business_day(d):
+            return moment
+    return now + timedelta(seconds=ADAPTIVE_TTL_MAX)
+
+@lru_cache(maxsize=1)
+def _calendar_file() -> Dict[int, List[datetime]]:
+    if not RELEASE_CALENDAR_PATH:
+        return {}
+    try:
+        with open(RELEASE_CALENDAR_PATH, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading release calendar: {e}")
+        return {}
+    out: Dict[int, List[datetime]] = {}
+    for code, moments in raw.items():
+        parsed = []
+        for m in moments:
+            dt = datetime.fromisoformat(m)
+            parsed.append(dt if dt.tzinfo else dt.replace(tzinfo=BRT))
+        out[int(code)] = sorted(parsed)
+    return out
+
+def release_moments(code: int, now: datetime) -> Iterator[datetime]:
+    # Release moments in order, from yesterday onwards (so an open window is
+    # visible). Lazy: callers stop at the first one past now.
+    explicit = _calendar_file().get(code)
+    if explicit:
+        yield from (m for m in explicit if m >= now - timedelta(days=1))
+        return
+    spec = SGS_RELEASE_DAYS.get(code)
+    if spec is None:
+        return
+    t, days, months = spec
+    start = now.astimezone(BRT).date() - timedelta(days=1)
+    for d in _days_from(start):
+        if d.day in days and (months is None or d.month in months) and is_business_day(d):
+            yield _at(d, t)
+
+def _ttl_until(now: datetime, moment: datetime) -> int:
+    return int((moment - now).total_seconds())
+
+def _release_ttl(now: datetime, code: int, moments: Iterator[datetime], fallback: int) -> int:
+    window = timedelta(minutes=RELEASE_WINDOW_MINUTES)
+    for m in moments:
+        if m <= now < m + window and not _print_seen(code, m):
+            return RELEASE_POLL_TTL
+        if m > now:
+            return _ttl_until(now, m)
+    return fallback
+
+def _in_session(now: datetime) -> bool:
+    local = now.astimezone(BRT)
+    return is_business_day(local.date()) and B3_OPEN <= local.time() < B3_CLOSE
+
+def _post_close(now: datetime) -> bool:
+    # Between the close and B3_BAR_FINAL quotes still move (closing call,
+    # delayed feeds); one taken then must not be kept overnight.
+    local = now.astimezone(BRT)
+    return is_business_day(local.date()) and B3_CLOSE <= local.time() < B3_BAR_FINAL
+
+def final_bars(points: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    # Date-sorted daily bars without today's, which is still moving until
+    # B3_BAR_FINAL. Streaming engines ingest only these: once pushed, a bar
+    # is never revisited.
+    local = (now or datetime.now(timezone.utc)).astimezone(BRT)
+    today = local.date().isoformat()
+    find = bisect.bisect_right if local.time() >= B3_BAR_FINAL else bisect.bisect_left
+    return points[:find(points, today, key=lambda p: p["date"][:10])]
+
+def policy_ttl(kind: str, fallback: int, code: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    # kind: brapi_quote | brapi_intraday | brapi_history | sgs | expectations
+    if not ADAPTIVE_TTL_ENABLED:
+        return fallback
+    now = now or datetime.now(timezone.utc)
+
+    if kind in ("brapi_quote", "brapi_intraday"):
+        if _in_session(now):
+            ttl = fallback
+        elif _post_close(now):
+            ttl = min(fallback, _ttl_until(now, next_business_moment(now, B3_BAR_FINAL)))
+        else:
+            ttl = _ttl_until(now, next_business_moment(now, B3_OPEN))
+    elif kind == "brapi_history":
+        ttl = min(fallback, _ttl_until(now, next_business_moment(now, B3_BAR_FINAL))) if _in_session(now) \
+            else _ttl_until(now, next_business_moment(now, B3_BAR_FINAL))
+    elif kind == "sgs" and code in SGS_DAILY_PUBLICATION:
+        pub = SGS_DAILY_PUBLICATION[code]
+        local = now.astimezone(BRT)
+        today_pub = _at(local.date(), pub)
+        if is_business_day(local.date()) and today_pub <= now < today_pub + timedelta(minutes=RELEASE_WINDOW_MINUTES) \
+                and not _print_seen(code, today_pub):
+            ttl = RELEASE_POLL_TTL
+        else:
+            ttl = _ttl_until(now, next_business_moment(now, pub))
+    elif kind == "sgs" and code is not None:
+        ttl = _release_ttl(now, code, release_moments(code, now), fallback)
+    elif kind == "expectations":
+        ttl = _ttl_until(now, next_business_moment(now, EXPECTATIONS_PUBLICATION))
+    else:
+        ttl = fallback
+
+    return max(ADAPTIVE_TTL_MIN, min(ADAPTIVE_TTL_MAX, ttl))
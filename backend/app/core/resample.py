@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Vectorized frequency alignment for mixed daily/monthly/quarterly series.
+# A Series is a sorted datetime64[D] index plus float64 values. Conversion to
+# a target frequency happens in two steps, both whole-array numpy ops:
+#   aggregate: bucket observations into periods (last/first/mean/sum/compound)
+#   asof:      forward-fill those period values onto the target date grid
+# Periods are labeled by their first day, which is how SGS dates monthly and
+# quarterly observations (IPCA for September is 2026-09-01).
+
+FREQS = ("D", "B", "M", "Q")
+AGGREGATIONS = ("last", "first", "mean", "sum", "compound")
+
+class Series:
+    __slots__ = ("dates", "values")
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray):
+        self.dates = dates
+        self.values = values
+
+    @classmethod
+    def from_points(cls, points: List[Dict[str, Any]], value_key: str = "value") -> "Series":
+        dates = np.array([p["date"][:10] for p in points], dtype="datetime64[D]")
+        values = np.array([p[value_key] for p in points], dtype=np.float64)
+        return cls(dates, values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def with_values(self, values: np.ndarray, start: int = 0) -> "Series":
+        return Series(self.dates[start:], values)
+
+    def last(self) -> Optional[Tuple[str, float]]:
+        finite = np.flatnonzero(np.isfinite(self.values))
+        if not len(finite):
+            return None
+        i = finite[-1]
+        return str(self.dates[i]), float(self.values[i])
+
+def asof(series: Series, dates: np.ndarray) -> np.ndarray:
+    # Latest value of `series` at or before each date (NaN before its start).
+    idx = np.searchsorted(series.dates, dates, side="right") - 1
+    out = np.full(len(dates), np.nan)
+    ok = idx >= 0
+    out[ok] = series.values[idx[ok]]
+    return out
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    # Carry the last finite value over NaN gaps (leading NaNs stay NaN).
+    ok = np.isfinite(values)
+    idx = np.where(ok, np.arange(len(values)), -1)
+    np.maximum.accumulate(idx, out=idx)
+    out = np.full(len(values), np.nan)
+    has = idx >= 0
+    out[has] = values[idx[has]]
+    return out
+
+def period_start(dates: np.ndarray, freq: str) -> np.ndarray:
+    if freq in ("D", "B"):
+        return dates
+    months = dates.astype("datetime64[M]")
+    if freq == "Q":
+        m = months.astype(np.int64)
+        months = (m - m % 3).astype("datetime64[M]")
+    return months.astype("datetime64[D]")
+
+def aggregate(series: Series, freq: str, how: str = "last") -> Series:
+    finite = np.isfinite(series.values)
+    dates, values = series.dates[finite], series.values[finite]
+    if not len(values):
+        return Series(dates, values)
+    labels = period_start(dates, freq)
+    periods, first = np.unique(labels, return_index=True)
+    if how == "last":
+        out = values[np.append(first[1:], len(values)) - 1]
+    elif how == "first":
+        out = values[first]
+    elif how == "sum":
+        out = np.add.reduceat(values, first)
+    elif how == "mean":
+        out = np.add.reduceat(values, first) / np.diff(np.append(first, len(values)))
+    elif how == "compound":
+        # percent rates per observation -> compounded percent per period
+        out = np.expm1(np.add.reduceat(np.log1p(values / 100.0), first)) * 100.0
+    else:
+        raise ValueError(f"unknown aggregation: {how}")
+    return Series(periods, out)
+
+def date_grid(start: date, end: date, freq: str) -> np.ndarray:
+    if freq in ("D", "B"):
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        return days[np.is_busday(days)] if freq == "B" else days
+    lo = period_start(np.array([start], dtype="datetime64[D]"), freq)[0].astype("datetime64[M]")
+    hi = np.datetime64(end, "M")
+    return np.arange(lo, hi + 1, 3 if freq == "Q" else 1).astype("datetime64[D]")
+
+class Frame:
+    # Aligned columns over one date grid: matrix[i] is names[i].
+    __slots__ = ("dates", "names", "matrix")
+
+    def __init__(self, dates: np.ndarray, names: List[str], matrix: np.ndarray):
+        self.dates = dates
+        self.names = names
+        self.matrix = matrix
+
+    def slice(self, start: Optional[date], end: Optional[date]) -> "Frame":
+        lo = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left") if start else 0
+        hi = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right") if end else len(self.dates)
+        return Frame(self.dates[lo:hi], self.names, self.matrix[:, lo:hi])
+
+    def to_json(self) -> Dict[str, Any]:
+        columns = {}
+        for name, row in zip(self.names, self.matrix):
+            columns[name] = [None if v != v else v for v in row.tolist()]
+        return {"n": len(self.dates), "dates": np.datetime_as_string(self.dates).tolist(), "columns": columns}
+
+    def to_columnar(self) -> Dict[str, Any]:
+        # Same wire layout as app.core.columnar: int64/float64 little-endian.
+        t = self.dates.astype("datetime64[s]").astype("<i8")
+        cols = self.matrix.astype("<f8")
+        return {"n": len(self.dates), "t": t.tobytes(), "columns": {n: cols[i].tobytes() for i, n in enumerate(self.names)}}
+
+def align(series: Dict[str, Series], freq: str, start: date, end: date, how: Optional[Dict[str, str]] = None) -> Frame:
+    # Every column on one grid in one pass: bucket each series to `freq`
+    # (no-op for series already at or below it), then forward-fill onto the grid.
+    how = how or {}
+    grid = date_grid(start, end, freq)
+    names = list(series)
+    matrix = np.empty((len(names), len(grid)))
+    for i, name in enumerate(names):
+        matrix[i] = asof(aggregate(series[name], freq, how.get(name, "last")), grid)
+    return Frame(grid, names, matrix)
+
+def validate_freq(freq: str) -> Optional[str]:
+    if freq not in FREQS:
+        return f"freq must be one of {', '.join(FREQS)}"
+    return None
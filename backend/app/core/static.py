@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi.responses import Response
+
+from app.core.config import FRONTEND_DIST_DIR, STATIC_MAX_AGE
+
+# The Vite build (dist/public) served in-process. Files are read once at
+# startup, together with any .br/.gz siblings written by
+# scripts/precompress.py, so a request is a dict lookup plus header picks.
+# Vite's hashed bundle names (assets/index-6sdAmJTA.js) never change
+# content, so those are cached as immutable; index.html is always revalidated.
+
+HASHED_RE = re.compile(r"[-.][A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+INDEX_CACHE = "no-cache"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+class StaticAsset:
+    __slots__ = ("media_type", "cache_control", "etag", "bodies")
+
+    def __init__(self, media_type: str, cache_control: str, etag: str, bodies: Dict[str, bytes]) -> None:
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = etag
+        # "identity" plus whichever precompressed variants exist
+        self.bodies = bodies
+
+    def pick(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.bodies and encoding in accepted:
+                return encoding, self.bodies[encoding]
+        return "identity", self.bodies["identity"]
+
+def parse_accept_encoding(raw: Optional[str]) -> set:
+    out = set()
+    for part in (raw or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        out.add(name)
+    return out
+
+def _cache_control(rel: str) -> str:
+    if rel == "index.html":
+        return INDEX_CACHE
+    if rel.startswith("assets/") and HASHED_RE.search(rel):
+        return IMMUTABLE_CACHE
+    return f"public, max-age={STATIC_MAX_AGE}"
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+class StaticSite:
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return "index.html" in self.assets
+
+    def load(self) -> int:
+        assets: Dict[str, StaticAsset] = {}
+        if os.path.isdir(self.root):
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for name in filenames:
+                    if name.startswith(".") or name.endswith((".br", ".gz")):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    assets[rel] = self._asset(rel, path)
+        self.assets = assets
+        return len(assets)
+
+    def _asset(self, rel: str, path: str) -> StaticAsset:
+        raw = _read(path)
+        bodies = {"identity": raw}
+        for encoding, suffix in ENCODINGS:
+            # only trust variants built from the current file
+            if os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= os.path.getmtime(path):
+                bodies[encoding] = _read(path + suffix)
+        media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+            media_type += "; charset=utf-8"
+        etag = '"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+        return StaticAsset(media_type, _cache_control(rel), etag, bodies)
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path.lstrip("/") or "index.html")
+
+    def index(self) -> Optional[StaticAsset]:
+        return self.assets.get("index.html")
+
+SITE = StaticSite(FRONTEND_DIST_DIR)
+
+def encoded_response(body: bytes, encoding: str, etag: str, cache_control: str, media_type: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, headers=headers, media_type=media_type)
+
+def static_response(asset: StaticAsset, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+    encoding, body = asset.pick(accept_encoding)
+    etag = asset.etag if encoding == "identity" else f'{asset.etag[:-1]}-{encoding}"'
+    return encoded_response(body, encoding, etag, asset.cache_control, asset.media_type, if_none_match)
+
+def looks_like_file(path: str) -> bool:
+    # /assets/missing.js should 404, /indicators/selic should get the SPA shell
+    return "." in path.rsplit("/", 1)[-1]
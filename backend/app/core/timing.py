@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import re
+import threading
+import time
+
+class RequestTimings:
+    # Collected from the request thread and its executor workers (which get a
+    # copy of the request context), so updates go through a lock.
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.phases: Dict[str, float] = {}
+
+    def add_source(self, key: str, fetch_ms: float, wait_ms: float, hit: bool) -> None:
+        with self.lock:
+            self.sources[key] = {"fetch_ms": round(fetch_ms, 2), "wait_ms": round(wait_ms, 2), "hit": hit}
+
+    def add_phase(self, name: str, ms: float) -> None:
+        with self.lock:
+            self.phases[name] = round(self.phases.get(name, 0.0) + ms, 2)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def as_meta(self) -> Dict[str, Any]:
+        with self.lock:
+            out: Dict[str, Any] = {"sources": dict(self.sources)}
+            out.update({f"{k}_ms": v for k, v in self.phases.items()})
+            return out
+
+    def server_timing(self) -> str:
+        parts: List[str] = []
+        with self.lock:
+            for key, t in self.sources.items():
+                name = _token(key)
+                parts.append(f'fetch-{name};dur={t["fetch_ms"]}')
+                if t["wait_ms"]:
+                    parts.append(f'wait-{name};dur={t["wait_ms"]}')
+            for k, v in self.phases.items():
+                parts.append(f"{_token(k)};dur={v}")
+        parts.append(f"total;dur={round(self.elapsed_ms(), 2)}")
+        return ", ".join(parts)
+
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+def _token(s: str) -> str:
+    return _TOKEN_RE.sub("_", s)
+
+_TIMINGS: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+# Upstream wait time (rate limiter + host slot) accrued by the current source.
+_SOURCE_WAIT: ContextVar[Optional[List[float]]] = ContextVar("source_wait", default=None)
+
+def start_request_timings() -> RequestTimings:
+    t = RequestTimings()
+    _TIMINGS.set(t)
+    return t
+
+def current_timings() -> Optional[RequestTimings]:
+    return _TIMINGS.get()
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, t0)
+
+def record_phase(name: str, started: float) -> None:
+    # started is a time.perf_counter() reading
+    t = _TIMINGS.get()
+    if t is not None:
+        t.add_phase(name, (time.perf_counter() - started) * 1000.0)
+
+@contextmanager
+def timed_source(key: str) -> Iterator[Dict[str, Any]]:
+    # Yields a dict the caller can mark with "hit"; fetch_ms excludes waits.
+    info: Dict[str, Any] = {"hit": False}
+    waits: List[float] = []
+    token = _SOURCE_WAIT.set(waits)
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        _SOURCE_WAIT.reset(token)
+        t = _TIMINGS.get()
+        if t is not None:
+            wait_ms = sum(waits)
+            t.add_source(key, (time.perf_counter() - t0) * 1000.0 - wait_ms, wait_ms, info["hit"])
+
+def add_wait(ms: float) -> None:
+    waits = _SOURCE_WAIT.get()
+    if waits is not None:
+        waits.append(ms)
+
+def submit_with_context(executor: Executor, fn: Callable[..., Any], *args: Any) -> Future:
+    # Pool threads don't inherit context vars; give each task its own copy of
+    # the caller's context (a Context can't be entered by two threads at once).
+    return executor.submit(copy_context().run, fn, *args)
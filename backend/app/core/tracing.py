@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from app.core.config import (
+    TRACE_EXPORT_INTERVAL, TRACE_EXPORTER, TRACE_FILE, TRACE_OTLP_ENDPOINT,
+    TRACE_QUEUE_SIZE, TRACE_SAMPLE_RATIO, TRACE_SERVICE_NAME,
+)
+
+TRACING_ENABLED = TRACE_EXPORTER in ("file", "otlp")
+
+# OTLP SpanKind values
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "sampled", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attr(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        v = {"boolValue": value}
+    elif isinstance(value, int):
+        v = {"intValue": str(value)}
+    elif isinstance(value, float):
+        v = {"doubleValue": value}
+    else:
+        v = {"stringValue": str(value)}
+    return {"key": key, "value": v}
+
+class BatchExporter:
+    # Finished spans go to a bounded queue (dropped when full, never blocking a
+    # request); a daemon thread ships them in batches.
+    def __init__(self, exporter: str):
+        self.exporter = exporter
+        self.queue: "queue.Queue[Span]" = queue.Queue(maxsize=max(1, TRACE_QUEUE_SIZE))
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(TRACE_EXPORT_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        spans: List[Span] = []
+        while True:
+            try:
+                spans.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not spans:
+            return
+        envelope = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }
+        try:
+            if self.exporter == "file":
+                os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(envelope, separators=(",", ":")) + "\n")
+            else:
+                import requests
+                requests.post(f"{TRACE_OTLP_ENDPOINT}/v1/traces", json=envelope, timeout=5)
+        except Exception as e:
+            print(f"Error exporting {len(spans)} spans: {e}")
+
+EXPORTER = BatchExporter(TRACE_EXPORTER) if TRACING_ENABLED else None
+
+_CURRENT: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+def _finish(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    if span.sampled and EXPORTER is not None:
+        EXPORTER.submit(span)
+
+@contextmanager
+def root_span(name: str, traceparent: Optional[str] = None, kind: int = KIND_SERVER) -> Iterator[Optional[Span]]:
+    # Parent-based sampling: honour an incoming W3C traceparent, otherwise
+    # sample TRACE_SAMPLE_RATIO of new traces. Unsampled traces still set a
+    # (non-recording) span so children skip all work with one check.
+    if not TRACING_ENABLED:
+        yield None
+        return
+    m = _TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    if m:
+        trace_id, parent_id, sampled = m.group(1), m.group(2), bool(int(m.group(3), 16) & 1)
+    else:
+        trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, random.random() < TRACE_SAMPLE_RATIO
+
+    span = Span(name, trace_id, parent_id, kind, sampled)
+    token = _CURRENT.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        _CURRENT.reset(token)
+        _finish(span)
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL) -> Optional[Tuple[Span, Token]]:
+    parent = _CURRENT.get()
+    if parent is None or not parent.sampled:
+        return None
+    s = Span(name, parent.trace_id, parent.span_id, kind, True)
+    for k, v in (attributes or {}).items():
+        s.set(k, v)
+    return s, _CURRENT.set(s)
+
+def end_span(handle: Optional[Tuple[Span, Token]], error: Optional[BaseException] = None) -> None:
+    if handle is None:
+        return
+    s, token = handle
+    if error is not None:
+        s.error = type(error).__name__
+    _CURRENT.reset(token)
+    _finish(s)
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL) -> Iterator[Optional[Span]]:
+    handle = start_span(name, attributes, kind)
+    if handle is None:
+        yield None
+        return
+    try:
+        yield handle[0]
+    except BaseException as e:
+        end_span(handle, e)
+        raise
+    end_span(handle)
+
+def set_attr(span_: Optional[Span], key: str, value: Any) -> None:
+    if span_ is not None:
+        span_.set(key, value)
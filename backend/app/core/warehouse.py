@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app.core.config import WAREHOUSE_ENABLED, WAREHOUSE_PATH
+
+# Local SQLite store for upstream history: one date-keyed table per SGS code
+# (sgs_<code>) and per Olinda endpoint (olinda_<endpoint>). series_meta tracks,
+# per SGS code, the span we hold without gaps:
+#   covered_from .. last_obs
+# Reads inside that span never go upstream; only [last_obs, today] does.
+# Backfill jobs (app.services.backfill) keep their resume points in checkpoints.
+
+FAR_PAST = "0001-01-01"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series_meta (
+    name TEXT PRIMARY KEY,
+    covered_from TEXT,
+    last_obs TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job TEXT PRIMARY KEY,
+    cursor TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+"""
+
+# Olinda fields we keep, as (column, Olinda name, SQL type)
+OLINDA_COLUMNS = [
+    ("indicador", "Indicador", "TEXT NOT NULL"),
+    ("date", "Data", "TEXT NOT NULL"),
+    ("suavizada", "Suavizada", "TEXT NOT NULL"),
+    ("base_calculo", "baseCalculo", "INTEGER NOT NULL"),
+    ("media", "Media", "REAL"),
+    ("mediana", "Mediana", "REAL"),
+    ("minimo", "Minimo", "REAL"),
+    ("maximo", "Maximo", "REAL"),
+    ("respondentes", "numeroRespondentes", "INTEGER"),
+]
+OLINDA_KEY = ("indicador", "date", "suavizada", "base_calculo")
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+def _olinda_table(endpoint: str) -> str:
+    if not _NAME_RE.match(endpoint):
+        raise ValueError(f"invalid Olinda endpoint name: {endpoint!r}")
+    return f"olinda_{endpoint}"
+
+def _sgs_table(code: int) -> str:
+    return f"sgs_{int(code)}"
+
+def _day_before(iso: str) -> str:
+    return (date.fromisoformat(iso) - timedelta(days=1)).isoformat()
+
+class Warehouse:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # SQLite allows one writer; serializing here avoids busy retries.
+        self._write_lock = threading.Lock()
+        self._tables: set = set()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _ensure(self, conn: sqlite3.Connection, table: str, ddl: str) -> None:
+        if table not in self._tables:
+            conn.execute(ddl)
+            self._tables.add(table)
+
+    # SGS
+
+    def _sgs(self, code: int) -> Tuple[sqlite3.Connection, str]:
+        conn = self._conn()
+        table = _sgs_table(code)
+        self._ensure(conn, table, f"CREATE TABLE IF NOT EXISTS {table} (date TEXT PRIMARY KEY, value REAL NOT NULL) WITHOUT ROWID")
+        return conn, table
+
+    def sgs_meta(self, code: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT covered_from, last_obs, synced_at FROM series_meta WHERE name = ?", (_sgs_table(code),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"covered_from": row[0], "last_obs": row[1], "synced_at": row[2]}
+
+    def sgs_upsert(self, code: int, points: List[Dict[str, Any]], window: Optional[Tuple[date, date]] = None) -> None:
+        # `window` is the range the points were fetched for: complete, so it
+        # extends coverage when it touches what we already hold.
+        conn, table = self._sgs(code)
+        name = _sgs_table(code)
+        with self._write_lock, conn:
+            if points:
+                conn.executemany(f"INSERT OR REPLACE INTO {table} (date, value) VALUES (?, ?)", [(p["date"], p["value"]) for p in points])
+            meta = self.sgs_meta(code)
+            covered_from = meta["covered_from"] if meta else None
+            if window is not None:
+                start, end = window[0].isoformat(), window[1].isoformat()
+                if covered_from is None or (start < covered_from and end >= _day_before(covered_from)):
+                    covered_from = start
+            last = conn.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO series_meta (name, covered_from, last_obs, synced_at) VALUES (?, ?, ?, ?)",
+                (name, covered_from, last, time.time()),
+            )
+
+    def sgs_mark_complete(self, code: int) -> None:
+        # Backfill reached the first observation: any earlier start is covered.
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("UPDATE series_meta SET covered_from = ? WHERE name = ?", (FAR_PAST, _sgs_table(code)))
+
+    def sgs_range(self, code: int, start: date, end: date) -> List[Dict[str, Any]]:
+        conn, table = self._sgs(code)
+        rows = conn.execute(
+            f"SELECT date, value FROM {table} WHERE date >= ? AND date <= ? ORDER BY date",
+            (start.isoformat(), end.isoformat()),
+        ).fetchall()
+        return [{"date": d, "value": v} for d, v in rows]
+
+    # Olinda
+
+    def _olinda(self, endpoint: str) -> Tuple[sqlite3.Connection, str]:
+        conn = self._conn()
+        table = _olinda_table(endpoint)
+        cols = ", ".join(f"{c} {t}" for c, _, t in OLINDA_COLUMNS)
+        self._ensure(conn, table, f"CREATE TABLE IF NOT EXISTS {table} ({cols}, PRIMARY KEY ({', '.join(OLINDA_KEY)})) WITHOUT ROWID")
+        return conn, table
+
+    def olinda_upsert(self, endpoint: str, rows: Iterable[Dict[str, Any]]) -> int:
+        conn, table = self._olinda(endpoint)
+        values = []
+        for row in rows:
+            if not row.get("Indicador") or not row.get("Data"):
+                continue
+            values.append((
+                row["Indicador"], str(row["Data"])[:10], str(row.get("Suavizada") or ""), int(row.get("baseCalculo") or 0),
+                row.get("Media"), row.get("Mediana"), row.get("Minimo"), row.get("Maximo"), row.get("numeroRespondentes"),
+            ))
+        if not values:
+            return 0
+        marks = ", ".join("?" for _ in OLINDA_COLUMNS)
+        with self._write_lock, conn:
+            conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({marks})", values)
+        return len(values)
+
+    def olinda_last_date(self, endpoint: str, indicador: str) -> Optional[str]:
+        conn, table = self._olinda(endpoint)
+        return conn.execute(f"SELECT MAX(date) FROM {table} WHERE indicador = ?", (indicador,)).fetchone()[0]
+
+    def olinda_latest(self, endpoint: str, indicador: str, limit: int) -> List[Dict[str, Any]]:
+        # Newest first, in Olinda's own field names so parsers don't care
+        # where the rows came from.
+        conn, table = self._olinda(endpoint)
+        rows = conn.execute(
+            f"SELECT * FROM {table} WHERE indicador = ? ORDER BY date DESC, base_calculo ASC LIMIT ?", (indicador, limit)
+        ).fetchall()
+        return [{name: v for (_, name, _), v in zip(OLINDA_COLUMNS, row)} for row in rows]
+
+    # Backfill checkpoints
+
+    def checkpoint(self, job: str) -> Tuple[Optional[str], bool]:
+        row = self._conn().execute("SELECT cursor, done FROM checkpoints WHERE job = ?", (job,)).fetchone()
+        if row is None:
+            return None, False
+        return row[0], bool(row[1])
+
+    def set_checkpoint(self, job: str, cursor: Optional[str], done: bool = False) -> None:
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job, cursor, done, updated_at) VALUES (?, ?, ?, ?)",
+                (job, cursor, int(done), time.time()),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND (name LIKE 'sgs_%' OR name LIKE 'olinda_%')")]
+        return {
+            "enabled": True,
+            "path": self.path,
+            "rows": {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables},
+            "series": {r[0]: {"covered_from": r[1], "last_obs": r[2]} for r in conn.execute("SELECT name, covered_from, last_obs FROM series_meta")},
+            "checkpoints": {r[0]: {"cursor": r[1], "done": bool(r[2])} for r in conn.execute("SELECT job, cursor, done FROM checkpoints")},
+        }
+
+WAREHOUSE: Optional[Warehouse] = Warehouse(WAREHOUSE_PATH) if WAREHOUSE_ENABLED else None
+
+def warehouse_stats() -> Dict[str, Any]:
+    return WAREHOUSE.stats() if WAREHOUSE is not None else {"enabled": False}
@@ -1,10 +1,66 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional, Tuple
+import json
+import logging
+import time
+
+import msgspec
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import (
+    ADMISSION_RETRY_AFTER, ALLOWED_ORIGINS, SCREENER_RETRY_AFTER, BATCH_MAX_SERIES, CHART_DEFAULT_POINTS, CHART_MAX_POINTS,
+    CORRELATION_MAX_TICKERS, CORRELATION_WINDOWS, EXPORT_DEFAULT_START, FRAME_MAX_SERIES, SCREENER_MAX_PAGE_SIZE,
+    BACKFILL_ENABLED, BOOTSTRAP_ENABLED, PROFILE_ADMIN_TOKEN, PROFILE_REQUESTS, VOL_MAX_TICKERS,
+)
+from app.core.admission import ADMISSION
+from app.core.auth import auth_enabled, bearer_user
+from app.core.cache import cache_stats
+from app.core.columnar import MSGPACK_MEDIA_TYPE, pack, wants_msgpack
+from app.core.executor import executor_stats, run_blocking, shutdown_executor
+from app.core.history import HISTORY, parse_at, ts_to_iso
+from app.core.http import http_cache_stats
+from app.core.profiler import SamplingProfiler
+from app.core.resample import validate_freq
+from app.core.ratelimit import limiter_stats
+from app.core.static import SITE, encoded_response, looks_like_file, static_response
+from app.core.timing import current_timings, start_request_timings
+from app.core.tracing import root_span, set_attr, span
+from app.core.warehouse import warehouse_stats
+from app.models.homepage import HomepagePayload, encode_payload
+from app.services.anomaly import ENGINE as ANOMALY, significance
+from app.services.backfill import BACKFILLER
+from app.services.bootstrap import RENDERER as INDEX_RENDERER, bootstrap_snapshot
+from app.services.charts import build_chart, validate_chart_params
+from app.services.correlation import build_correlation_matrix
+from app.services.export import EXPORT_FORMATS, export_filename, iter_export
+from app.services.frames import FRAME_SERIES, build_frame, frame_stats, validate_frame_series
+from app.services.homepage import (
+    FIELDS as HOMEPAGE_FIELDS, SECTIONS as HOMEPAGE_SECTIONS, SIGNALS as HOMEPAGE_SIGNALS, SectionResult,
+    build_homepage_fields, build_homepage_payload, current_snapshot, snapshot_view, sort_what_changed, validate_fields,
+)
+from app.services.screener import SCREENER, SORT_KEYS as SCREENER_SORT_KEYS
+from app.services.series import build_series_batch, default_range, iter_series_batch
+from app.services.volatility import build_volatility
+from app.services.watchlists import POLLER, STORE as WATCHLISTS, WatchlistError, watchlist_stats, watchlist_view
+
+logger = logging.getLogger(__name__)
 
-from app.core.config import ALLOWED_ORIGINS
-from app.services.homepage import build_homepage_payload
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    SITE.load()
+    POLLER.start()
+    if BACKFILL_ENABLED:
+        BACKFILLER.start()
+    yield
+    POLLER.stop()
+    BACKFILLER.stop()
+    shutdown_executor()
 
-app = FastAPI(title="Fundamentos Economicos API", version="1.0.0")
+app = FastAPI(title="Fundamentos Economicos API", version="1.0.0", lifespan=lifespan)
 
 # CORS
 # Allow all origins for simplicity in this deployment setup
@@ -17,10 +73,354 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Monitoring stays reachable when the API is saturated
+ADMISSION_EXEMPT = ("/health", "/api/status/upstream")
+
+HOMEPAGE_PREFIX = "/api/homepage/v1"
+
+def _snapshot_request(request: Request) -> Optional[Tuple[Optional[List[str]], Optional[str]]]:
+    # (fields, sort) of a valid homepage request the snapshot can answer;
+    # None when only the live routes can (history, bad parameters, ...).
+    path, params = request.url.path, request.query_params
+    sort = params.get("sort")
+    if sort not in (None, "significance") or "at" in params:
+        return None
+    if path == HOMEPAGE_PREFIX:
+        if "fields" not in params:
+            return None, sort
+        fields = _split_csv(params["fields"])
+    elif path.startswith(HOMEPAGE_PREFIX + "/signals/"):
+        fields = ["signals." + path[len(HOMEPAGE_PREFIX + "/signals/"):]]
+    elif path.startswith(HOMEPAGE_PREFIX + "/"):
+        fields = [path[len(HOMEPAGE_PREFIX + "/"):]]
+    else:
+        return None
+    if not fields or validate_fields(fields):
+        return None
+    return fields, sort
+
+class AdmissionMiddleware:
+    # Plain ASGI rather than @app.middleware: the slot is held until the app
+    # has sent the last body chunk, so streamed exports and batches count
+    # for as long as they actually run.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/") or path in ADMISSION_EXEMPT:
+            await self.app(scope, receive, send)
+            return
+        # With a snapshot to fall back on, homepage requests never queue.
+        view = _snapshot_request(Request(scope)) if path.startswith(HOMEPAGE_PREFIX) else None
+        snapshot = current_snapshot() if view is not None else None
+        waited = await ADMISSION.acquire(wait=snapshot is None)
+        if waited is None:
+            if snapshot is not None:
+                body = snapshot_view(snapshot, *view)
+                response = Response(body, media_type="application/json", headers={"Cache-Control": "no-store", "X-Load-Shed": "snapshot"})
+            else:
+                response = JSONResponse({"detail": "server busy, retry later"}, status_code=503, headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+            await response(scope, receive, send)
+            return
+        timings = current_timings()
+        if timings is not None and waited:
+            timings.add_phase("queue", waited * 1000.0)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION.release()
+
+app.add_middleware(AdmissionMiddleware)
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    timings = start_request_timings()
+
+    profiler = None
+    if PROFILE_REQUESTS or (PROFILE_ADMIN_TOKEN and request.headers.get("x-profile") == PROFILE_ADMIN_TOKEN):
+        profiler = SamplingProfiler()
+        profiler.start()
+    try:
+        with root_span(f"{request.method} {request.url.path}", request.headers.get("traceparent")) as sp:
+            set_attr(sp, "http.request.method", request.method)
+            set_attr(sp, "url.path", request.url.path)
+            response = await call_next(request)
+            set_attr(sp, "http.response.status_code", response.status_code)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    if profiler is not None:
+        # writing the profile is file I/O: keep it off the event loop
+        try:
+            response.headers["X-Profile-File"] = await run_blocking(profiler.save, request.url.path)
+        except OSError:
+            logger.exception("Error saving profile for %s", request.url.path)
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+def _json_with_timings(payload: HomepagePayload) -> Response:
+    # meta.timings is final before the single encode, so it covers everything
+    # up to serialization; the serialize phase itself only reaches the
+    # Server-Timing header.
+    timings = current_timings()
+    out = msgspec.structs.replace(payload, meta=msgspec.structs.replace(
+        payload.meta, timings=timings.as_meta() if timings is not None else None,
+    ))
+
+    t0 = time.perf_counter()
+    with span("homepage.serialize"):
+        body = encode_payload(out)
+    if timings is not None:
+        timings.add_phase("serialize", (time.perf_counter() - t0) * 1000.0)
+    return Response(body, media_type="application/json")
+
+def _split_csv(raw: str) -> List[str]:
+    seen = []
+    for part in raw.split(","):
+        part = part.strip()
+        if part and part not in seen:
+            seen.append(part)
+    return seen
+
+def _parse_date(raw: Optional[str], name: str) -> Optional[date]:
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"invalid {name}: expected YYYY-MM-DD")
+
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/api/status/upstream")
+def upstream_status():
+    return {
+        "admission": ADMISSION.stats(),
+        "providers": limiter_stats(), "cache": cache_stats(), "http_cache": http_cache_stats(),
+        "watchlists": watchlist_stats(), "executor": executor_stats(),
+        "warehouse": dict(warehouse_stats(), backfill=BACKFILLER.stats()),
+        "frames": frame_stats(),
+        "anomaly": ANOMALY.stats(),
+        "screener": SCREENER.stats(),
+    }
+
+def _section_response(result: SectionResult, request: Request) -> Response:
+    return encoded_response(result.body, "identity", result.etag, result.cache_control, "application/json", request.headers.get("if-none-match"))
+
 @app.get("/api/homepage/v1")
-def homepage_v1():
-    return build_homepage_payload()
+async def homepage_v1(request: Request, at: Optional[str] = None, sort: Optional[str] = None, fields: Optional[str] = None):
+    # sort=significance orders what_changed_today by |z-score|, unscored last
+    if sort not in (None, "significance"):
+        raise HTTPException(status_code=400, detail="sort must be 'significance'")
+    if fields is not None:
+        # fields=top_cards,signals.real_rate_approx builds only those sections
+        if at:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with at")
+        selected = _split_csv(fields)
+        error = validate_fields(selected) if selected else f"fields must list some of {HOMEPAGE_FIELDS}"
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        return _section_response(await build_homepage_fields(selected, sort), request)
+    if at:
+        ts = parse_at(at)
+        if ts is None:
+            raise HTTPException(status_code=400, detail="invalid at: expected ISO 8601 datetime")
+        found = await run_blocking(HISTORY.at, ts)
+        if found is None:
+            raise HTTPException(status_code=404, detail="no payload recorded at or before that time")
+        recorded_ts, payload = found
+        payload.setdefault("meta", {})["history"] = {"requested_at": ts_to_iso(ts), "recorded_at": ts_to_iso(recorded_ts)}
+        if sort:
+            payload["what_changed_today"] = sorted(payload.get("what_changed_today") or [], key=lambda i: significance(i.get("zscore")))
+        return payload
+    payload = await build_homepage_payload()
+    if sort:
+        payload = msgspec.structs.replace(payload, what_changed_today=sort_what_changed(payload.what_changed_today))
+    return _json_with_timings(payload)
+
+@app.get("/api/homepage/v1/signals/{name}")
+async def homepage_signal(name: str, request: Request):
+    if name not in HOMEPAGE_SIGNALS:
+        raise HTTPException(status_code=404, detail=f"unknown signal; available: {list(HOMEPAGE_SIGNALS)}")
+    return _section_response(await build_homepage_fields([f"signals.{name}"]), request)
+
+@app.get("/api/homepage/v1/{section}")
+async def homepage_section(section: str, request: Request, sort: Optional[str] = None):
+    if section not in HOMEPAGE_SECTIONS and section != "signals":
+        raise HTTPException(status_code=404, detail=f"unknown section; available: {list(HOMEPAGE_SECTIONS) + ['signals']}")
+    if sort not in (None, "significance"):
+        raise HTTPException(status_code=400, detail="sort must be 'significance'")
+    return _section_response(await build_homepage_fields([section], sort), request)
+
+@app.get("/api/series/batch")
+def series_batch(
+    sgs: str = "", brapi: str = "", start: Optional[str] = None, end: Optional[str] = None,
+    stream: bool = False, format: Optional[str] = None, accept: Optional[str] = Header(default=None),
+):
+    try:
+        sgs_codes = [int(x) for x in _split_csv(sgs)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="sgs must be a comma-separated list of integer codes")
+    tickers = [t.upper() for t in _split_csv(brapi)]
+
+    if not sgs_codes and not tickers:
+        raise HTTPException(status_code=400, detail="pass at least one sgs code or brapi ticker")
+    if len(sgs_codes) + len(tickers) > BATCH_MAX_SERIES:
+        raise HTTPException(status_code=400, detail=f"at most {BATCH_MAX_SERIES} series per batch")
+
+    start_d, end_d = default_range(_parse_date(start, "start"), _parse_date(end, "end"))
+    if start_d > end_d:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    if stream:
+        # One NDJSON line per series, in completion order.
+        lines = (json.dumps(item) + "\n" for item in iter_series_batch(sgs_codes, tickers, start_d, end_d))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    if wants_msgpack(accept, format):
+        return Response(pack(build_series_batch(sgs_codes, tickers, start_d, end_d, columnar=True)), media_type=MSGPACK_MEDIA_TYPE)
+    return build_series_batch(sgs_codes, tickers, start_d, end_d)
+
+@app.get("/api/correlation")
+def correlation(tickers: str = "", windows: str = ""):
+    extra = [t.upper() for t in _split_csv(tickers)]
+    if len(extra) > CORRELATION_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"at most {CORRELATION_MAX_TICKERS} extra tickers")
+    try:
+        wins = [int(w) for w in _split_csv(windows)] or list(CORRELATION_WINDOWS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows must be a comma-separated list of integers")
+    unknown = [w for w in wins if w not in CORRELATION_WINDOWS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"supported windows: {CORRELATION_WINDOWS}")
+    return build_correlation_matrix(extra, wins)
+
+@app.get("/api/volatility")
+def volatility(tickers: str = "^BVSP,USDBRL"):
+    names = [t.upper() for t in _split_csv(tickers)]
+    if not names:
+        raise HTTPException(status_code=400, detail="pass at least one ticker")
+    if len(names) > VOL_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"at most {VOL_MAX_TICKERS} tickers")
+    return build_volatility(names)
+
+@app.get("/api/chart/{ticker}")
+def chart(
+    ticker: str, range: str = "1y", interval: str = "1d", points: int = CHART_DEFAULT_POINTS,
+    format: Optional[str] = None, accept: Optional[str] = Header(default=None),
+):
+    error = validate_chart_params(range, interval)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    if points < 3 or points > CHART_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be between 3 and {CHART_MAX_POINTS}")
+    if wants_msgpack(accept, format):
+        return Response(pack(build_chart(ticker.upper(), range, interval, points, columnar=True)), media_type=MSGPACK_MEDIA_TYPE)
+    return build_chart(ticker.upper(), range, interval, points)
+
+@app.get("/api/series/sgs/{code}/export")
+def export_sgs(code: int, format: str = "ndjson", start: Optional[str] = None, end: Optional[str] = None):
+    fmt = format.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    start_d = _parse_date(start, "start") or date.fromisoformat(EXPORT_DEFAULT_START)
+    end_d = _parse_date(end, "end") or date.today()
+    if start_d > end_d:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    headers = {"Content-Disposition": f'attachment; filename="{export_filename(code, start_d, end_d, fmt)}"'}
+    return StreamingResponse(iter_export(code, start_d, end_d, fmt), media_type=EXPORT_FORMATS[fmt], headers=headers)
+
+@app.get("/api/frames")
+def frames(
+    series: str = "", freq: str = "D", start: Optional[str] = None, end: Optional[str] = None,
+    format: Optional[str] = None, accept: Optional[str] = Header(default=None),
+):
+    names = _split_csv(series)
+    if not names:
+        raise HTTPException(status_code=400, detail=f"pass at least one series: {FRAME_SERIES}")
+    if len(names) > FRAME_MAX_SERIES:
+        raise HTTPException(status_code=400, detail=f"at most {FRAME_MAX_SERIES} series per frame")
+    error = validate_frame_series(names) or validate_freq(freq.upper())
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    start_d, end_d = _parse_date(start, "start"), _parse_date(end, "end")
+    if start_d and end_d and start_d > end_d:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    frame, meta = build_frame(names, freq.upper(), start_d, end_d)
+    if wants_msgpack(accept, format):
+        return Response(pack({**frame.to_columnar(), "meta": meta}), media_type=MSGPACK_MEDIA_TYPE)
+    return {**frame.to_json(), "meta": meta}
+
+@app.get("/api/screener")
+def screener(sort: str = "change_1d", order: str = "desc", page: int = 1, page_size: int = 50):
+    if sort not in SCREENER_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(SCREENER_SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if page < 1 or page_size < 1 or page_size > SCREENER_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"page must be >= 1 and page_size between 1 and {SCREENER_MAX_PAGE_SIZE}")
+    result = SCREENER.result()
+    if result is None:
+        raise HTTPException(status_code=503, detail="screener is building, retry later", headers={"Retry-After": str(SCREENER_RETRY_AFTER)})
+    return result.page(sort, order == "desc", page, page_size)
+
+class WatchlistIn(BaseModel):
+    tickers: List[str]
+
+def _require_user(user_id: str, authorization: Optional[str]) -> None:
+    # A watchlist is only reachable with a token issued for its user.
+    if not auth_enabled():
+        raise HTTPException(status_code=503, detail="watchlists need AUTH_SECRET to be configured")
+    caller = bearer_user(authorization)
+    if caller is None:
+        raise HTTPException(status_code=401, detail="missing or invalid bearer token", headers={"WWW-Authenticate": "Bearer"})
+    if caller != user_id:
+        raise HTTPException(status_code=403, detail="token does not belong to this user")
+
+@app.put("/api/watchlists/{user_id}")
+def put_watchlist(user_id: str, body: WatchlistIn, authorization: Optional[str] = Header(default=None)):
+    _require_user(user_id, authorization)
+    try:
+        WATCHLISTS.put(user_id, body.tickers)
+    except WatchlistError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return watchlist_view(user_id)
+
+@app.get("/api/watchlists/{user_id}")
+def get_watchlist(user_id: str, authorization: Optional[str] = Header(default=None)):
+    _require_user(user_id, authorization)
+    view = watchlist_view(user_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="watchlist not found")
+    return view
+
+@app.delete("/api/watchlists/{user_id}")
+def delete_watchlist(user_id: str, authorization: Optional[str] = Header(default=None)):
+    _require_user(user_id, authorization)
+    if not WATCHLISTS.delete(user_id):
+        raise HTTPException(status_code=404, detail="watchlist not found")
+    return {"ok": True}
+
+# Built frontend. Registered last so every /api route above wins; anything
+# else that isn't a file gets the SPA shell and is routed client-side.
+@app.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend(path: str, request: Request):
+    if path.startswith("api/") or not SITE.enabled:
+        raise HTTPException(status_code=404, detail="not found")
+    asset = SITE.lookup(path)
+    if asset is None:
+        if looks_like_file(path):
+            raise HTTPException(status_code=404, detail="not found")
+        asset = SITE.index()
+    if asset is SITE.index() and BOOTSTRAP_ENABLED:
+        snapshot, stale = await bootstrap_snapshot()
+        if snapshot is not None:
+            encoding, body, etag = INDEX_RENDERER.render(asset, snapshot, request.headers.get("accept-encoding"), stale)
+            return encoded_response(body, encoding, etag, asset.cache_control, asset.media_type, request.headers.get("if-none-match"))
+    return static_response(asset, request.headers.get("accept-encoding"), request.headers.get("if-none-match"))
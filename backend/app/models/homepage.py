@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+import msgspec
+
+# Wire contract for /api/homepage/v1. Structs encode straight to JSON bytes
+# without an intermediate dict; optional fields are dropped when unset.
+# frontend/shared/homepage.schema.json and the client's Zod schemas
+# (frontend/shared/homepage.zod.ts) are generated from these
+# (scripts/gen_homepage_schema.py); run it after changing a field.
+
+class TopCard(msgspec.Struct):
+    key: str
+    label: str
+    value: Optional[float]
+    unit: str
+    change_1d: Optional[float]
+    change_1d_unit: str
+    last_update: str
+
+class WhatChangedItem(msgspec.Struct, omit_defaults=True):
+    key: str
+    label: str
+    value: Optional[float]
+    unit: str
+    last_update: Optional[str]
+    period_label: str
+    extra: Optional[Dict[str, Any]] = None
+    # how unusual the move is vs. the series' recent moves (app.services.anomaly)
+    zscore: Optional[float] = None
+    percentile: Optional[float] = None
+
+class SignalItem(msgspec.Struct, omit_defaults=True):
+    key: str
+    label: str
+    value: Optional[float]
+    unit: str
+    last_update: str
+    source: Optional[str] = None
+    method: Optional[str] = None
+    components: Optional[Dict[str, Optional[float]]] = None
+    cache: Optional[Dict[str, Any]] = None
+    extra: Optional[Dict[str, Any]] = None
+
+class Signals(msgspec.Struct):
+    real_rate_approx: SignalItem
+    inflation_expectations_12m: SignalItem
+    ibov_vol_20d_annualized: SignalItem
+    usdbrl_vol_20d_annualized: SignalItem
+    unemployment_latest: SignalItem
+    gdp_latest: SignalItem
+
+class Meta(msgspec.Struct, omit_defaults=True):
+    generated_at: str
+    stale: bool
+    sources: Dict[str, Any]
+    timings: Any = None
+    history: Optional[Dict[str, str]] = None
+
+class HomepagePayload(msgspec.Struct):
+    top_cards: List[TopCard]
+    what_changed_today: List[WhatChangedItem]
+    signals: Signals
+    meta: Meta
+
+_ENCODER = msgspec.json.Encoder()
+
+def encode_payload(payload: Union[HomepagePayload, Dict[str, Any]]) -> bytes:
+    # also takes partial payloads: dicts of sections (Structs) plus meta
+    return _ENCODER.encode(payload)
+
+def payload_to_dict(payload: HomepagePayload) -> Dict[str, Any]:
+    return msgspec.to_builtins(payload)
+
+def homepage_schema() -> Dict[str, Any]:
+    return msgspec.json.schema(HomepagePayload)
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import Any, Dict, List, Optional
+
 import requests
 
-from app.core.config import BRAPI_TOKEN, REQUEST_TIMEOUT
+from app.core.config import BRAPI_TOKEN
+from app.core.http import http_get_json
 
 BRAPI_BASE = "https://brapi.dev/api"
 
@@ -22,6 +24,22 @@ def safe_float(x: Any) -> Optional[float]:
     except Exception:
         return None
 
+def parse_brapi_quote(x: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    value = safe_float(x.get("regularMarketPrice"))
+    change_abs = safe_float(x.get("regularMarketChange"))
+    change_pct = safe_float(x.get("regularMarketChangePercent"))
+
+    market_time = x.get("regularMarketTime")
+    if isinstance(market_time, (int, float)) and market_time > 0:
+        last_update = datetime.utcfromtimestamp(int(market_time)).replace(microsecond=0).isoformat() + "Z"
+    else:
+        last_update = iso_now()
+
+    if value is None:
+        return None
+
+    return {"value": value, "change_abs": change_abs, "change_pct": change_pct, "last_update": last_update}
+
 def fetch_brapi_quote(ticker: str) -> Optional[Dict[str, Any]]:
     url = f"{BRAPI_BASE}/quote/{ticker}"
     params = {}
@@ -29,63 +47,115 @@ def fetch_brapi_quote(ticker: str) -> Optional[Dict[str, Any]]:
         params["token"] = BRAPI_TOKEN
 
     try:
-        r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-        data = r.json()
+        data = http_get_json(url, params=params)
         results = data.get("results") or []
         if not results:
             return None
 
-        x = results[0]
-        value = safe_float(x.get("regularMarketPrice"))
-        change_abs = safe_float(x.get("regularMarketChange"))
-        change_pct = safe_float(x.get("regularMarketChangePercent"))
+        return parse_brapi_quote(results[0])
+    except Exception:
+        return None
 
-        market_time = x.get("regularMarketTime")
-        if isinstance(market_time, (int, float)) and market_time > 0:
-            last_update = datetime.utcfromtimestamp(int(market_time)).replace(microsecond=0).isoformat() + "Z"
-        else:
-            last_update = iso_now()
+def fetch_brapi_quotes(tickers: List[str], not_found: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    # One upstream call for several tickers (/quote/A,B,C). Tickers missing
+    # from the answer are simply absent from the result; those BRAPI answered
+    # for without knowing them (as opposed to a failed call) are appended to
+    # `not_found` when given.
+    if not tickers:
+        return {}
+    url = f"{BRAPI_BASE}/quote/{','.join(tickers)}"
+    params = {}
+    if BRAPI_TOKEN:
+        params["token"] = BRAPI_TOKEN
 
-        if value is None:
-            return None
+    try:
+        data = http_get_json(url, params=params)
+    except requests.HTTPError as e:
+        # BRAPI answers 404 when it knows none of the tickers
+        if not_found is not None and e.response is not None and e.response.status_code == 404:
+            not_found.extend(tickers)
+        return {}
+    except Exception:
+        return {}
 
-        return {"value": value, "change_abs": change_abs, "change_pct": change_pct, "last_update": last_update}
+    try:
+        out = {}
+        answered = set()
+        for x in data.get("results") or []:
+            symbol = str(x.get("symbol") or "").upper()
+            answered.add(symbol)
+            quote = parse_brapi_quote(x)
+            if symbol and quote:
+                out[symbol] = quote
     except Exception:
-        return None
+        return {}
+    if not_found is not None:
+        not_found.extend(t for t in tickers if t.upper() not in answered)
+    return out
 
-def fetch_brapi_history_daily(ticker: str, range_: str = "1mo", interval: str = "1d") -> Optional[List[Dict[str, Any]]]:
+INTRADAY_INTERVALS = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h")
+
+def fetch_brapi_history(ticker: str, range_: str = "1mo", interval: str = "1d") -> Optional[List[Dict[str, Any]]]:
+    # Daily-or-coarser intervals are keyed by ISO date; intraday ones by ISO
+    # UTC datetime, so both sort lexically.
     url = f"{BRAPI_BASE}/quote/{ticker}"
     params = {"range": range_, "interval": interval}
     if BRAPI_TOKEN:
         params["token"] = BRAPI_TOKEN
+    intraday = interval in INTRADAY_INTERVALS
 
     try:
-        r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-        data = r.json()
+        data = http_get_json(url, params=params)
         results = data.get("results") or []
         if not results:
             return None
+        return parse_brapi_history(results[0], intraday)
+    except Exception:
+        return None
 
-        x = results[0]
-        hist = x.get("historicalDataPrice")
-        if not isinstance(hist, list) or not hist:
-            return None
+def parse_brapi_history(x: Dict[str, Any], intraday: bool = False) -> Optional[List[Dict[str, Any]]]:
+    hist = x.get("historicalDataPrice")
+    if not isinstance(hist, list) or not hist:
+        return None
 
-        out = []
-        for row in hist:
-            ts = row.get("date")
-            close = safe_float(row.get("close"))
-            if close is None:
-                continue
-            if isinstance(ts, (int, float)) and ts > 0:
-                d = datetime.utcfromtimestamp(int(ts)).date().isoformat()
-                out.append({"date": d, "close": close})
-
-        if not out:
-            return None
-        out.sort(key=lambda x: x["date"])
+    out = []
+    for row in hist:
+        ts = row.get("date")
+        close = safe_float(row.get("close"))
+        if close is None:
+            continue
+        if isinstance(ts, (int, float)) and ts > 0:
+            dt = datetime.utcfromtimestamp(int(ts))
+            d = dt.isoformat() + "Z" if intraday else dt.date().isoformat()
+            out.append({"date": d, "close": close})
+
+    if not out:
+        return None
+    out.sort(key=lambda x: x["date"])
+    return out
+
+def fetch_brapi_histories(tickers: List[str], range_: str = "1mo", interval: str = "1d") -> Dict[str, List[Dict[str, Any]]]:
+    # Batched form of fetch_brapi_history (/quote/A,B,C?range=...), like
+    # fetch_brapi_quotes: tickers without usable history are absent.
+    if not tickers:
+        return {}
+    url = f"{BRAPI_BASE}/quote/{','.join(tickers)}"
+    params = {"range": range_, "interval": interval}
+    if BRAPI_TOKEN:
+        params["token"] = BRAPI_TOKEN
+    intraday = interval in INTRADAY_INTERVALS
+
+    try:
+        data = http_get_json(url, params=params)
+        out = {}
+        for x in data.get("results") or []:
+            symbol = str(x.get("symbol") or "").upper()
+            hist = parse_brapi_history(x, intraday)
+            if symbol and hist:
+                out[symbol] = hist
         return out
     except Exception:
-        return None
+        return {}
+
+def fetch_brapi_history_daily(ticker: str, range_: str = "1mo", interval: str = "1d") -> Optional[List[Dict[str, Any]]]:
+    return fetch_brapi_history(ticker, range_=range_, interval=interval)
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import Any, Dict, List, Optional
-import requests
 
-from app.core.config import REQUEST_TIMEOUT
-from app.core.cache import cache_get_fresh, cache_get_last_known, cache_set, cache_last_known_at_iso
+from app.core.http import http_get_json
+from app.core.cache import cache_entry, cache_set
+from app.core.warehouse import WAREHOUSE
 
 EXPECT_OLINDA_BASE = "https://olinda.bcb.gov.br/olinda/servico/Expectativas/versao/v1/odata"
+EXPECT_12M_ENDPOINT = "ExpectativasMercadoInflacao12Meses"
+EXPECT_SELECT = "Indicador,Data,Suavizada,baseCalculo,Media,Mediana,Minimo,Maximo,numeroRespondentes"
 
 def iso_now() -> str:
     return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
@@ -23,22 +25,58 @@ def safe_float(x: Any) -> Optional[float]:
     except Exception:
         return None
 
-def fetch_bcb_inflation_expectations_12m_median(indicador: str = "IPCA", prefer_smooth: bool = True) -> Optional[Dict[str, Any]]:
-    url = f"{EXPECT_OLINDA_BASE}/ExpectativasMercadoInflacao12Meses"
+def fetch_olinda_page(endpoint: str, skip: int, top: int, filter_: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Oldest first, so $skip offsets stay valid while new rows are appended.
+    params = {
+        "$format": "json",
+        "$top": str(top),
+        "$skip": str(skip),
+        "$orderby": "Data asc",
+        "$select": EXPECT_SELECT,
+    }
+    if filter_:
+        params["$filter"] = filter_
+    payload = http_get_json(f"{EXPECT_OLINDA_BASE}/{endpoint}", params=params)
+    rows = payload.get("value")
+    return rows if isinstance(rows, list) else []
+
+def _latest_upstream(indicador: str) -> List[Dict[str, Any]]:
     params = {
         "$format": "json",
         "$top": "10",
         "$orderby": "Data desc",
-        "$select": "Indicador,Data,Suavizada,Media,Mediana,Minimo,Maximo,numeroRespondentes",
+        "$select": EXPECT_SELECT,
         "$filter": f"Indicador eq '{indicador}'",
     }
+    payload = http_get_json(f"{EXPECT_OLINDA_BASE}/{EXPECT_12M_ENDPOINT}", params=params)
+    rows = payload.get("value")
+    return rows if isinstance(rows, list) else []
+
+# Rows the request path syncs per call; a longer gap is the backfiller's job.
+SYNC_PAGE_SIZE = 1000
+
+def _latest_rows(indicador: str) -> List[Dict[str, Any]]:
+    # Warehouse first: once it holds the indicator, only rows dated on or
+    # after the newest stored one are requested, one page at most. Further
+    # behind than that (e.g. while the backfiller is still on old pages),
+    # the newest rows are fetched directly and the gap is left to backfill.
+    # Sync errors propagate, so callers fall back to their stale path.
+    if WAREHOUSE is None:
+        return _latest_upstream(indicador)
+    last = WAREHOUSE.olinda_last_date(EXPECT_12M_ENDPOINT, indicador)
+    if last is None:
+        WAREHOUSE.olinda_upsert(EXPECT_12M_ENDPOINT, _latest_upstream(indicador))
+    else:
+        page = fetch_olinda_page(EXPECT_12M_ENDPOINT, 0, SYNC_PAGE_SIZE, f"Indicador eq '{indicador}' and Data ge '{last}'")
+        WAREHOUSE.olinda_upsert(EXPECT_12M_ENDPOINT, page)
+        if len(page) >= SYNC_PAGE_SIZE:
+            WAREHOUSE.olinda_upsert(EXPECT_12M_ENDPOINT, _latest_upstream(indicador))
+    return WAREHOUSE.olinda_latest(EXPECT_12M_ENDPOINT, indicador, 10)
 
+def fetch_bcb_inflation_expectations_12m_median(indicador: str = "IPCA", prefer_smooth: bool = True) -> Optional[Dict[str, Any]]:
     try:
-        r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-        payload = r.json()
-        rows = payload.get("value")
-        if not isinstance(rows, list) or not rows:
+        rows = _latest_rows(indicador)
+        if not rows:
             return None
     except Exception:
         return None
@@ -81,22 +119,22 @@ def get_cached_inflation_expectations_12m(
 ) -> Dict[str, Any]:
     cache_key = f"expectations:{indicador}:median:smooth={prefer_smooth}"
 
-    fresh = cache_get_fresh(cache_key)
-    if fresh:
+    entry = cache_entry(cache_key)
+    if entry is not None and entry.value and entry.fresh():
         return {
-            "data": fresh,
+            "data": entry.value,
             "cache": {
                 "hit": True,
                 "stale": False,
                 "from_fallback": False,
                 "ttl_seconds": ttl_seconds,
-                "last_known_at": cache_last_known_at_iso(cache_key),
+                "last_known_at": entry.stored_at_iso(),
             }
         }
 
     fetched = fetch_bcb_inflation_expectations_12m_median(indicador=indicador, prefer_smooth=prefer_smooth)
     if fetched:
-        cache_set(cache_key, fetched, ttl_seconds=ttl_seconds)
+        stored = cache_set(cache_key, fetched, ttl_seconds=ttl_seconds)
         return {
             "data": fetched,
             "cache": {
@@ -104,20 +142,20 @@ def get_cached_inflation_expectations_12m(
                 "stale": False,
                 "from_fallback": False,
                 "ttl_seconds": ttl_seconds,
-                "last_known_at": cache_last_known_at_iso(cache_key),
+                "last_known_at": stored.stored_at_iso(),
             }
         }
 
-    last_known = cache_get_last_known(cache_key)
-    if last_known:
+    entry = cache_entry(cache_key)
+    if entry is not None and entry.value:
         return {
-            "data": last_known,
+            "data": entry.value,
             "cache": {
                 "hit": False,
                 "stale": True,
                 "from_fallback": True,
                 "ttl_seconds": ttl_seconds,
-                "last_known_at": cache_last_known_at_iso(cache_key),
+                "last_known_at": entry.stored_at_iso(),
             }
         }
 
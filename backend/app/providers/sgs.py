@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 import requests
 
-from app.core.config import REQUEST_TIMEOUT
+from app.core.cache import StaleData
+from app.core.http import http_get_json
+from app.core.refresh import note_observation
+from app.core.warehouse import WAREHOUSE
 
 SGS_BASE = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{code}/dados"
+# SGS caps daily series at ten years per request.
+SGS_MAX_SPAN_DAYS = 3650
 
 def to_ddmmyyyy(d: date) -> str:
     return d.strftime("%d/%m/%Y")
@@ -26,16 +32,56 @@ def safe_float(x: Any) -> Optional[float]:
     except Exception:
         return None
 
+def date_chunks(start: date, end: date, days: int = SGS_MAX_SPAN_DAYS) -> Iterator[Tuple[date, date]]:
+    cur = start
+    step = timedelta(days=max(1, days) - 1)
+    while cur <= end:
+        chunk_end = min(cur + step, end)
+        yield cur, chunk_end
+        cur = chunk_end + timedelta(days=1)
+
 def fetch_sgs_series(code: int, start: date, end: date) -> List[Dict[str, Any]]:
+    # Warehouse first: inside the stored span only the tail since the newest
+    # observation (inclusive, to pick up revisions) goes upstream.
+    if WAREHOUSE is None:
+        points = fetch_sgs_series_upstream(code, start, end)
+        note_observation(code, points[-1]["date"] if points else None)
+        return points
+    meta = WAREHOUSE.sgs_meta(code)
+    if meta and meta["covered_from"] and meta["last_obs"] and meta["covered_from"] <= start.isoformat():
+        last_obs = date.fromisoformat(meta["last_obs"])
+        if last_obs < end:
+            try:
+                # a long-idle series can be years behind: sync the tail in
+                # chunks, keeping each one as it lands
+                for chunk_start, chunk_end in date_chunks(last_obs, end):
+                    WAREHOUSE.sgs_upsert(code, fetch_sgs_series_upstream(code, chunk_start, chunk_end))
+            except Exception as e:
+                # the stored rows may miss the tail: usable, but not fresh
+                raise StaleData(WAREHOUSE.sgs_range(code, start, end), e) from e
+            finally:
+                note_observation(code, (WAREHOUSE.sgs_meta(code) or {}).get("last_obs"))
+        return WAREHOUSE.sgs_range(code, start, end)
+
+    points = fetch_sgs_series_upstream(code, start, end)
+    WAREHOUSE.sgs_upsert(code, points, window=(start, end))
+    note_observation(code, (WAREHOUSE.sgs_meta(code) or {}).get("last_obs"))
+    return points
+
+def fetch_sgs_series_upstream(code: int, start: date, end: date) -> List[Dict[str, Any]]:
     url = SGS_BASE.format(code=code)
     params = {
         "formato": "json",
         "dataInicial": to_ddmmyyyy(start),
         "dataFinal": to_ddmmyyyy(end),
     }
-    r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-    r.raise_for_status()
-    raw = r.json()
+    try:
+        raw = http_get_json(url, params=params)
+    except requests.HTTPError as e:
+        # SGS answers 404 for a window with no observations
+        if e.response is not None and e.response.status_code == 404:
+            return []
+        raise
 
     out = []
     for row in raw:
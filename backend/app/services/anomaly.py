@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import bisect
+import math
+import threading
+
+from app.core.cache import cache_get_last_known
+from app.core.config import ANOMALY_MIN_SAMPLES, ANOMALY_WINDOW
+from app.core.refresh import final_bars
+from app.services.volatility import DELTA_RANGE, SEED_RANGE, RollingWelford
+
+# How unusual is today's move? Each (series, horizon) stream turns levels into
+# moves (percent change or difference over `horizon` observations) and keeps
+# the last `window` of them in two structures updated per new point:
+#   RollingWelford   running mean/variance -> z-score
+#   sorted window    order statistics      -> percentile by bisection
+# Like the volatility engine, only points newer than the last one seen are
+# pushed, so refreshes cost O(new points), and scoring is a lookup.
+
+KINDS = ("pct", "diff")
+
+class MoveStream:
+    def __init__(self, kind: str, horizon: int, window: int):
+        self.kind = kind
+        self.horizon = horizon
+        self.stats = RollingWelford(window)
+        self.sorted: List[float] = []
+        self.levels: Deque[float] = deque(maxlen=horizon)
+        self.last_date: Optional[str] = None
+        # the latest move, scored against the window before it was pushed
+        self.last_scored: Optional[Dict[str, Any]] = None
+
+    def push_level(self, d: str, level: float) -> None:
+        self.last_date = d
+        move = None
+        if len(self.levels) == self.horizon:
+            base = self.levels[0]
+            if self.kind == "diff":
+                move = level - base
+            elif base != 0:
+                move = (level / base - 1.0) * 100.0
+        self.levels.append(level)
+        if move is None:
+            return
+        self.last_scored = self.score(move)
+        if len(self.stats.buf) == self.stats.window:
+            old = self.stats.buf[0]
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.stats.push(move)
+        bisect.insort(self.sorted, move)
+
+    def score(self, move: float) -> Dict[str, Any]:
+        n = len(self.sorted)
+        out: Dict[str, Any] = {"samples": n}
+        if n < max(2, ANOMALY_MIN_SAMPLES):
+            return out
+        sd = math.sqrt(max(self.stats.m2, 0.0) / (n - 1))
+        if sd > 0:
+            out["zscore"] = (move - self.stats.mean) / sd
+        # mid-rank, so a move equal to every past move sits at 50
+        lo = bisect.bisect_left(self.sorted, move)
+        hi = bisect.bisect_right(self.sorted, move)
+        out["percentile"] = (lo + hi) / 2.0 / n * 100.0
+        return out
+
+class AnomalyEngine:
+    def __init__(self, window: int):
+        self.window = window
+        self.streams: Dict[Tuple[str, int], MoveStream] = {}
+        self.lock = threading.Lock()
+
+    def ingest(self, name: str, points: List[Dict[str, Any]], kind: str, horizon: int = 1, value_key: str = "value") -> None:
+        # points are date-sorted; only those after the last ingested date count.
+        with self.lock:
+            s = self.streams.get((name, horizon))
+            if s is None:
+                s = self.streams[(name, horizon)] = MoveStream(kind, horizon, self.window)
+            start = 0
+            if s.last_date is not None:
+                start = bisect.bisect_right(points, s.last_date, key=lambda p: p["date"])
+            for p in points[start:]:
+                v = p.get(value_key)
+                if isinstance(v, (int, float)) and math.isfinite(v):
+                    s.push_level(p["date"], float(v))
+
+    def score(self, name: str, move: Optional[float], horizon: int = 1) -> Dict[str, Any]:
+        # z-score/percentile of `move` against the stream's history; for
+        # None, the latest ingested move against the history before it.
+        with self.lock:
+            s = self.streams.get((name, horizon))
+            if s is None:
+                return {"samples": 0}
+            if move is None:
+                return s.last_scored or {"samples": len(s.sorted)}
+            return s.score(move)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {f"{name}:{h}": {"kind": s.kind, "samples": len(s.sorted), "as_of": s.last_date} for (name, h), s in self.streams.items()}
+
+ENGINE = AnomalyEngine(ANOMALY_WINDOW)
+
+def ingest_cached_brapi(ticker: str) -> None:
+    # Daily closes already cached by the volatility refresh (same keys), so
+    # scoring BRAPI moves never goes upstream on its own. Final bars only:
+    # today's move is scored from the live quote, not pushed.
+    for range_ in (SEED_RANGE, DELTA_RANGE):
+        hist = cache_get_last_known(f"brapi:hist:{ticker}:{range_}:1d")
+        if hist:
+            ENGINE.ingest(ticker, final_bars(hist), "pct", value_key="close")
+
+def significance(zscore: Optional[float]) -> float:
+    # Sort key: largest |z| first, unscored items last.
+    return -abs(zscore) if zscore is not None else math.inf
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+from app.core.config import (
+    BACKFILL_OLINDA_ENDPOINTS, BACKFILL_RETRY_SECONDS, BACKFILL_SGS_CODES, BACKFILL_STEP_SECONDS,
+    OLINDA_PAGE_SIZE, SGS_BACKFILL_START_YEAR,
+)
+from app.core.ratelimit import PRIORITY_BACKGROUND, RateLimitExceeded, upstream_priority
+from app.core.warehouse import WAREHOUSE
+from app.providers.brapi import iso_now
+from app.providers.expectations import fetch_olinda_page
+from app.providers.sgs import fetch_sgs_series_upstream
+
+# Full-history backfill into the warehouse, one upstream page per step.
+# SGS walks back a calendar year at a time from the current year, so the
+# covered span grows contiguously from today and live reads benefit right
+# away; the first empty year before stored data means the series starts
+# there. Olinda pages forward with $skip/$top. Each step checkpoints, so a
+# restart resumes where the last one stopped.
+
+def sgs_job(code: int) -> str:
+    return f"sgs:{code}"
+
+def olinda_job(endpoint: str) -> str:
+    return f"olinda:{endpoint}"
+
+def step_sgs(code: int, today: Optional[date] = None) -> bool:
+    # Returns True while there is more to fetch.
+    today = today or date.today()
+    job = sgs_job(code)
+    cursor, done = WAREHOUSE.checkpoint(job)
+    if done:
+        return False
+    year = int(cursor) - 1 if cursor else today.year
+    if year < SGS_BACKFILL_START_YEAR:
+        WAREHOUSE.set_checkpoint(job, cursor, done=True)
+        return False
+
+    start, end = date(year, 1, 1), min(date(year, 12, 31), today)
+    points = fetch_sgs_series_upstream(code, start, end)
+    meta = WAREHOUSE.sgs_meta(code)
+    if not points and meta and meta["last_obs"] and meta["last_obs"] > end.isoformat():
+        WAREHOUSE.sgs_mark_complete(code)
+        WAREHOUSE.set_checkpoint(job, str(year), done=True)
+        return False
+    WAREHOUSE.sgs_upsert(code, points, window=(start, end))
+    WAREHOUSE.set_checkpoint(job, str(year))
+    return True
+
+def step_olinda(endpoint: str) -> bool:
+    job = olinda_job(endpoint)
+    cursor, done = WAREHOUSE.checkpoint(job)
+    if done:
+        return False
+    skip = int(cursor or 0)
+    rows = fetch_olinda_page(endpoint, skip, OLINDA_PAGE_SIZE)
+    WAREHOUSE.olinda_upsert(endpoint, rows)
+    more = len(rows) >= OLINDA_PAGE_SIZE
+    WAREHOUSE.set_checkpoint(job, str(skip + len(rows)), done=not more)
+    return more
+
+def backfill_jobs() -> List[Tuple[str, Callable[[], bool]]]:
+    jobs: List[Tuple[str, Callable[[], bool]]] = []
+    for code in BACKFILL_SGS_CODES:
+        jobs.append((sgs_job(code), lambda c=code: step_sgs(c)))
+    for endpoint in BACKFILL_OLINDA_ENDPOINTS:
+        jobs.append((olinda_job(endpoint), lambda e=endpoint: step_olinda(e)))
+    return jobs
+
+class Backfiller:
+    def __init__(self, step_seconds: float, retry_seconds: float):
+        self.step_seconds = step_seconds
+        self.retry_seconds = retry_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.steps = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        # job -> monotonic time before which it isn't retried
+        self._retry_at: Dict[str, float] = {}
+
+    def start(self) -> None:
+        if WAREHOUSE is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backfill", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> bool:
+        # One step for every unfinished job (round-robin). False when all done.
+        pending = False
+        for name, step in backfill_jobs():
+            if self._stop.is_set():
+                return True
+            if self._retry_at.get(name, 0.0) > time.monotonic():
+                pending = True
+                continue
+            try:
+                with upstream_priority(PRIORITY_BACKGROUND):
+                    more = step()
+            except RateLimitExceeded:
+                # shed in favour of live traffic; try again next round
+                more = True
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{name}: {e}"
+                print(f"Error backfilling {name}: {e}")
+                self._retry_at[name] = time.monotonic() + self.retry_seconds
+                more = True
+            else:
+                self.steps += 1
+            pending = pending or more
+        return pending
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self.run_once():
+                self.finished_at = iso_now()
+                return
+            self._stop.wait(self.step_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "steps": self.steps, "errors": self.errors, "last_error": self.last_error,
+            "finished_at": self.finished_at,
+        }
+
+BACKFILLER = Backfiller(BACKFILL_STEP_SECONDS, BACKFILL_RETRY_SECONDS)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+import asyncio
+import gzip
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from app.core.config import BOOTSTRAP_MAX_AGE, BOOTSTRAP_TIMEOUT
+from app.core.static import StaticAsset, parse_accept_encoding
+from app.services.homepage import HomepageSnapshot, build_homepage_payload, current_snapshot
+
+# index.html with the homepage snapshot inlined as
+#   <script id="homepage-bootstrap" type="application/json" data-version="...">
+# so the client renders from the first response (and then revalidates).
+# Rendered (and compressed) once per snapshot version, not per request. A
+# snapshot older than BOOTSTRAP_MAX_AGE is inlined with meta.stale set.
+BOOTSTRAP_ELEMENT_ID = "homepage-bootstrap"
+
+def _script_tag(snapshot: HomepageSnapshot, stale: bool = False) -> bytes:
+    # "<" only occurs inside JSON strings, where < is equivalent and
+    # can't close the script element.
+    body = (snapshot.stale_body if stale else snapshot.body).replace(b"<", b"\\u003c")
+    return (
+        f'<script id="{BOOTSTRAP_ELEMENT_ID}" type="application/json" data-version="{snapshot.version}">'.encode("ascii")
+        + body + b"</script>"
+    )
+
+def inject(html: bytes, snapshot: HomepageSnapshot, stale: bool = False) -> bytes:
+    tag = _script_tag(snapshot, stale)
+    at = html.find(b"</head>")
+    if at < 0:
+        return tag + html
+    return html[:at] + tag + html[at:]
+
+class IndexRenderer:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.key: Optional[Tuple[str, str, bool]] = None
+        self.bodies: Dict[str, bytes] = {}
+
+    def render(self, asset: StaticAsset, snapshot: HomepageSnapshot, accept_encoding: Optional[str], stale: bool = False) -> Tuple[str, bytes, str]:
+        key = (asset.etag, snapshot.version, stale)
+        accepted = parse_accept_encoding(accept_encoding)
+        encoding = "br" if brotli is not None and "br" in accepted else "gzip" if "gzip" in accepted else "identity"
+        with self.lock:
+            if self.key != key:
+                self.key = key
+                self.bodies = {"identity": inject(asset.bodies["identity"], snapshot, stale)}
+            body = self.bodies.get(encoding)
+            if body is None:
+                raw = self.bodies["identity"]
+                body = brotli.compress(raw, quality=5) if encoding == "br" else gzip.compress(raw, compresslevel=6)
+                self.bodies[encoding] = body
+        suffix = ("-stale" if stale else "") + ("" if encoding == "identity" else f"-{encoding}")
+        etag = f'{asset.etag[:-1]}.{snapshot.version}{suffix}"'
+        return encoding, body, etag
+
+RENDERER = IndexRenderer()
+
+_refresh: Optional["asyncio.Future[object]"] = None
+
+def _log_refresh(task: "asyncio.Future[object]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error building bootstrap payload: {task.exception()}")
+
+def _refresh_in_background() -> None:
+    # build_homepage_payload coalesces, so at most one build runs however
+    # many pages are served meanwhile.
+    global _refresh
+    if _refresh is None or _refresh.done():
+        _refresh = asyncio.ensure_future(build_homepage_payload())
+        _refresh.add_done_callback(_log_refresh)
+
+async def bootstrap_snapshot() -> Tuple[Optional[HomepageSnapshot], bool]:
+    # With a snapshot in hand the page ships right away and the refresh runs
+    # behind it (the client revalidates anyway). Only a cold start waits, and
+    # never longer than BOOTSTRAP_TIMEOUT: without a snapshot the client fetches.
+    # Returns (snapshot, stale); stale when the last good build is too old.
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        _refresh_in_background()
+    else:
+        try:
+            await asyncio.wait_for(asyncio.shield(build_homepage_payload()), BOOTSTRAP_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            print(f"Error building bootstrap payload: {e}")
+        snapshot = current_snapshot()
+    if snapshot is None:
+        return None, False
+    return snapshot, time.time() - snapshot.built_at > BOOTSTRAP_MAX_AGE
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import TTL_BRAPI_HISTORY, TTL_BRAPI_INTRADAY
+from app.core.cache import StaleData, cached_fetch
+from app.core.columnar import columns_from_arrays
+from app.core.refresh import policy_ttl
+from app.providers.brapi import INTRADAY_INTERVALS, fetch_brapi_history, iso_now
+
+# BRAPI only serves intraday bars for short ranges.
+INTRADAY_RANGES = ("1d", "5d", "1mo")
+DAILY_RANGES = ("1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max")
+DAILY_INTERVALS = ("1d", "5d", "1wk", "1mo", "3mo")
+
+def validate_chart_params(range_: str, interval: str) -> Optional[str]:
+    if interval in INTRADAY_INTERVALS:
+        if range_ not in INTRADAY_RANGES:
+            return f"intraday intervals support ranges {list(INTRADAY_RANGES)}"
+        return None
+    if interval not in DAILY_INTERVALS:
+        return f"interval must be one of {list(INTRADAY_INTERVALS + DAILY_INTERVALS)}"
+    if range_ not in DAILY_RANGES + INTRADAY_RANGES:
+        return f"range must be one of {list(DAILY_RANGES)}"
+    return None
+
+def history_ttl(interval: str) -> int:
+    if interval in INTRADAY_INTERVALS:
+        return policy_ttl("brapi_intraday", TTL_BRAPI_INTRADAY)
+    return policy_ttl("brapi_history", TTL_BRAPI_HISTORY)
+
+def _epoch(d: str) -> float:
+    if "T" in d:
+        return (datetime.fromisoformat(d.rstrip("Z")) - datetime(1970, 1, 1)).total_seconds()
+    return (datetime.fromisoformat(d) - datetime(1970, 1, 1)).total_seconds()
+
+def lttb_indices(xs: List[float], ys: List[float], threshold: int) -> List[int]:
+    # Largest-Triangle-Three-Buckets: keeps first/last points and, for each
+    # bucket in between, the point forming the largest triangle with the
+    # previously kept point and the next bucket's average.
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    out = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        span = avg_end - avg_start
+        if span > 0:
+            avg_x = sum(xs[avg_start:avg_end]) / span
+            avg_y = sum(ys[avg_start:avg_end]) / span
+        else:
+            avg_x, avg_y = xs[n - 1], ys[n - 1]
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        best = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out.append(best)
+        a = best
+    out.append(n - 1)
+    return out
+
+def downsample(points: List[Dict[str, Any]], budget: int) -> Tuple[List[str], List[float]]:
+    # Kept as parallel arrays so both the JSON and columnar encoders read
+    # them directly.
+    xs = [_epoch(p["date"]) for p in points]
+    ys = [p["close"] for p in points]
+    idx = lttb_indices(xs, ys, budget)
+    return [points[i]["date"] for i in idx], [ys[i] for i in idx]
+
+def fetch_history(ticker: str, range_: str, interval: str) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    key = f"brapi:hist:{ticker}:{range_}:{interval}"
+    return cached_fetch(key, history_ttl(interval), lambda: fetch_brapi_history(ticker, range_=range_, interval=interval))
+
+def build_chart(ticker: str, range_: str, interval: str, budget: int, columnar: bool = False) -> Dict[str, Any]:
+    raw_info: Dict[str, Any] = {}
+
+    def compute() -> Optional[Dict[str, Any]]:
+        hist, cache_info = fetch_history(ticker, range_, interval)
+        raw_info.update(cache_info)
+        if not hist:
+            return None
+        dates, values = downsample(hist, budget)
+        chart = {"dates": dates, "values": values, "raw_points": len(hist)}
+        # Built from last-known bars: serve it flagged stale, but don't cache
+        # it for a full TTL over the history's own retry.
+        if cache_info.get("stale"):
+            raise StaleData(chart)
+        return chart
+
+    key = f"chart:{ticker}:{range_}:{interval}:{budget}"
+    chart, cache_info = cached_fetch(key, history_ttl(interval), compute)
+
+    body: Dict[str, Any] = {"ticker": ticker, "range": range_, "interval": interval}
+    if columnar:
+        body.update(columns_from_arrays(chart["dates"], chart["values"]) if chart else {"n": None})
+    else:
+        body["points"] = [{"date": d, "value": v} for d, v in zip(chart["dates"], chart["values"])] if chart else None
+    body["meta"] = {
+        "generated_at": iso_now(),
+        "budget": budget,
+        "raw_points": chart["raw_points"] if chart else None,
+        "stale": bool(cache_info.get("stale")),
+        "cache": cache_info,
+        "history_cache": raw_info or None,
+    }
+    return body
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from datetime import date, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import bisect
+import concurrent.futures
+import math
+import threading
+
+from app.core.config import CORRELATION_MAX_SERIES, CORRELATION_WINDOWS
+from app.core.executor import submit
+from app.core.refresh import final_bars
+from app.providers.brapi import iso_now
+from app.services.series import fetch_brapi_range, fetch_sgs_range
+
+# Each series is turned into a return stream before pairing: log returns for
+# prices, first differences for rates (SELIC barely moves in % terms).
+TRANSFORM_LOGRET = "logret"
+TRANSFORM_DIFF = "diff"
+
+class RollingPairStats:
+    def __init__(self, window: int):
+        self.window = window
+        self.buf: Deque[Tuple[float, float]] = deque()
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+        self.evictions = 0
+
+    def push(self, x: float, y: float) -> None:
+        self.buf.append((x, y))
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.syy += y * y
+        self.sxy += x * y
+        if len(self.buf) > self.window:
+            ox, oy = self.buf.popleft()
+            self.sx -= ox
+            self.sy -= oy
+            self.sxx -= ox * ox
+            self.syy -= oy * oy
+            self.sxy -= ox * oy
+            self.evictions += 1
+            # Re-sum once per full turnover so float drift can't accumulate.
+            if self.evictions >= self.window:
+                self.evictions = 0
+                self._resum()
+
+    def _resum(self) -> None:
+        self.sx = sum(x for x, _ in self.buf)
+        self.sy = sum(y for _, y in self.buf)
+        self.sxx = sum(x * x for x, _ in self.buf)
+        self.syy = sum(y * y for _, y in self.buf)
+        self.sxy = sum(x * y for x, y in self.buf)
+
+    def full(self) -> bool:
+        return len(self.buf) >= self.window
+
+    def _moments(self) -> Optional[Tuple[float, float, float]]:
+        n = len(self.buf)
+        if n < 2:
+            return None
+        cov = self.sxy / n - (self.sx / n) * (self.sy / n)
+        var_x = self.sxx / n - (self.sx / n) ** 2
+        var_y = self.syy / n - (self.sy / n) ** 2
+        return cov, max(var_x, 0.0), max(var_y, 0.0)
+
+    def corr(self) -> Optional[float]:
+        m = self._moments()
+        if m is None or m[1] <= 0 or m[2] <= 0:
+            return None
+        return max(-1.0, min(1.0, m[0] / math.sqrt(m[1] * m[2])))
+
+    def beta_x_on_y(self) -> Optional[float]:
+        m = self._moments()
+        if m is None or m[2] <= 0:
+            return None
+        return m[0] / m[2]
+
+    def beta_y_on_x(self) -> Optional[float]:
+        m = self._moments()
+        if m is None or m[1] <= 0:
+            return None
+        return m[0] / m[1]
+
+class CorrelationEngine:
+    # Pair state grows with the square of the series count, so client-chosen
+    # series live in an LRU of `max_series`; `pinned` ones are never evicted.
+    def __init__(self, windows: List[int], max_series: int, pinned: Tuple[str, ...] = ()):
+        self.windows = sorted(set(w for w in windows if w >= 2))
+        self.max_series = max(max_series, len(pinned) + 1)
+        self.pinned = set(pinned)
+        self.recent: "OrderedDict[str, None]" = OrderedDict()
+        self.evicted = 0
+        self.keep = max(self.windows) * 2 if self.windows else 0
+        self.lock = threading.Lock()
+        self.transforms: Dict[str, str] = {}
+        self.last_date: Dict[str, str] = {}
+        self.last_value: Dict[str, float] = {}
+        self.returns: Dict[str, Dict[str, float]] = {}
+        self.return_dates: Dict[str, Deque[str]] = {}
+        self.pairs: Dict[Tuple[str, str], Dict[int, RollingPairStats]] = {}
+
+    def _add_series(self, name: str, transform: str) -> None:
+        self.transforms[name] = transform
+        self.recent.setdefault(name, None)
+        self.returns[name] = {}
+        self.return_dates[name] = deque()
+        for other in self.transforms:
+            if other != name:
+                self.pairs[self._pair_key(name, other)] = {w: RollingPairStats(w) for w in self.windows}
+
+    def _remove_series(self, name: str) -> None:
+        for d in (self.transforms, self.last_date, self.last_value, self.returns, self.return_dates):
+            d.pop(name, None)
+        for other in self.transforms:
+            self.pairs.pop(self._pair_key(name, other), None)
+        self.recent.pop(name, None)
+        self.evicted += 1
+
+    def retain(self, names: List[str]) -> None:
+        # Mark `names` as just used and evict the least recently used
+        # series (never pinned ones or `names` themselves) past max_series.
+        with self.lock:
+            for name in names:
+                self.recent[name] = None
+                self.recent.move_to_end(name)
+            keep = set(names) | self.pinned
+            for name in list(self.recent):
+                if len(self.recent) <= self.max_series:
+                    break
+                if name not in keep:
+                    self._remove_series(name)
+
+    @staticmethod
+    def _pair_key(a: str, b: str) -> Tuple[str, str]:
+        return (a, b) if a < b else (b, a)
+
+    def _to_return(self, transform: str, prev: float, cur: float) -> Optional[float]:
+        if transform == TRANSFORM_DIFF:
+            return cur - prev
+        if prev <= 0 or cur <= 0:
+            return None
+        return math.log(cur / prev)
+
+    def ingest(self, name: str, points: List[Dict[str, Any]], transform: str = TRANSFORM_LOGRET) -> int:
+        # points: date-sorted [{"date", "value"}]. Only points newer than the
+        # last one seen for this series are processed, so steady-state cost is
+        # O(new points x series) regardless of history length.
+        with self.lock:
+            if name not in self.transforms:
+                self._add_series(name, transform)
+
+            last = self.last_date.get(name)
+            start = 0
+            if last is not None:
+                start = bisect.bisect_right(points, last, key=lambda p: p["date"])
+
+            added = 0
+            for p in points[start:]:
+                d, v = p["date"], p.get("value")
+                if not isinstance(v, (int, float)):
+                    continue
+                prev = self.last_value.get(name)
+                self.last_date[name] = d
+                self.last_value[name] = float(v)
+                if prev is None:
+                    continue
+                r = self._to_return(self.transforms[name], prev, float(v))
+                if r is None:
+                    continue
+                self._append_return(name, d, r)
+                added += 1
+            return added
+
+    def _append_return(self, name: str, d: str, r: float) -> None:
+        self.returns[name][d] = r
+        dates = self.return_dates[name]
+        dates.append(d)
+        if len(dates) > self.keep:
+            self.returns[name].pop(dates.popleft(), None)
+
+        # A pair observation is emitted when the second of its two series
+        # reaches that date. Both cursors only move forward, so each pair's
+        # stream stays in date order.
+        for other, other_returns in self.returns.items():
+            if other == name:
+                continue
+            r_other = other_returns.get(d)
+            if r_other is None:
+                continue
+            a, b = self._pair_key(name, other)
+            x, y = (r, r_other) if a == name else (r_other, r)
+            for stats in self.pairs[(a, b)].values():
+                stats.push(x, y)
+
+    def matrix(self, names: List[str], windows: List[int]) -> Dict[str, Any]:
+        with self.lock:
+            out: Dict[str, Any] = {}
+            for w in windows:
+                corr: List[List[Optional[float]]] = []
+                beta: List[List[Optional[float]]] = []
+                n_obs: List[List[int]] = []
+                for a in names:
+                    corr_row, beta_row, n_row = [], [], []
+                    for b in names:
+                        if a == b:
+                            n = min(len(self.return_dates.get(a, ())), w)
+                            corr_row.append(1.0 if n >= 2 else None)
+                            beta_row.append(1.0 if n >= 2 else None)
+                            n_row.append(n)
+                            continue
+                        stats = self.pairs.get(self._pair_key(a, b), {}).get(w)
+                        if stats is None:
+                            corr_row.append(None)
+                            beta_row.append(None)
+                            n_row.append(0)
+                            continue
+                        corr_row.append(stats.corr())
+                        # beta[a][b]: sensitivity of row series a to column series b
+                        beta_row.append(stats.beta_x_on_y() if a < b else stats.beta_y_on_x())
+                        n_row.append(len(stats.buf))
+                    corr.append(corr_row)
+                    beta.append(beta_row)
+                    n_obs.append(n_row)
+                out[str(w)] = {"corr": corr, "beta": beta, "n": n_obs}
+            return {
+                "series": names,
+                "windows": out,
+                "as_of": {name: self.last_date.get(name) for name in names},
+            }
+
+CORE_SERIES = ("ibov", "usdbrl", "usdbrl_sgs", "selic")
+
+ENGINE = CorrelationEngine(CORRELATION_WINDOWS, CORRELATION_MAX_SERIES, CORE_SERIES)
+
+def _history_start(today: date) -> date:
+    # Enough calendar days for the longest window of business-day returns.
+    return today - timedelta(days=int(max(CORRELATION_WINDOWS or [20]) * 1.6) + 30)
+
+def _brapi_final(ticker: str, start: date, end: date) -> Any:
+    # Today's in-progress bar would be frozen by the forward-only ingest.
+    points, cache_info = fetch_brapi_range(ticker, start, end)
+    return (final_bars(points) if points else points), cache_info
+
+def correlation_sources(tickers: List[str]) -> Dict[str, Tuple[Callable[[date, date], Any], str]]:
+    sources: Dict[str, Tuple[Callable[[date, date], Any], str]] = {
+        "ibov": (lambda s, e: _brapi_final("^BVSP", s, e), TRANSFORM_LOGRET),
+        "usdbrl": (lambda s, e: _brapi_final("USDBRL", s, e), TRANSFORM_LOGRET),
+        "usdbrl_sgs": (lambda s, e: fetch_sgs_range(1, s, e), TRANSFORM_LOGRET),
+        "selic": (lambda s, e: fetch_sgs_range(11, s, e), TRANSFORM_DIFF),
+    }
+    for t in tickers:
+        sources[t] = ((lambda tk: lambda s, e: _brapi_final(tk, s, e))(t), TRANSFORM_LOGRET)
+    return sources
+
+def build_correlation_matrix(tickers: List[str], windows: List[int]) -> Dict[str, Any]:
+    today = date.today()
+    start = _history_start(today)
+    sources = correlation_sources(tickers)
+    ENGINE.retain(list(sources))
+
+    caches: Dict[str, Dict[str, Any]] = {}
+    futures = {name: submit(fn, start, today) for name, (fn, _) in sources.items()}
+    concurrent.futures.wait(futures.values())
+
+    for name, fut in futures.items():
+        points, cache_info = fut.result()
+        caches[name] = cache_info
+        if points:
+            ENGINE.ingest(name, points, transform=sources[name][1])
+
+    names = list(sources.keys())
+    body = ENGINE.matrix(names, windows)
+    body["meta"] = {
+        "generated_at": iso_now(),
+        "stale": any(c.get("stale") for c in caches.values()),
+        "sources": caches,
+        "transforms": {name: sources[name][1] for name in names},
+    }
+    return body
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+import math
+import threading
+
+from app.core.expr import Series, SignalEngine, Value
+
+# Signals derived from fetched series, declared once and compiled into a
+# DAG (app.core.expr). Series are SGS inputs by their homepage names; dotted
+# names are scalars supplied by the caller.
+DERIVED_SIGNALS = {
+    "ipca_12m": "compound12(ipca_mm)",
+    "real_rate": "selic - ipca_12m",
+    "real_rate_ex_ante": "selic - expectations.ipca_12m",
+}
+
+_counter = itertools.count(1)
+
+class DerivedEvaluator:
+    # An engine plus the points -> Series conversions feeding it. The version
+    # of a series input bumps whenever its cached points list is replaced (a
+    # new fetch), so conversions and nodes are redone only then. Callers with
+    # different windows over the same names get their own evaluator.
+    def __init__(self, definitions: Dict[str, str]):
+        self.engine = SignalEngine(definitions)
+        self._lock = threading.Lock()
+        self._converted: Dict[str, Tuple[List[Dict[str, Any]], Series, int]] = {}
+
+    def convert(self, name: str, points: Optional[List[Dict[str, Any]]]) -> Tuple[Optional[Series], Optional[int]]:
+        if points is None:
+            return None, None
+        with self._lock:
+            memo = self._converted.get(name)
+            if memo is not None and memo[0] is points:
+                return memo[1], memo[2]
+            series, version = Series.from_points(points), next(_counter)
+            self._converted[name] = (points, series, version)
+            return series, version
+
+    def evaluate(self, series: Dict[str, Optional[List[Dict[str, Any]]]], scalars: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Optional[Value]]:
+        inputs: Dict[str, Value] = {}
+        versions: Dict[str, Any] = {}
+        for name, points in series.items():
+            s, version = self.convert(name, points)
+            if s is not None:
+                inputs[name], versions[name] = s, version
+        for name, value in (scalars or {}).items():
+            if value is not None:
+                inputs[name], versions[name] = float(value), float(value)
+        return self.engine.evaluate(inputs, versions)
+
+    def versions(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: memo[2] for name, memo in self._converted.items()}
+
+HOMEPAGE = DerivedEvaluator(DERIVED_SIGNALS)
+
+def evaluate_derived(series: Dict[str, Optional[List[Dict[str, Any]]]], scalars: Dict[str, Optional[float]]) -> Dict[str, Optional[Value]]:
+    return HOMEPAGE.evaluate(series, scalars)
+
+def latest(value: Optional[Value]) -> Optional[float]:
+    # Latest finite value of a derived series (or the scalar itself).
+    if value is None:
+        return None
+    if isinstance(value, Series):
+        found = value.last()
+        return found[1] if found else None
+    return value if math.isfinite(value) else None
+
+def derived_stats() -> Dict[str, Any]:
+    return HOMEPAGE.engine.stats()
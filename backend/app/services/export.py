@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterator, List
+import json
+
+from app.core.config import EXPORT_CHUNK_DAYS
+from app.core.cache import cache_get_fresh
+from app.core.ratelimit import PRIORITY_BACKGROUND, upstream_priority
+from app.providers.sgs import date_chunks, fetch_sgs_series
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+class ExportError(Exception):
+    def __init__(self, start: date, end: date, cause: Exception):
+        super().__init__(f"chunk {start.isoformat()}..{end.isoformat()} failed: {cause}")
+        self.start = start
+        self.end = end
+
+def _sgs_chunk(code: int, start: date, end: date) -> List[Dict[str, Any]]:
+    # Reuse a cached window when one matches exactly, but don't store export
+    # chunks: decades of history would otherwise pile up in the serving cache.
+    cached = cache_get_fresh(f"sgs:{code}:{start.isoformat()}:{end.isoformat()}")
+    if cached is not None:
+        return cached
+    try:
+        with upstream_priority(PRIORITY_BACKGROUND):
+            return fetch_sgs_series(code, start, end)
+    except Exception as e:
+        print(f"Error exporting sgs:{code} {start}..{end}: {e}")
+        raise ExportError(start, end, e) from e
+
+def iter_sgs_points(code: int, start: date, end: date) -> Iterator[List[Dict[str, Any]]]:
+    for chunk_start, chunk_end in date_chunks(start, end, EXPORT_CHUNK_DAYS):
+        points = _sgs_chunk(code, chunk_start, chunk_end)
+        if points:
+            yield points
+
+def iter_export(code: int, start: date, end: date, fmt: str) -> Iterator[str]:
+    # One string per upstream chunk: memory is bounded by the chunk size, not
+    # the series length. The status line is long gone when a chunk fails, so
+    # the failure is written as a last record and the stream is then aborted
+    # (no clean end of body): a partial export never looks complete.
+    csv = fmt == "csv"
+    if csv:
+        yield "date,value\n"
+    try:
+        for points in iter_sgs_points(code, start, end):
+            if csv:
+                yield "".join(f"{p['date']},{p['value']!r}\n" for p in points)
+            else:
+                yield "".join(json.dumps({"date": p["date"], "value": p["value"]}) + "\n" for p in points)
+    except ExportError as e:
+        if csv:
+            yield f"# error: {e}\n"
+        else:
+            yield json.dumps({"error": str(e), "start": e.start.isoformat(), "end": e.end.isoformat()}) + "\n"
+        raise
+
+def export_filename(code: int, start: date, end: date, fmt: str) -> str:
+    ext = "csv" if fmt == "csv" else "ndjson"
+    return f"sgs-{code}-{start.isoformat()}-{end.isoformat()}.{ext}"
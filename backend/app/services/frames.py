@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+
+from app.core.cache import StaleData, cached_fetch
+from app.core.config import FRAME_HISTORY_START, TTL_SGS_DAILY, TTL_SGS_SLOW
+from app.core.executor import submit
+from app.core.ratelimit import PRIORITY_BACKGROUND, upstream_priority
+from app.core.refresh import policy_ttl
+from app.core.resample import Frame, Series, align
+from app.providers.brapi import iso_now
+from app.providers.sgs import date_chunks, fetch_sgs_series
+from app.services.derived import DERIVED_SIGNALS, DerivedEvaluator
+from app.services.homepage import SGS_CODES
+
+# Aligned multi-series frames over the full stored history, e.g. a daily
+# real rate: selic is daily, IPCA monthly, so ipca_12m is carried forward
+# onto every day until the next release. Each column has an aggregation for
+# when the target frequency is coarser than the series (monthly average
+# Selic, month-end FX, IPCA compounded within the quarter).
+
+FRAME_SOURCES: Dict[str, Tuple[int, str, int]] = {
+    # name: (SGS code, aggregation, fallback TTL)
+    "selic": (SGS_CODES["selic"], "mean", TTL_SGS_DAILY),
+    "usdbrl": (SGS_CODES["usdbrl"], "last", TTL_SGS_DAILY),
+    "ipca_mm": (SGS_CODES["ipca_mm"], "compound", TTL_SGS_SLOW),
+    "unemployment": (SGS_CODES["unemployment"], "last", TTL_SGS_SLOW),
+    "gdp": (SGS_CODES["gdp"], "last", TTL_SGS_SLOW),
+}
+DERIVED_AGGREGATION = {"real_rate": "mean"}
+
+# Separate from the homepage evaluator: its inputs are full histories, not
+# the homepage's short windows, so sharing one memo would thrash it.
+EVALUATOR = DerivedEvaluator(DERIVED_SIGNALS)
+
+def _frame_derived() -> Dict[str, List[str]]:
+    # Derived signals computable from series alone (no scalar inputs).
+    out = {}
+    for name in DERIVED_SIGNALS:
+        inputs = EVALUATOR.engine.inputs_of(name)
+        if all(i in FRAME_SOURCES for i in inputs):
+            out[name] = inputs
+    return out
+
+FRAME_DERIVED = _frame_derived()
+FRAME_SERIES = list(FRAME_SOURCES) + list(FRAME_DERIVED)
+
+def validate_frame_series(names: List[str]) -> Optional[str]:
+    unknown = [n for n in names if n not in FRAME_SOURCES and n not in FRAME_DERIVED]
+    if unknown:
+        return f"unknown series {unknown}; available: {FRAME_SERIES}"
+    return None
+
+def _fetch_history(code: int, start: date, end: date) -> List[Dict[str, Any]]:
+    # SGS caps daily series at ten years per request; the warehouse answers
+    # most chunks locally anyway.
+    points: List[Dict[str, Any]] = []
+    stale: Optional[StaleData] = None
+    with upstream_priority(PRIORITY_BACKGROUND):
+        for chunk_start, chunk_end in date_chunks(start, end):
+            try:
+                points.extend(fetch_sgs_series(code, chunk_start, chunk_end))
+            except StaleData as e:
+                points.extend(e.data)
+                stale = e
+    if stale is not None:
+        raise StaleData(points, stale)
+    return points
+
+def _fetch_source(name: str, today: date) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    code, _, ttl = FRAME_SOURCES[name]
+    start = date.fromisoformat(FRAME_HISTORY_START)
+    return cached_fetch(f"sgs:{code}:history", policy_ttl("sgs", ttl, code=code), lambda: _fetch_history(code, start, today))
+
+class FrameCache:
+    # (series, freq) -> (input versions, Frame). Bounded LRU: the key space is
+    # whatever combinations clients ask for.
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[Tuple[Tuple[str, ...], str], Tuple[Tuple[Any, ...], Frame]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Tuple[str, ...], str], version: Tuple[Any, ...]) -> Optional[Frame]:
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[Tuple[str, ...], str], version: Tuple[Any, ...], frame: Frame) -> None:
+        with self._lock:
+            self._frames[key] = (version, frame)
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._frames), "hits": self.hits, "misses": self.misses}
+
+FRAMES = FrameCache()
+
+def build_frame(names: List[str], freq: str, start: Optional[date], end: Optional[date]) -> Tuple[Frame, Dict[str, Any]]:
+    today = date.today()
+    needed = sorted({i for n in names for i in (FRAME_DERIVED.get(n) or [n])})
+    tasks = {name: submit(_fetch_source, name, today) for name in needed}
+    points = {}
+    sources = {}
+    for name, fut in tasks.items():
+        points[name], sources[name] = fut.result()
+
+    converted = {name: EVALUATOR.convert(name, points[name]) for name in needed}
+    key = (tuple(names), freq)
+    version = (today,) + tuple(converted[n][1] for n in needed)
+    frame = FRAMES.get(key, version)
+    if frame is None:
+        derived = EVALUATOR.evaluate({n: points[n] for n in needed}) if any(n in FRAME_DERIVED for n in names) else {}
+        columns: Dict[str, Series] = {}
+        how: Dict[str, str] = {}
+        for name in names:
+            value = converted[name][0] if name in FRAME_SOURCES else derived.get(name)
+            columns[name] = value if isinstance(value, Series) else Series.from_points([])
+            how[name] = FRAME_SOURCES[name][1] if name in FRAME_SOURCES else DERIVED_AGGREGATION.get(name, "last")
+        frame = align(columns, freq, date.fromisoformat(FRAME_HISTORY_START), today, how)
+        FRAMES.put(key, version, frame)
+
+    meta = {
+        "generated_at": iso_now(),
+        "freq": freq,
+        "stale": any(info.get("stale") for info in sources.values()),
+        "sources": sources,
+    }
+    return frame.slice(start, end), meta
+
+def frame_stats() -> Dict[str, Any]:
+    return FRAMES.stats()
@@ -1,20 +1,33 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
-from typing import Any, Dict, List, Optional
-import math
-import statistics
-import concurrent.futures
+from datetime import date, datetime, timedelta, timezone
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+
+import msgspec
 
 from app.core.config import (
-    TTL_BRAPI_HISTORY, TTL_BRAPI_QUOTE, TTL_EXPECTATIONS, TTL_SGS_DAILY, TTL_SGS_SLOW
+    TTL_BRAPI_QUOTE, TTL_EXPECTATIONS, TTL_SGS_DAILY, TTL_SGS_SLOW
+)
+from app.core.cache import cached_fetch
+from app.core.executor import submit
+from app.core.history import payload_fingerprint, record_payload
+from app.core.refresh import policy_ttl
+from app.core.timing import record_phase, timed_phase, timed_source
+from app.core.tracing import end_span, span, start_span
+from app.models.homepage import (
+    HomepagePayload, Meta, SignalItem, Signals, TopCard, WhatChangedItem, encode_payload, payload_to_dict
 )
-from app.core.cache import cache_get_fresh, cache_get_last_known, cache_set, cache_last_known_at_iso
 
 from app.providers.sgs import fetch_sgs_series, last_and_prev
-from app.providers.brapi import fetch_brapi_quote, fetch_brapi_history_daily
+from app.providers.brapi import fetch_brapi_quote
 from app.providers.expectations import get_cached_inflation_expectations_12m
 from app.providers.brapi import iso_now as iso_now_brapi
+from app.services.anomaly import ENGINE as ANOMALY, ingest_cached_brapi, significance
+from app.services.derived import evaluate_derived, latest
+from app.services.volatility import ENGINE as VOL_ENGINE, refresh_brapi_vol
 
 SGS_CODES = {
     "selic": 11,
@@ -31,308 +44,526 @@ def pct_change(new: float, old: float) -> Optional[float]:
         return None
     return (new / old - 1.0) * 100.0
 
-def annualized_vol_from_closes(closes: List[float], window_returns: int = 20, trading_days: int = 252) -> Optional[float]:
-    if len(closes) < window_returns + 1:
-        return None
-    tail = closes[-(window_returns + 1):]
-    returns = []
-    for i in range(1, len(tail)):
-        if tail[i - 1] <= 0 or tail[i] <= 0:
-            return None
-        returns.append(math.log(tail[i] / tail[i - 1]))
-    if len(returns) < 2:
-        return None
-    stdev = statistics.pstdev(returns)
-    return stdev * math.sqrt(trading_days) * 100.0
-
-def compute_ipca_12m_from_mm(ipca_mm_points: List[Dict[str, Any]]) -> Optional[float]:
-    if len(ipca_mm_points) < 12:
-        return None
-    tail = ipca_mm_points[-12:]
-    factor = 1.0
-    for p in tail:
-        factor *= (1.0 + (p["value"] / 100.0))
-    return (factor - 1.0) * 100.0
-
-def _cached_fetch(key: str, ttl: int, fn):
-    fresh = cache_get_fresh(key)
-    if fresh:
-        return fresh, {"hit": True, "stale": False, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": cache_last_known_at_iso(key)}
-    
-    # If not fresh, we execute the function.
-    # In the parallel version, this function is called inside a thread.
-    try:
-        data = fn()
-        if data is not None:
-            cache_set(key, data, ttl_seconds=ttl)
-            return data, {"hit": False, "stale": False, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": cache_last_known_at_iso(key)}
-    except Exception as e:
-        print(f"Error fetching {key}: {e}")
-
-    last_known = cache_get_last_known(key)
-    if last_known is not None:
-        return last_known, {"hit": False, "stale": True, "from_fallback": True, "ttl_seconds": ttl, "last_known_at": cache_last_known_at_iso(key)}
-    
-    return None, {"hit": False, "stale": True, "from_fallback": False, "ttl_seconds": ttl, "last_known_at": None}
-
-def build_homepage_payload() -> Dict[str, Any]:
-    today = date.today()
-    start_90d = today - timedelta(days=90)
-    start_2y = today - timedelta(days=900)
-    start_10y = today - timedelta(days=3650)
-
-    # Define tasks for parallel execution
-    # Each task returns (data, cache_info)
-    tasks = {}
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        # SGS
-        tasks["selic"] = executor.submit(_cached_fetch, "sgs:selic", TTL_SGS_DAILY, lambda: fetch_sgs_series(SGS_CODES["selic"], start_90d, today))
-        tasks["ipca"] = executor.submit(_cached_fetch, "sgs:ipca", TTL_SGS_SLOW, lambda: fetch_sgs_series(SGS_CODES["ipca_mm"], start_2y, today))
-        tasks["usd"] = executor.submit(_cached_fetch, "sgs:usdbrl", TTL_SGS_DAILY, lambda: fetch_sgs_series(SGS_CODES["usdbrl"], start_90d, today))
-        tasks["unemp"] = executor.submit(_cached_fetch, "sgs:unemployment", TTL_SGS_SLOW, lambda: fetch_sgs_series(SGS_CODES["unemployment"], start_10y, today))
-        tasks["gdp"] = executor.submit(_cached_fetch, "sgs:gdp", TTL_SGS_SLOW, lambda: fetch_sgs_series(SGS_CODES["gdp"], start_10y, today))
-        
-        # BRAPI
-        tasks["ibov_quote"] = executor.submit(_cached_fetch, "brapi:quote:^BVSP", TTL_BRAPI_QUOTE, lambda: fetch_brapi_quote(BRAPI_TICKERS["ibov"]))
-        tasks["ibov_hist"] = executor.submit(_cached_fetch, "brapi:hist:^BVSP:1mo:1d", TTL_BRAPI_HISTORY, lambda: fetch_brapi_history_daily(BRAPI_TICKERS["ibov"], range_="1mo", interval="1d"))
-        tasks["usd_hist"] = executor.submit(_cached_fetch, "brapi:hist:USDBRL:1mo:1d", TTL_BRAPI_HISTORY, lambda: fetch_brapi_history_daily(BRAPI_TICKERS["usdbrl"], range_="1mo", interval="1d"))
-        
-        # Expectations
-        # Note: get_cached_inflation_expectations_12m handles its own caching logic internally differently, 
-        # but for consistency we can just call it directly as it's fast (it reads from internal cache or fetches)
-        # However, to be safe, we run it in thread too.
-        tasks["expectations"] = executor.submit(lambda: get_cached_inflation_expectations_12m("IPCA", True, TTL_EXPECTATIONS))
-
-        # Wait for all
-        concurrent.futures.wait(tasks.values())
-
-    # Collect results
-    selic_points, selic_cache = tasks["selic"].result()
-    ipca_points, ipca_cache = tasks["ipca"].result()
-    usd_points, usd_cache = tasks["usd"].result()
-    unemp_points, unemp_cache = tasks["unemp"].result()
-    gdp_points, gdp_cache = tasks["gdp"].result()
-    
-    ibov_quote, ibov_quote_cache = tasks["ibov_quote"].result()
-    ibov_hist, ibov_hist_cache = tasks["ibov_hist"].result()
-    usd_hist, usd_hist_cache = tasks["usd_hist"].result()
-    
-    exp_bundle = tasks["expectations"].result()
-    expectations = exp_bundle["data"]
-
-    # Process Data
-    selic_last, selic_prev = last_and_prev(selic_points or [])
-    ipca_last, ipca_prev = last_and_prev(ipca_points or [])
-    usd_last, usd_prev = last_and_prev(usd_points or [])
-    unemp_last, unemp_prev = last_and_prev(unemp_points or [])
-    gdp_last, gdp_prev = last_and_prev(gdp_points or [])
-
-    ipca_12m = compute_ipca_12m_from_mm(ipca_points or [])
-
-    ibov_vol = None
-    if ibov_hist:
-        closes = [x["close"] for x in ibov_hist if isinstance(x.get("close"), (int, float))]
-        ibov_vol = annualized_vol_from_closes(closes)
-
-    usd_vol = None
-    if usd_hist:
-        closes = [x["close"] for x in usd_hist if isinstance(x.get("close"), (int, float))]
-        usd_vol = annualized_vol_from_closes(closes)
+def vol_extra(snap: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not snap:
+        return {}
+    return {"windows": snap["windows"], "ewma": snap["ewma"], "as_of": snap["as_of"], "unit": "% a.a."}
+
+def _expectations_bundle() -> Tuple[Any, Dict[str, Any]]:
+    with timed_source("expectations:IPCA") as timing:
+        bundle = get_cached_inflation_expectations_12m("IPCA", True, policy_ttl("expectations", TTL_EXPECTATIONS))
+        timing["hit"] = bool(bundle["cache"].get("hit"))
+        return bundle["data"], bundle["cache"]
+
+class HomepageSnapshot:
+    # The last built payload, already encoded. `version` only moves when the
+    # data does (same fingerprint as the history), so pages embedding it can
+    # be cached per version. `stale_body` is the same payload with
+    # meta.stale set, served as-is when the endpoint sheds load or the
+    # snapshot is older than wanted. `built_at` moves on every build, even
+    # when the data (and so the version) didn't change.
+    __slots__ = ("version", "body", "stale_body", "payload", "created_at", "built_at")
+
+    def __init__(self, version: str, body: bytes, payload: HomepagePayload) -> None:
+        self.version = version
+        self.body = body
+        self.payload = payload
+        self.created_at = self.built_at = time.time()
+        if payload.meta.stale:
+            self.stale_body = body
+        else:
+            self.stale_body = encode_payload(msgspec.structs.replace(payload, meta=msgspec.structs.replace(payload.meta, stale=True)))
+
+_snapshot: Optional[HomepageSnapshot] = None
+_inflight: Optional[asyncio.Future] = None
+
+def current_snapshot() -> Optional[HomepageSnapshot]:
+    return _snapshot
+
+def _publish(payload: HomepagePayload) -> None:
+    global _snapshot
+    as_dict = payload_to_dict(payload)
+    version = payload_fingerprint(as_dict)[:16]
+    if _snapshot is None or _snapshot.version != version or _snapshot.payload.meta.stale != payload.meta.stale:
+        _snapshot = HomepageSnapshot(version, encode_payload(payload), payload)
     else:
-        # fallback to SGS values as closes
-        if usd_points:
-            closes = [x["value"] for x in usd_points[-60:]]
-            usd_vol = annualized_vol_from_closes(closes)
-
-    # Real rate approx
-    real_rate = None
-    if selic_last and ipca_12m is not None:
-        real_rate = selic_last["value"] - ipca_12m
-
-    # Build sections
-    top_cards: List[Dict[str, Any]] = []
-
-    # IBOV
-    top_cards.append({
-        "key": "ibov",
-        "label": "IBOV",
-        "value": ibov_quote["value"] if ibov_quote else None,
-        "unit": "pts",
-        "change_1d": ibov_quote.get("change_pct") if ibov_quote else None,
-        "change_1d_unit": "%",
-        "last_update": ibov_quote.get("last_update") if ibov_quote else iso_now_brapi(),
-    })
-
-    # USD/BRL (SGS)
-    top_cards.append({
-        "key": "usdbrl",
-        "label": "USD/BRL",
-        "value": usd_last["value"] if usd_last else None,
-        "unit": "BRL",
-        "change_1d": (usd_last["value"] - usd_prev["value"]) if (usd_last and usd_prev) else None,
-        "change_1d_unit": "BRL",
-        "last_update": (usd_last["date"] + "T00:00:00Z") if usd_last else iso_now_brapi(),
-    })
-
-    # SELIC
-    top_cards.append({
-        "key": "selic",
-        "label": "SELIC",
-        "value": selic_last["value"] if selic_last else None,
-        "unit": "% a.a.",
-        "change_1d": (selic_last["value"] - selic_prev["value"]) if (selic_last and selic_prev) else None,
-        "change_1d_unit": "p.p.",
-        "last_update": (selic_last["date"] + "T00:00:00Z") if selic_last else iso_now_brapi(),
-    })
-
-    # IPCA m/m last
-    top_cards.append({
-        "key": "ipca_last",
-        "label": "IPCA (m/m)",
-        "value": ipca_last["value"] if ipca_last else None,
-        "unit": "%",
-        "change_1d": (ipca_last["value"] - ipca_prev["value"]) if (ipca_last and ipca_prev) else None,
-        "change_1d_unit": "p.p.",
-        "last_update": (ipca_last["date"] + "T00:00:00Z") if ipca_last else iso_now_brapi(),
-    })
-
-    what_changed_today: List[Dict[str, Any]] = []
+        _snapshot.built_at = time.time()
+    submit(record_payload, as_dict)
+
+async def build_homepage_payload() -> HomepagePayload:
+    # The payload is the same for everyone, so concurrent requests share one
+    # in-flight build instead of each fanning out their own fetches.
+    global _inflight
+    task = _inflight
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = _inflight = asyncio.ensure_future(_build_traced())
+        return await asyncio.shield(task)
+    started = time.perf_counter()
+    payload = await asyncio.shield(task)
+    record_phase("coalesced", started)
+    return payload
+
+async def _build_traced() -> HomepagePayload:
+    with span("homepage.build"):
+        return await _build_homepage_payload()
+
+def _vol_and_moves(ticker: str):
+    # The vol refresh caches the daily closes; the move stats read them after.
+    result = refresh_brapi_vol(ticker)
+    ingest_cached_brapi(ticker)
+    return result
+
+def _anomaly(stream: str, move: Optional[float] = None) -> Dict[str, Any]:
+    scored = ANOMALY.score(stream, move)
+    return {"zscore": scored.get("zscore"), "percentile": scored.get("percentile")}
+
+# Inputs
+#
+# Every upstream input of the page, fetched only when a requested section
+# needs it. Each returns (data, cache_info).
+
+def _fetch_sgs_input(cache_key: str, name: str, ttl: int, days: int) -> Tuple[Any, Dict[str, Any]]:
+    code = SGS_CODES[name]
+    today = date.today()
+    return cached_fetch(cache_key, policy_ttl("sgs", ttl, code=code), lambda: fetch_sgs_series(code, today - timedelta(days=days), today))
+
+INPUTS: Dict[str, Callable[[], Tuple[Any, Dict[str, Any]]]] = {
+    "selic": lambda: _fetch_sgs_input("sgs:selic", "selic", TTL_SGS_DAILY, 90),
+    "ipca": lambda: _fetch_sgs_input("sgs:ipca", "ipca_mm", TTL_SGS_SLOW, 900),
+    "usd": lambda: _fetch_sgs_input("sgs:usdbrl", "usdbrl", TTL_SGS_DAILY, 90),
+    "unemp": lambda: _fetch_sgs_input("sgs:unemployment", "unemployment", TTL_SGS_SLOW, 3650),
+    "gdp": lambda: _fetch_sgs_input("sgs:gdp", "gdp", TTL_SGS_SLOW, 3650),
+    "ibov_quote": lambda: cached_fetch("brapi:quote:^BVSP", policy_ttl("brapi_quote", TTL_BRAPI_QUOTE), lambda: fetch_brapi_quote(BRAPI_TICKERS["ibov"])),
+    # History feeds the streaming vol engine; it only pulls long history to seed.
+    "ibov_vol": lambda: _vol_and_moves(BRAPI_TICKERS["ibov"]),
+    "usd_vol": lambda: refresh_brapi_vol(BRAPI_TICKERS["usdbrl"]),
+    "expectations": _expectations_bundle,
+}
+
+# where each input's cache info goes in meta.sources
+SOURCE_PATHS = {
+    "selic": ("sgs", "selic"), "ipca": ("sgs", "ipca"), "usd": ("sgs", "usdbrl"),
+    "unemp": ("sgs", "unemployment"), "gdp": ("sgs", "gdp"),
+    "ibov_quote": ("brapi", "ibov_quote"), "ibov_vol": ("brapi", "ibov_history"), "usd_vol": ("brapi", "usd_history"),
+    "expectations": ("expectations", None),
+}
+# inputs whose fallback marks the response stale
+STALE_INPUTS = ("selic", "ipca", "usd", "ibov_quote", "expectations")
+
+class _Inputs:
+    # Fetched inputs plus the values computed from them, each computed on
+    # first use so a section only pays for what it reads.
+    def __init__(self, results: Dict[str, Tuple[Any, Dict[str, Any]]]):
+        self.results = results
+
+    def data(self, name: str) -> Any:
+        return self.results[name][0] if name in self.results else None
+
+    def cache(self, name: str) -> Dict[str, Any]:
+        return self.results[name][1] if name in self.results else {}
+
+    def last_prev(self, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        return last_and_prev(self.data(name) or [])
+
+    @cached_property
+    def derived(self) -> Dict[str, Any]:
+        expectations = self.data("expectations")
+        return evaluate_derived(
+            {"selic": self.data("selic"), "ipca_mm": self.data("ipca")},
+            {"expectations.ipca_12m": expectations["value"] if expectations else None},
+        )
+
+    @cached_property
+    def usd_vol(self) -> Tuple[Optional[float], Optional[Dict[str, Any]], bool]:
+        usd_vol_snap = self.data("usd_vol")
+        usd_vol = usd_vol_snap["windows"].get("20") if usd_vol_snap else None
+        usd_vol_from_brapi = usd_vol is not None
+        usd_points = self.data("usd")
+        if not usd_vol_from_brapi and usd_points:
+            # fallback to SGS values as closes
+            VOL_ENGINE.ingest("sgs:usdbrl", usd_points, value_key="value")
+            usd_vol_snap = VOL_ENGINE.snapshot("sgs:usdbrl")
+            usd_vol = usd_vol_snap["windows"].get("20") if usd_vol_snap else None
+        return usd_vol, usd_vol_snap, usd_vol_from_brapi
+
+    def sources(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in INPUTS:
+            if name not in self.results:
+                continue
+            group, key = SOURCE_PATHS[name]
+            if key is None:
+                out[group] = self.cache(name)
+            else:
+                out.setdefault(group, {})[key] = self.cache(name)
+        return out
+
+    def stale(self) -> bool:
+        # Stale overall if any important provider is stale fallback
+        return any(self.cache(name).get("stale") for name in STALE_INPUTS)
+
+async def _gather(names: Iterable[str]) -> _Inputs:
+    fetch_started = time.perf_counter()
+    # Shared process-wide pool (app.core.executor); the event loop stays free meanwhile
+    wanted = set(names)
+    tasks = {name: submit(INPUTS[name]) for name in INPUTS if name in wanted}
+    if tasks:
+        await asyncio.wait([asyncio.wrap_future(f) for f in tasks.values()])
+    record_phase("fetch", fetch_started)
+    return _Inputs({name: f.result() for name, f in tasks.items()})
+
+# Sections
+
+def _top_cards(c: _Inputs) -> List[TopCard]:
+    ibov_quote = c.data("ibov_quote")
+    usd_last, usd_prev = c.last_prev("usd")
+    selic_last, selic_prev = c.last_prev("selic")
+    ipca_last, ipca_prev = c.last_prev("ipca")
+    return [
+        TopCard(
+            key="ibov",
+            label="IBOV",
+            value=ibov_quote["value"] if ibov_quote else None,
+            unit="pts",
+            change_1d=ibov_quote.get("change_pct") if ibov_quote else None,
+            change_1d_unit="%",
+            last_update=ibov_quote.get("last_update") if ibov_quote else iso_now_brapi(),
+        ),
+        # USD/BRL (SGS)
+        TopCard(
+            key="usdbrl",
+            label="USD/BRL",
+            value=usd_last["value"] if usd_last else None,
+            unit="BRL",
+            change_1d=(usd_last["value"] - usd_prev["value"]) if (usd_last and usd_prev) else None,
+            change_1d_unit="BRL",
+            last_update=(usd_last["date"] + "T00:00:00Z") if usd_last else iso_now_brapi(),
+        ),
+        TopCard(
+            key="selic",
+            label="SELIC",
+            value=selic_last["value"] if selic_last else None,
+            unit="% a.a.",
+            change_1d=(selic_last["value"] - selic_prev["value"]) if (selic_last and selic_prev) else None,
+            change_1d_unit="p.p.",
+            last_update=(selic_last["date"] + "T00:00:00Z") if selic_last else iso_now_brapi(),
+        ),
+        # IPCA m/m last
+        TopCard(
+            key="ipca_last",
+            label="IPCA (m/m)",
+            value=ipca_last["value"] if ipca_last else None,
+            unit="%",
+            change_1d=(ipca_last["value"] - ipca_prev["value"]) if (ipca_last and ipca_prev) else None,
+            change_1d_unit="p.p.",
+            last_update=(ipca_last["date"] + "T00:00:00Z") if ipca_last else iso_now_brapi(),
+        ),
+    ]
+
+def _what_changed_today(c: _Inputs) -> List[WhatChangedItem]:
+    ibov_quote = c.data("ibov_quote")
+    usd_points, selic_points, ipca_points, unemp_points, gdp_points = (c.data(n) for n in ("usd", "selic", "ipca", "unemp", "gdp"))
+    usd_last, usd_prev = c.last_prev("usd")
+    selic_last, selic_prev = c.last_prev("selic")
+    ipca_last, ipca_prev = c.last_prev("ipca")
+    unemp_last, unemp_prev = c.last_prev("unemp")
+    gdp_last, gdp_prev = c.last_prev("gdp")
+
+    # Moves are scored against each series' own history (app.services.anomaly)
+    ANOMALY.ingest("sgs:usdbrl", usd_points or [], "pct")
+    ANOMALY.ingest("sgs:selic", selic_points or [], "diff")
+    ANOMALY.ingest("sgs:ipca_mm", ipca_points or [], "diff")
+    ANOMALY.ingest("sgs:unemployment", unemp_points or [], "diff")
+    ANOMALY.ingest("sgs:gdp", gdp_points or [], "diff")
+
+    what_changed_today: List[WhatChangedItem] = []
 
     if ibov_quote:
-        what_changed_today.append({
-            "key": "ibov_delta_1d",
-            "label": "IBOV Δ 1d",
-            "value": ibov_quote.get("change_pct"),
-            "unit": "%",
-            "extra": {"delta_pts": ibov_quote.get("change_abs"), "delta_pts_unit": "pts"},
-            "last_update": ibov_quote.get("last_update"),
-            "period_label": "1d"
-        })
+        what_changed_today.append(WhatChangedItem(
+            key="ibov_delta_1d",
+            label="IBOV Δ 1d",
+            value=ibov_quote.get("change_pct"),
+            unit="%",
+            extra={"delta_pts": ibov_quote.get("change_abs"), "delta_pts_unit": "pts"},
+            last_update=ibov_quote.get("last_update"),
+            period_label="1d",
+            **_anomaly(BRAPI_TICKERS["ibov"], ibov_quote.get("change_pct")),
+        ))
 
     if usd_last and usd_prev:
-        what_changed_today.append({
-            "key": "usdbrl_delta_1d",
-            "label": "USD/BRL Δ 1d",
-            "value": pct_change(usd_last["value"], usd_prev["value"]),
-            "unit": "%",
-            "extra": {"delta_brl": usd_last["value"] - usd_prev["value"], "delta_brl_unit": "BRL"},
-            "last_update": usd_last["date"] + "T00:00:00Z",
-            "period_label": "1d"
-        })
+        what_changed_today.append(WhatChangedItem(
+            key="usdbrl_delta_1d",
+            label="USD/BRL Δ 1d",
+            value=pct_change(usd_last["value"], usd_prev["value"]),
+            unit="%",
+            extra={"delta_brl": usd_last["value"] - usd_prev["value"], "delta_brl_unit": "BRL"},
+            last_update=usd_last["date"] + "T00:00:00Z",
+            period_label="1d",
+            **_anomaly("sgs:usdbrl"),
+        ))
 
     if selic_last and selic_prev:
-        what_changed_today.append({
-            "key": "selic_last",
-            "label": "SELIC (last)",
-            "value": selic_last["value"],
-            "unit": "% a.a.",
-            "extra": {"delta_pp": selic_last["value"] - selic_prev["value"], "delta_pp_unit": "p.p."},
-            "last_update": selic_last["date"] + "T00:00:00Z",
-            "period_label": "1d"
-        })
+        what_changed_today.append(WhatChangedItem(
+            key="selic_last",
+            label="SELIC (last)",
+            value=selic_last["value"],
+            unit="% a.a.",
+            extra={"delta_pp": selic_last["value"] - selic_prev["value"], "delta_pp_unit": "p.p."},
+            last_update=selic_last["date"] + "T00:00:00Z",
+            period_label="1d",
+            **_anomaly("sgs:selic"),
+        ))
 
     if ipca_last and ipca_prev:
-        what_changed_today.append({
-            "key": "ipca_mm_vs_prev",
-            "label": "IPCA (m/m) vs prev",
-            "value": ipca_last["value"] - ipca_prev["value"],
-            "unit": "p.p.",
-            "extra": {"ipca_mm_last": ipca_last["value"], "ipca_mm_prev": ipca_prev["value"], "unit": "%"},
-            "last_update": ipca_last["date"] + "T00:00:00Z",
-            "period_label": "m/m"
-        })
+        what_changed_today.append(WhatChangedItem(
+            key="ipca_mm_vs_prev",
+            label="IPCA (m/m) vs prev",
+            value=ipca_last["value"] - ipca_prev["value"],
+            unit="p.p.",
+            extra={"ipca_mm_last": ipca_last["value"], "ipca_mm_prev": ipca_prev["value"], "unit": "%"},
+            last_update=ipca_last["date"] + "T00:00:00Z",
+            period_label="m/m",
+            **_anomaly("sgs:ipca_mm"),
+        ))
 
     if unemp_last and unemp_prev:
-        what_changed_today.append({
-            "key": "unemployment_vs_prev",
-            "label": "Desemprego vs prev",
-            "value": unemp_last["value"] - unemp_prev["value"],
-            "unit": "p.p.",
-            "extra": {"unemployment_last": unemp_last["value"], "unemployment_prev": unemp_prev["value"], "unit": "%"},
-            "last_update": unemp_last["date"] + "T00:00:00Z",
-            "period_label": "m/m"
-        })
+        what_changed_today.append(WhatChangedItem(
+            key="unemployment_vs_prev",
+            label="Desemprego vs prev",
+            value=unemp_last["value"] - unemp_prev["value"],
+            unit="p.p.",
+            extra={"unemployment_last": unemp_last["value"], "unemployment_prev": unemp_prev["value"], "unit": "%"},
+            last_update=unemp_last["date"] + "T00:00:00Z",
+            period_label="m/m",
+            **_anomaly("sgs:unemployment"),
+        ))
 
     if gdp_last and gdp_prev:
-        what_changed_today.append({
-            "key": "gdp_vs_prev",
-            "label": "PIB vs prev",
-            "value": gdp_last["value"] - gdp_prev["value"],
-            "unit": "raw",
-            "extra": {"gdp_last": gdp_last["value"], "gdp_prev": gdp_prev["value"]},
-            "last_update": gdp_last["date"] + "T00:00:00Z",
-            "period_label": "q/q"
-        })
-
-    signals: Dict[str, Any] = {
-        "real_rate_approx": {
-            "key": "real_rate_approx",
-            "label": "Real Rate (approx)",
-            "value": real_rate,
-            "unit": "p.p.",
-            "last_update": iso_now_brapi(),
-            "components": {"selic": selic_last["value"] if selic_last else None, "ipca_12m_approx": ipca_12m},
-        },
-        "inflation_expectations_12m": {
-            "key": "inflation_expectations_12m",
-            "label": "Inflation expectations (12m) - median",
-            "value": expectations["value"] if expectations else None,
-            "unit": "%",
-            "last_update": expectations["last_update"] if expectations else iso_now_brapi(),
-            "source": "BCB Olinda (ExpectativasMercadoInflacao12Meses)",
-            "method": "median (prefer smoothed)",
-            "cache": exp_bundle["cache"],
-        },
-        "ibov_vol_20d_annualized": {
-            "key": "ibov_vol_20d_annualized",
-            "label": "IBOV 20d vol (annualized)",
-            "value": ibov_vol,
-            "unit": "% a.a.",
-            "last_update": iso_now_brapi(),
-            "cache": ibov_hist_cache,
-        },
-        "usdbrl_vol_20d_annualized": {
-            "key": "usdbrl_vol_20d_annualized",
-            "label": "USD/BRL 20d vol (annualized)",
-            "value": usd_vol,
-            "unit": "% a.a.",
-            "last_update": iso_now_brapi(),
-            "cache": usd_hist_cache if usd_hist else usd_cache,
-        },
-        "unemployment_latest": {
-            "key": "unemployment_latest",
-            "label": "Unemployment (latest)",
-            "value": unemp_last["value"] if unemp_last else None,
-            "unit": "%",
-            "last_update": (unemp_last["date"] + "T00:00:00Z") if unemp_last else iso_now_brapi(),
+        what_changed_today.append(WhatChangedItem(
+            key="gdp_vs_prev",
+            label="PIB vs prev",
+            value=gdp_last["value"] - gdp_prev["value"],
+            unit="raw",
+            extra={"gdp_last": gdp_last["value"], "gdp_prev": gdp_prev["value"]},
+            last_update=gdp_last["date"] + "T00:00:00Z",
+            period_label="q/q",
+            **_anomaly("sgs:gdp"),
+        ))
+    return what_changed_today
+
+def _real_rate_approx(c: _Inputs) -> SignalItem:
+    selic_last, _ = c.last_prev("selic")
+    derived = c.derived
+    return SignalItem(
+        key="real_rate_approx",
+        label="Real Rate (approx)",
+        value=latest(derived["real_rate"]),
+        unit="p.p.",
+        last_update=iso_now_brapi(),
+        components={
+            "selic": selic_last["value"] if selic_last else None, "ipca_12m_approx": latest(derived["ipca_12m"]),
+            "real_rate_ex_ante": latest(derived["real_rate_ex_ante"]),
         },
-        "gdp_latest": {
-            "key": "gdp_latest",
-            "label": "GDP (latest)",
-            "value": gdp_last["value"] if gdp_last else None,
-            "unit": "raw",
-            "last_update": (gdp_last["date"] + "T00:00:00Z") if gdp_last else iso_now_brapi(),
-        },
-    }
-
-    # Stale overall if any important provider is stale fallback
-    stale = any([
-        selic_cache.get("stale"), ipca_cache.get("stale"), usd_cache.get("stale"),
-        ibov_quote_cache.get("stale"), exp_bundle["cache"].get("stale")
-    ])
-
-    return {
-        "top_cards": top_cards,
-        "what_changed_today": what_changed_today,
-        "signals": signals,
-        "meta": {
-            "generated_at": iso_now_brapi(),
-            "stale": bool(stale),
-            "sources": {
-                "sgs": {"selic": selic_cache, "ipca": ipca_cache, "usdbrl": usd_cache, "unemployment": unemp_cache, "gdp": gdp_cache},
-                "brapi": {"ibov_quote": ibov_quote_cache, "ibov_history": ibov_hist_cache, "usd_history": usd_hist_cache},
-                "expectations": exp_bundle["cache"]
-            }
-        }
-    }
+    )
+
+def _inflation_expectations_12m(c: _Inputs) -> SignalItem:
+    expectations = c.data("expectations")
+    return SignalItem(
+        key="inflation_expectations_12m",
+        label="Inflation expectations (12m) - median",
+        value=expectations["value"] if expectations else None,
+        unit="%",
+        last_update=expectations["last_update"] if expectations else iso_now_brapi(),
+        source="BCB Olinda (ExpectativasMercadoInflacao12Meses)",
+        method="median (prefer smoothed)",
+        cache=c.cache("expectations"),
+    )
+
+def _ibov_vol_20d_annualized(c: _Inputs) -> SignalItem:
+    ibov_vol_snap = c.data("ibov_vol")
+    return SignalItem(
+        key="ibov_vol_20d_annualized",
+        label="IBOV 20d vol (annualized)",
+        value=ibov_vol_snap["windows"].get("20") if ibov_vol_snap else None,
+        unit="% a.a.",
+        last_update=iso_now_brapi(),
+        cache=c.cache("ibov_vol"),
+        extra=vol_extra(ibov_vol_snap),
+    )
+
+def _usdbrl_vol_20d_annualized(c: _Inputs) -> SignalItem:
+    usd_vol, usd_vol_snap, usd_vol_from_brapi = c.usd_vol
+    return SignalItem(
+        key="usdbrl_vol_20d_annualized",
+        label="USD/BRL 20d vol (annualized)",
+        value=usd_vol,
+        unit="% a.a.",
+        last_update=iso_now_brapi(),
+        cache=c.cache("usd_vol") if usd_vol_from_brapi else c.cache("usd"),
+        extra=vol_extra(usd_vol_snap),
+    )
+
+def _unemployment_latest(c: _Inputs) -> SignalItem:
+    unemp_last, _ = c.last_prev("unemp")
+    return SignalItem(
+        key="unemployment_latest",
+        label="Unemployment (latest)",
+        value=unemp_last["value"] if unemp_last else None,
+        unit="%",
+        last_update=(unemp_last["date"] + "T00:00:00Z") if unemp_last else iso_now_brapi(),
+    )
+
+def _gdp_latest(c: _Inputs) -> SignalItem:
+    gdp_last, _ = c.last_prev("gdp")
+    return SignalItem(
+        key="gdp_latest",
+        label="GDP (latest)",
+        value=gdp_last["value"] if gdp_last else None,
+        unit="raw",
+        last_update=(gdp_last["date"] + "T00:00:00Z") if gdp_last else iso_now_brapi(),
+    )
+
+# name -> (builder, inputs it reads)
+SIGNALS: Dict[str, Tuple[Callable[[_Inputs], SignalItem], Tuple[str, ...]]] = {
+    "real_rate_approx": (_real_rate_approx, ("selic", "ipca", "expectations")),
+    "inflation_expectations_12m": (_inflation_expectations_12m, ("expectations",)),
+    "ibov_vol_20d_annualized": (_ibov_vol_20d_annualized, ("ibov_vol",)),
+    "usdbrl_vol_20d_annualized": (_usdbrl_vol_20d_annualized, ("usd_vol", "usd")),
+    "unemployment_latest": (_unemployment_latest, ("unemp",)),
+    "gdp_latest": (_gdp_latest, ("gdp",)),
+}
+SECTIONS: Dict[str, Tuple[Callable[[_Inputs], Any], Tuple[str, ...]]] = {
+    "top_cards": (_top_cards, ("ibov_quote", "usd", "selic", "ipca")),
+    "what_changed_today": (_what_changed_today, ("ibov_quote", "ibov_vol", "usd", "selic", "ipca", "unemp", "gdp")),
+}
+FIELDS = list(SECTIONS) + ["signals"] + [f"signals.{name}" for name in SIGNALS]
+
+def validate_fields(fields: List[str]) -> Optional[str]:
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        return f"unknown fields {unknown}; available: {FIELDS}"
+    return None
+
+def _signal_names(fields: List[str]) -> List[str]:
+    if "signals" in fields:
+        return list(SIGNALS)
+    return [name for name in SIGNALS if f"signals.{name}" in fields]
+
+def fields_inputs(fields: List[str]) -> List[str]:
+    needed = set()
+    for field in fields:
+        if field in SECTIONS:
+            needed.update(SECTIONS[field][1])
+    for name in _signal_names(fields):
+        needed.update(SIGNALS[name][1])
+    return [name for name in INPUTS if name in needed]
+
+def sort_what_changed(items: List[WhatChangedItem]) -> List[WhatChangedItem]:
+    # by |z-score|, unscored last
+    return sorted(items, key=lambda i: significance(i.zscore))
+
+def snapshot_view(snapshot: HomepageSnapshot, fields: Optional[List[str]], sort: Optional[str]) -> bytes:
+    # The last full payload, marked stale, in the shape the live response
+    # for the same fields/sort would have. Used when the API sheds load.
+    if fields is None and not sort:
+        return snapshot.stale_body
+    payload = snapshot.payload
+    meta = msgspec.structs.replace(payload.meta, stale=True)
+    what_changed = sort_what_changed(payload.what_changed_today) if sort else payload.what_changed_today
+    if fields is None:
+        return encode_payload(msgspec.structs.replace(payload, what_changed_today=what_changed, meta=meta))
+    out: Dict[str, Any] = {}
+    if "top_cards" in fields:
+        out["top_cards"] = payload.top_cards
+    if "what_changed_today" in fields:
+        out["what_changed_today"] = what_changed
+    names = _signal_names(fields)
+    if names:
+        out["signals"] = {name: getattr(payload.signals, name) for name in names}
+    out["meta"] = meta
+    return encode_payload(out)
+
+def _meta(c: _Inputs) -> Meta:
+    return Meta(generated_at=iso_now_brapi(), stale=c.stale(), sources=c.sources())
+
+# Full payload
+
+async def _build_homepage_payload() -> HomepagePayload:
+    c = await _gather(INPUTS)
+    compute_started = time.perf_counter()
+    compute_span = start_span("homepage.compute")
+
+    payload = HomepagePayload(
+        top_cards=_top_cards(c),
+        what_changed_today=_what_changed_today(c),
+        signals=Signals(**{name: build(c) for name, (build, _) in SIGNALS.items()}),
+        meta=_meta(c),
+    )
+
+    end_span(compute_span)
+    record_phase("compute", compute_started)
+    _publish(payload)
+    return payload
+
+# Sections on their own
+#
+# Only the inputs the requested fields read are fetched and only their
+# sections are computed. The result carries its own validator and lifetime:
+# the ETag fingerprints the data (not clocks or cache bookkeeping, as for
+# snapshot versions), and max-age is the shortest remaining freshness among
+# the inputs used, so a client never holds a section past its data's TTL.
+
+class SectionResult:
+    __slots__ = ("body", "etag", "max_age", "stale")
+
+    def __init__(self, body: bytes, etag: str, max_age: int, stale: bool) -> None:
+        self.body = body
+        self.etag = etag
+        self.max_age = max_age
+        self.stale = stale
+
+    @property
+    def cache_control(self) -> str:
+        return "no-cache" if self.stale or self.max_age <= 0 else f"public, max-age={self.max_age}"
+
+def _remaining_ttl(info: Dict[str, Any], now: float) -> Optional[int]:
+    ttl, stored = info.get("ttl_seconds"), info.get("last_known_at")
+    if not isinstance(ttl, (int, float)) or not stored:
+        return None
+    stored_ts = datetime.fromisoformat(stored.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    return max(0, int(stored_ts + ttl - now))
+
+_section_inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+
+async def build_homepage_fields(fields: List[str], sort: Optional[str] = None) -> SectionResult:
+    # Same coalescing as the full build, per distinct field selection.
+    key = tuple(sorted(set(fields))) + ((f"sort={sort}",) if sort else ())
+    task = _section_inflight.get(key)
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = _section_inflight[key] = asyncio.ensure_future(_build_fields(sorted(set(fields)), sort))
+        task.add_done_callback(lambda t: _section_inflight.pop(key, None) if _section_inflight.get(key) is t else None)
+        return await asyncio.shield(task)
+    started = time.perf_counter()
+    result = await asyncio.shield(task)
+    record_phase("coalesced", started)
+    return result
+
+async def _build_fields(fields: List[str], sort: Optional[str]) -> SectionResult:
+    with span("homepage.sections", {"homepage.fields": ",".join(fields)}):
+        c = await _gather(fields_inputs(fields))
+        with timed_phase("compute"):
+            out: Dict[str, Any] = {}
+            for field in fields:
+                if field in SECTIONS:
+                    out[field] = SECTIONS[field][0](c)
+            if sort and "what_changed_today" in out:
+                out["what_changed_today"] = sort_what_changed(out["what_changed_today"])
+            names = _signal_names(fields)
+            if names:
+                out["signals"] = {name: SIGNALS[name][0](c) for name in names}
+            etag = '"' + payload_fingerprint(msgspec.to_builtins(out))[:20] + '"'
+            meta = _meta(c)
+            out["meta"] = meta
+            now = time.time()
+            remaining = [r for r in (_remaining_ttl(c.cache(name), now) for name in c.results) if r is not None]
+            return SectionResult(encode_payload(out), etag, min(remaining) if remaining else 0, meta.stale)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import threading
+import time
+
+import numpy as np
+
+from app.core.cache import cache_entry, cache_set
+from app.core.config import (
+    BRAPI_QUOTE_BATCH_SIZE, SCREENER_HISTORY_RANGE, SCREENER_REFRESH_SECONDS, SCREENER_TICKERS, TTL_BRAPI_HISTORY,
+)
+from app.core.ratelimit import PRIORITY_BACKGROUND, upstream_priority
+from app.core.refresh import policy_ttl
+from app.providers.brapi import fetch_brapi_histories, iso_now
+from app.services.volatility import TRADING_DAYS
+from app.services.watchlists import known_not_found, quote_key, refresh_quotes, stale_tickers
+
+# Ranks a few hundred B3 tickers by 1d change, 20d vol and drawdown.
+# Upstream: quotes and daily history in multi-ticker BRAPI calls at
+# background priority, stored under the same per-ticker cache keys the rest
+# of the app uses; whatever the rate limit defers is filled on a later cycle.
+# Compute: closes go into one tickers x days matrix and every metric is a
+# whole-matrix numpy pass. The ranked result is rebuilt at most once per
+# SCREENER_REFRESH_SECONDS, in the background: requests keep getting the
+# previous result meanwhile and only pick a precomputed order and slice.
+
+# IBOV theoretical portfolio (B3), override with SCREENER_TICKERS. The
+# portfolio changes every four months; a ticker BRAPI no longer knows is
+# reported under meta.not_found and does not make the result stale.
+IBOV_CONSTITUENTS = [
+    "ABEV3", "ALOS3", "ASAI3", "AURE3", "AXIA3", "AXIA6", "AZZA3", "B3SA3", "BBAS3", "BBDC3",
+    "BBDC4", "BBSE3", "BEEF3", "BPAC11", "BRAP4", "BRKM5", "CMIG4", "CMIN3", "COGN3", "CPFE3",
+    "CPLE6", "CSAN3", "CSNA3", "CVCB3", "CYRE3", "EGIE3", "EMBR3", "ENEV3", "ENGI11", "EQTL3",
+    "FLRY3", "GGBR4", "GOAU4", "HAPV3", "HYPE3", "IGTI11", "IRBR3", "ISAE4", "ITSA4", "ITUB4",
+    "KLBN11", "LREN3", "MBRF3", "MGLU3", "MOTV3", "MRVE3", "MULT3", "NATU3", "PCAR3", "PETR3",
+    "PETR4", "POMO4", "PRIO3", "PSSA3", "RADL3", "RAIL3", "RAIZ4", "RDOR3", "RECV3", "RENT3",
+    "SANB11", "SBSP3", "SLCE3", "SMTO3", "SUZB3", "TAEE11", "TIMS3", "TOTS3", "UGPA3", "USIM5",
+    "VALE3", "VAMO3", "VBBR3", "VIVA3", "VIVT3", "WEGE3", "YDUQ3",
+]
+
+VOL_WINDOW = 20
+METRICS = ("price", "change_1d", "vol_20d", "drawdown", "max_drawdown")
+SORT_KEYS = ("ticker",) + METRICS
+
+def history_key(ticker: str) -> str:
+    return f"brapi:hist:{ticker}:{SCREENER_HISTORY_RANGE}:1d"
+
+def _refresh_histories(tickers: List[str]) -> int:
+    # Batches for tickers whose cached history expired; returns upstream calls.
+    due = []
+    for t in tickers:
+        entry = cache_entry(history_key(t))
+        if (entry is None or not entry.fresh()) and not known_not_found(t):
+            due.append(t)
+    size = max(1, BRAPI_QUOTE_BATCH_SIZE)
+    ttl = policy_ttl("brapi_history", TTL_BRAPI_HISTORY)
+    calls = 0
+    with upstream_priority(PRIORITY_BACKGROUND):
+        for i in range(0, len(due), size):
+            calls += 1
+            for ticker, hist in fetch_brapi_histories(due[i:i + size], range_=SCREENER_HISTORY_RANGE, interval="1d").items():
+                cache_set(history_key(ticker), hist, ttl_seconds=ttl)
+    return calls
+
+def closes_matrix(histories: List[Optional[List[Dict[str, Any]]]]) -> Tuple[np.ndarray, np.ndarray]:
+    # (dates, closes): closes[i, j] is ticker i on dates[j], carried forward
+    # over days it did not trade and NaN before its first close.
+    dates = np.unique(np.array([p["date"] for h in histories if h for p in h], dtype="datetime64[D]"))
+    closes = np.full((len(histories), len(dates)), np.nan)
+    for i, hist in enumerate(histories):
+        if hist:
+            cols = np.searchsorted(dates, np.array([p["date"] for p in hist], dtype="datetime64[D]"))
+            closes[i, cols] = [p["close"] for p in hist]
+    # row-wise forward fill: index of the last finite column so far
+    idx = np.where(np.isfinite(closes), np.arange(len(dates)), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = np.take_along_axis(closes, idx, axis=1)
+    return dates, filled
+
+def compute_metrics(closes: np.ndarray) -> Dict[str, np.ndarray]:
+    n, days = closes.shape
+    nan = np.full(n, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = closes[:, -1] if days else nan
+        change_1d = (closes[:, -1] / closes[:, -2] - 1.0) * 100.0 if days >= 2 else nan
+
+        vol = nan
+        if days > VOL_WINDOW:
+            rets = np.diff(np.log(closes[:, -(VOL_WINDOW + 1):]), axis=1)
+            full = np.isfinite(rets).all(axis=1)
+            vol = np.where(full, rets.std(axis=1) * math.sqrt(TRADING_DAYS) * 100.0, np.nan)
+
+        drawdown = max_drawdown = nan
+        if days:
+            # NaN-safe running peak: leading NaNs count as -inf
+            peak = np.maximum.accumulate(np.where(np.isfinite(closes), closes, -np.inf), axis=1)
+            dd = (closes / peak - 1.0) * 100.0
+            drawdown = dd[:, -1]
+            max_drawdown = np.where(np.isfinite(dd).any(axis=1), np.nanmin(np.where(np.isfinite(dd), dd, np.inf), axis=1), np.nan)
+    return {"price": price, "change_1d": change_1d, "vol_20d": vol, "drawdown": drawdown, "max_drawdown": max_drawdown}
+
+class ScreenResult:
+    __slots__ = ("tickers", "metrics", "orders", "as_of", "generated_at", "built_at", "missing", "failed", "not_found", "calls")
+
+    def __init__(
+        self, tickers: List[str], metrics: Dict[str, np.ndarray], as_of: Optional[str],
+        missing: List[str], failed: List[str], not_found: List[str], calls: int,
+    ) -> None:
+        self.tickers = tickers
+        self.metrics = metrics
+        self.as_of = as_of
+        self.missing = missing
+        self.failed = failed
+        self.not_found = not_found
+        self.calls = calls
+        self.generated_at = iso_now()
+        self.built_at = time.time()
+        # ascending order per sort key, NaN last; descending is derived per request
+        self.orders: Dict[str, np.ndarray] = {"ticker": np.argsort(np.array(tickers), kind="stable")}
+        for name, values in metrics.items():
+            self.orders[name] = np.argsort(values, kind="stable")
+
+    def ranked(self, sort: str, descending: bool) -> np.ndarray:
+        order = self.orders[sort]
+        if not descending:
+            return order
+        if sort == "ticker":
+            return order[::-1]
+        values = self.metrics[sort][order]
+        finite = int(np.isfinite(values).sum())
+        return np.concatenate((order[:finite][::-1], order[finite:]))
+
+    def page(self, sort: str, descending: bool, page: int, page_size: int) -> Dict[str, Any]:
+        idx = self.ranked(sort, descending)[(page - 1) * page_size:page * page_size]
+        rows = []
+        for i in idx.tolist():
+            row: Dict[str, Any] = {"ticker": self.tickers[i]}
+            for name in METRICS:
+                v = float(self.metrics[name][i])
+                row[name] = v if math.isfinite(v) else None
+            rows.append(row)
+        return {
+            "items": rows,
+            "meta": {
+                "generated_at": self.generated_at,
+                "as_of": self.as_of,
+                "sort": sort,
+                "order": "desc" if descending else "asc",
+                "page": page,
+                "page_size": page_size,
+                "total": len(self.tickers),
+                "pages": max(1, math.ceil(len(self.tickers) / page_size)),
+                # no data yet / not refreshed this cycle / unknown to BRAPI
+                "missing": self.missing,
+                "failed": self.failed,
+                "not_found": self.not_found,
+                "stale": bool(self.failed),
+            },
+        }
+
+class Screener:
+    def __init__(self, tickers: List[str], refresh_seconds: float):
+        self.tickers = tickers
+        self.refresh_seconds = refresh_seconds
+        # held by the running build
+        self._lock = threading.Lock()
+        self._result: Optional[ScreenResult] = None
+        self.builds = 0
+        self.errors = 0
+
+    def result(self) -> Optional[ScreenResult]:
+        # Builds always run in the background (one at a time): a cold one is
+        # a dozen-plus rate-limited BRAPI batches. Callers get the previous
+        # result meanwhile, or None before the first build lands.
+        current = self._result
+        expired = current is None or time.time() - current.built_at >= self.refresh_seconds
+        if expired and self._lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild, name="screener-rebuild", daemon=True).start()
+        return current
+
+    def building(self) -> bool:
+        return self._lock.locked()
+
+    def _rebuild(self) -> None:
+        try:
+            self._result = self._build()
+        except Exception as e:
+            self.errors += 1
+            print(f"Error rebuilding screener: {e}")
+        finally:
+            self._lock.release()
+
+    def _build(self) -> ScreenResult:
+        calls = refresh_quotes(stale_tickers(set(self.tickers)))
+        calls += _refresh_histories(self.tickers)
+        self.builds += 1
+
+        histories = [_last_known(history_key(t)) for t in self.tickers]
+        dates, closes = closes_matrix(histories)
+        metrics = compute_metrics(closes)
+        # The live quote beats the last daily close for price and 1d change.
+        quotes = [_last_known(quote_key(t)) for t in self.tickers]
+        for name, field in (("price", "value"), ("change_1d", "change_pct")):
+            live = np.array([q.get(field) if q and q.get(field) is not None else np.nan for q in quotes], dtype=np.float64)
+            metrics[name] = np.where(np.isfinite(live), live, metrics[name])
+
+        not_found = [t for t in self.tickers if known_not_found(t)]
+        unknown = set(not_found)
+        missing = [t for t, h, q in zip(self.tickers, histories, quotes) if not h and not q and t not in unknown]
+        # stale only counts what we tried to refresh and couldn't
+        failed = [t for t in self.tickers if t not in unknown and not (_fresh(quote_key(t)) and _fresh(history_key(t)))]
+        as_of = str(dates[-1]) if len(dates) else None
+        return ScreenResult(self.tickers, metrics, as_of, missing, failed, not_found, calls)
+
+    def stats(self) -> Dict[str, Any]:
+        current = self._result
+        return {
+            "tickers": len(self.tickers),
+            "builds": self.builds,
+            "generated_at": current.generated_at if current else None,
+            "missing": len(current.missing) if current else None,
+            "failed": len(current.failed) if current else None,
+            "not_found": len(current.not_found) if current else None,
+            "building": self.building(),
+            "errors": self.errors,
+            "last_calls": current.calls if current else None,
+        }
+
+def _last_known(key: str) -> Any:
+    entry = cache_entry(key)
+    return entry.value if entry is not None else None
+
+def _fresh(key: str) -> bool:
+    entry = cache_entry(key)
+    return entry is not None and entry.fresh()
+
+SCREENER = Screener(SCREENER_TICKERS or IBOV_CONSTITUENTS, SCREENER_REFRESH_SECONDS)
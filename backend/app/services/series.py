@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import bisect
+import concurrent.futures
+
+from app.core.config import TTL_BRAPI_HISTORY, TTL_SGS_DAILY
+from app.core.cache import cache_get_fresh, cached_fetch
+from app.core.columnar import columns_from_points
+from app.core.executor import submit
+from app.core.ratelimit import PRIORITY_BACKGROUND, run_with_priority
+from app.core.refresh import policy_ttl
+
+from app.providers.sgs import fetch_sgs_series
+from app.providers.brapi import fetch_brapi_history_daily, iso_now
+
+# BRAPI only takes relative ranges, so we pick the smallest one covering the
+# requested start and trim afterwards. Keys match the homepage's history keys
+# so both share the same cache entries.
+BRAPI_RANGES = [
+    ("1mo", 31), ("3mo", 92), ("6mo", 183), ("1y", 366),
+    ("2y", 731), ("5y", 1827), ("10y", 3653), ("max", None),
+]
+
+def brapi_range_for(start: date, today: Optional[date] = None) -> str:
+    today = today or date.today()
+    span = (today - start).days
+    for name, days in BRAPI_RANGES:
+        if days is None or span <= days:
+            return name
+    return "max"
+
+def _in_range(points: List[Dict[str, Any]], start: date, end: date) -> List[Dict[str, Any]]:
+    # points are date-sorted, so slicing keeps the cached dicts as-is
+    lo = bisect.bisect_left(points, start.isoformat(), key=lambda p: p["date"])
+    hi = bisect.bisect_right(points, end.isoformat(), key=lambda p: p["date"])
+    return points[lo:hi]
+
+def _sgs_key(code: int, start: date, end: date) -> str:
+    return f"sgs:{code}:{start.isoformat()}:{end.isoformat()}"
+
+def _brapi_key(ticker: str, start: date) -> str:
+    return f"brapi:hist:{ticker}:{brapi_range_for(start)}:1d"
+
+def fetch_sgs_range(code: int, start: date, end: date) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    key = _sgs_key(code, start, end)
+    return cached_fetch(key, policy_ttl("sgs", TTL_SGS_DAILY, code=code), lambda: fetch_sgs_series(code, start, end))
+
+def fetch_brapi_range_raw(ticker: str, start: date, end: date) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    # Cached {"date", "close"} rows trimmed to [start, end].
+    range_ = brapi_range_for(start)
+    key = _brapi_key(ticker, start)
+    hist, cache_info = cached_fetch(key, policy_ttl("brapi_history", TTL_BRAPI_HISTORY), lambda: fetch_brapi_history_daily(ticker, range_=range_, interval="1d"))
+    if hist is None:
+        return None, cache_info
+    return _in_range(hist, start, end), cache_info
+
+def fetch_brapi_range(ticker: str, start: date, end: date) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    hist, cache_info = fetch_brapi_range_raw(ticker, start, end)
+    if hist is None:
+        return None, cache_info
+    return [{"date": x["date"], "value": x["close"]} for x in hist], cache_info
+
+def _fetch_sgs_raw(code: int, start: date, end: date) -> Tuple[Optional[List[Dict[str, Any]]], str, Dict[str, Any]]:
+    points, cache_info = fetch_sgs_range(code, start, end)
+    return points, "value", cache_info
+
+def _fetch_brapi_raw(ticker: str, start: date, end: date) -> Tuple[Optional[List[Dict[str, Any]]], str, Dict[str, Any]]:
+    points, cache_info = fetch_brapi_range_raw(ticker, start, end)
+    return points, "close", cache_info
+
+def _json_item(source: str, id_: str, points: Optional[List[Dict[str, Any]]], value_key: str, cache_info: Dict[str, Any]) -> Dict[str, Any]:
+    if points is not None and value_key != "value":
+        points = [{"date": p["date"], "value": p[value_key]} for p in points]
+    return {"source": source, "id": id_, "points": points, "cache": cache_info}
+
+def _columnar_item(source: str, id_: str, points: Optional[List[Dict[str, Any]]], value_key: str, cache_info: Dict[str, Any]) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"source": source, "id": id_, "cache": cache_info}
+    item.update(columns_from_points(points or [], value_key))
+    if points is None:
+        item["n"] = None
+    return item
+
+def _iter_raw(sgs_codes: List[int], tickers: List[str], start: date, end: date) -> Iterator[Tuple[str, str, Optional[List[Dict[str, Any]]], str, Dict[str, Any]]]:
+    # Cache hits are answered right away; only the misses go to the pool,
+    # where the per-host caps in app.core.http keep us polite to BCB/BRAPI.
+    # Batch work is background priority so it never eats the homepage's budget.
+    hits, misses = [], []
+    for code in sgs_codes:
+        fresh = cache_get_fresh(_sgs_key(code, start, end)) is not None
+        (hits if fresh else misses).append(("sgs", str(code), _fetch_sgs_raw, code))
+    for ticker in tickers:
+        fresh = cache_get_fresh(_brapi_key(ticker, start)) is not None
+        (hits if fresh else misses).append(("brapi", ticker, _fetch_brapi_raw, ticker))
+
+    # Misses go to the shared executor, so concurrency stays bounded across
+    # requests. Callers run in Starlette's threadpool, never in that executor,
+    # so blocking on its futures here can't deadlock it.
+    futures = {
+        submit(run_with_priority, PRIORITY_BACKGROUND, fn, arg, start, end): (source, id_)
+        for source, id_, fn, arg in misses
+    }
+    try:
+        # The misses are already under way while the hits are served here.
+        for source, id_, fn, arg in hits:
+            yield (source, id_) + run_with_priority(PRIORITY_BACKGROUND, fn, arg, start, end)
+
+        for fut in concurrent.futures.as_completed(futures):
+            source, id_ = futures[fut]
+            points, value_key, cache_info = fut.result()
+            yield source, id_, points, value_key, cache_info
+    finally:
+        # a dropped stream shouldn't leave queued fetches behind
+        for fut in futures:
+            fut.cancel()
+
+def iter_series_batch(sgs_codes: List[int], tickers: List[str], start: date, end: date) -> Iterator[Dict[str, Any]]:
+    for raw in _iter_raw(sgs_codes, tickers, start, end):
+        yield _json_item(*raw)
+
+def build_series_batch(sgs_codes: List[int], tickers: List[str], start: date, end: date, columnar: bool = False) -> Dict[str, Any]:
+    render = _columnar_item if columnar else _json_item
+    items = [render(*raw) for raw in _iter_raw(sgs_codes, tickers, start, end)]
+    # Keep the document order stable (request order), not completion order.
+    order = {("sgs", str(c)): i for i, c in enumerate(sgs_codes)}
+    order.update({("brapi", t): len(sgs_codes) + i for i, t in enumerate(tickers)})
+    items.sort(key=lambda x: order.get((x["source"], x["id"]), 0))
+
+    return {
+        "series": items,
+        "meta": {
+            "generated_at": iso_now(),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "stale": any(x["cache"].get("stale") for x in items),
+        }
+    }
+
+def default_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    end = end or date.today()
+    start = start or (end - timedelta(days=365))
+    return start, end
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import bisect
+import concurrent.futures
+import math
+import threading
+
+from app.core.config import TTL_BRAPI_HISTORY, VOL_EWMA_LAMBDA, VOL_WINDOWS
+from app.core.cache import cached_fetch
+from app.core.executor import submit
+from app.core.refresh import final_bars, policy_ttl
+from app.providers.brapi import fetch_brapi_history_daily, iso_now
+
+TRADING_DAYS = 252
+
+class RollingWelford:
+    # Population mean/variance over the last `window` values, O(1) per push.
+    def __init__(self, window: int):
+        self.window = window
+        self.buf: Deque[float] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float) -> None:
+        self.buf.append(x)
+        n = len(self.buf)
+        d = x - self.mean
+        self.mean += d / n
+        self.m2 += d * (x - self.mean)
+        if n > self.window:
+            old = self.buf.popleft()
+            n -= 1
+            prev_mean = self.mean
+            self.mean = (prev_mean * (n + 1) - old) / n
+            self.m2 -= (old - prev_mean) * (old - self.mean)
+
+    def pstdev(self) -> Optional[float]:
+        if len(self.buf) < self.window or self.window < 2:
+            return None
+        return math.sqrt(max(self.m2, 0.0) / len(self.buf))
+
+class SeriesVol:
+    def __init__(self, windows: List[int], ewma_lambda: float):
+        self.windows = {w: RollingWelford(w) for w in windows}
+        self.ewma_lambda = ewma_lambda
+        self.ewma_var: Optional[float] = None
+        self.last_date: Optional[str] = None
+        self.last_close: Optional[float] = None
+        self.n_returns = 0
+
+    def push_close(self, d: str, close: float) -> None:
+        prev = self.last_close
+        self.last_date = d
+        if close <= 0:
+            # Same rule as before: a non-positive close breaks the return chain.
+            self.last_close = None
+            return
+        self.last_close = close
+        if prev is None:
+            return
+        r = math.log(close / prev)
+        self.n_returns += 1
+        for acc in self.windows.values():
+            acc.push(r)
+        lam = self.ewma_lambda
+        self.ewma_var = r * r if self.ewma_var is None else lam * self.ewma_var + (1.0 - lam) * r * r
+
+    def annualized(self) -> Dict[str, Any]:
+        scale = math.sqrt(TRADING_DAYS) * 100.0
+        windows = {}
+        for w, acc in self.windows.items():
+            sd = acc.pstdev()
+            windows[str(w)] = sd * scale if sd is not None else None
+        ewma = math.sqrt(self.ewma_var) * scale if self.ewma_var is not None and self.n_returns >= 2 else None
+        return {"windows": windows, "ewma": ewma, "as_of": self.last_date, "n_returns": self.n_returns}
+
+class VolatilityEngine:
+    def __init__(self, windows: List[int], ewma_lambda: float):
+        self.windows = sorted(set(w for w in windows if w >= 2))
+        self.ewma_lambda = ewma_lambda
+        self.series: Dict[str, SeriesVol] = {}
+        self.lock = threading.Lock()
+
+    def last_date(self, name: str) -> Optional[str]:
+        with self.lock:
+            s = self.series.get(name)
+            return s.last_date if s else None
+
+    def ingest(self, name: str, points: List[Dict[str, Any]], value_key: str = "close") -> None:
+        # points are date-sorted and final (see refresh_brapi_vol); only those
+        # after the last ingested date count.
+        with self.lock:
+            s = self.series.get(name)
+            if s is None:
+                s = SeriesVol(self.windows, self.ewma_lambda)
+                self.series[name] = s
+            start = 0
+            if s.last_date is not None:
+                start = bisect.bisect_right(points, s.last_date, key=lambda p: p["date"])
+            for p in points[start:]:
+                v = p.get(value_key)
+                if isinstance(v, (int, float)):
+                    s.push_close(p["date"], float(v))
+
+    def snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            s = self.series.get(name)
+            return s.annualized() if s else None
+
+    def vol(self, name: str, window: int) -> Optional[float]:
+        snap = self.snapshot(name)
+        if not snap:
+            return None
+        return snap["windows"].get(str(window))
+
+ENGINE = VolatilityEngine(VOL_WINDOWS, VOL_EWMA_LAMBDA)
+
+SEED_RANGE = "2y"
+DELTA_RANGE = "1mo"
+
+def _needs_seed(name: str, delta: Optional[List[Dict[str, Any]]]) -> bool:
+    # Seed from long history only when the engine has nothing for this series
+    # or the short refresh window no longer overlaps what it has seen.
+    last = ENGINE.last_date(name)
+    if last is None:
+        return True
+    return bool(delta) and delta[0]["date"] > last
+
+def refresh_brapi_vol(ticker: str, delta: Optional[List[Dict[str, Any]]] = None, delta_cache: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    # `delta` is the short (1mo) history the caller may already hold; the long
+    # seed history is fetched (and cached) only when the engine needs it.
+    cache_info = delta_cache
+    if delta is None:
+        delta, cache_info = cached_fetch(f"brapi:hist:{ticker}:{DELTA_RANGE}:1d", policy_ttl("brapi_history", TTL_BRAPI_HISTORY), lambda: fetch_brapi_history_daily(ticker, range_=DELTA_RANGE, interval="1d"))
+
+    if _needs_seed(ticker, delta):
+        seed, seed_cache = cached_fetch(f"brapi:hist:{ticker}:{SEED_RANGE}:1d", policy_ttl("brapi_history", TTL_BRAPI_HISTORY), lambda: fetch_brapi_history_daily(ticker, range_=SEED_RANGE, interval="1d"))
+        if seed:
+            ENGINE.ingest(ticker, final_bars(seed))
+            cache_info = cache_info or seed_cache
+    if delta:
+        # BRAPI's daily history ends with today's in-progress bar; it is
+        # ingested only once B3_BAR_FINAL has passed.
+        ENGINE.ingest(ticker, final_bars(delta))
+    return ENGINE.snapshot(ticker), cache_info or {}
+
+def build_volatility(tickers: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    futures = {t: submit(refresh_brapi_vol, t) for t in tickers}
+    concurrent.futures.wait(futures.values())
+    for t, fut in futures.items():
+        snap, cache_info = fut.result()
+        results[t] = {"vol": snap, "cache": cache_info}
+    return {
+        "series": results,
+        "meta": {
+            "generated_at": iso_now(),
+            "unit": "% a.a.",
+            "windows": ENGINE.windows,
+            "ewma_lambda": ENGINE.ewma_lambda,
+            "stale": any(r["cache"].get("stale") for r in results.values()),
+        }
+    }
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Set
+import re
+import threading
+import time
+
+from app.core.config import (
+    BRAPI_QUOTE_BATCH_SIZE, TTL_BRAPI_NOT_FOUND, TTL_BRAPI_QUOTE, WATCHLIST_ACTIVE_SECONDS,
+    WATCHLIST_MAX_TICKERS, WATCHLIST_MAX_USERS,
+)
+from app.core.cache import cache_entry, cache_get_fresh, cache_get_last_known, cache_set
+from app.core.ratelimit import PRIORITY_BACKGROUND, upstream_priority
+from app.core.refresh import policy_ttl
+from app.providers.brapi import fetch_brapi_quotes, iso_now
+
+# Users only register lists; quotes are fetched once per distinct ticker by
+# the shared poller and stored under the same "brapi:quote:<ticker>" keys
+# the homepage uses, so upstream cost scales with distinct tickers.
+TICKER_RE = re.compile(r"^[A-Z0-9^.=\-]{1,16}$")
+
+class WatchlistError(ValueError):
+    pass
+
+def quote_key(ticker: str) -> str:
+    return f"brapi:quote:{ticker}"
+
+def not_found_key(ticker: str) -> str:
+    return f"brapi:notfound:{ticker}"
+
+def known_not_found(ticker: str) -> bool:
+    # BRAPI answered without this ticker recently; don't ask again until
+    # TTL_BRAPI_NOT_FOUND has passed.
+    return cache_get_fresh(not_found_key(ticker)) is not None
+
+class WatchlistStore:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.lists: Dict[str, List[str]] = {}
+        self.last_seen: Dict[str, float] = {}
+
+    def put(self, user_id: str, tickers: List[str]) -> List[str]:
+        clean: List[str] = []
+        for t in tickers:
+            t = str(t).strip().upper()
+            if not TICKER_RE.match(t):
+                raise WatchlistError(f"invalid ticker: {t!r}")
+            if t not in clean:
+                clean.append(t)
+        if len(clean) > WATCHLIST_MAX_TICKERS:
+            raise WatchlistError(f"at most {WATCHLIST_MAX_TICKERS} tickers per watchlist")
+        with self.lock:
+            if user_id not in self.lists and len(self.lists) >= WATCHLIST_MAX_USERS:
+                raise WatchlistError("watchlist capacity reached")
+            self.lists[user_id] = clean
+            self.last_seen[user_id] = time.time()
+        return clean
+
+    def get(self, user_id: str) -> Optional[List[str]]:
+        with self.lock:
+            tickers = self.lists.get(user_id)
+            if tickers is not None:
+                self.last_seen[user_id] = time.time()
+            return list(tickers) if tickers is not None else None
+
+    def delete(self, user_id: str) -> bool:
+        with self.lock:
+            self.last_seen.pop(user_id, None)
+            return self.lists.pop(user_id, None) is not None
+
+    def active_union(self) -> Set[str]:
+        cutoff = time.time() - WATCHLIST_ACTIVE_SECONDS
+        with self.lock:
+            out: Set[str] = set()
+            for user_id, tickers in self.lists.items():
+                if self.last_seen.get(user_id, 0) >= cutoff:
+                    out.update(tickers)
+            return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            users = len(self.lists)
+        return {"users": users, "active_tickers": len(self.active_union())}
+
+STORE = WatchlistStore()
+
+def refresh_quotes(tickers: List[str]) -> int:
+    # Fetch the given tickers in BRAPI batches; returns upstream calls made.
+    calls = 0
+    size = max(1, BRAPI_QUOTE_BATCH_SIZE)
+    ttl = policy_ttl("brapi_quote", TTL_BRAPI_QUOTE)
+    with upstream_priority(PRIORITY_BACKGROUND):
+        for i in range(0, len(tickers), size):
+            chunk = tickers[i:i + size]
+            calls += 1
+            not_found: List[str] = []
+            for ticker, quote in fetch_brapi_quotes(chunk, not_found).items():
+                cache_set(quote_key(ticker), quote, ttl_seconds=ttl)
+            for ticker in not_found:
+                cache_set(not_found_key(ticker), True, ttl_seconds=TTL_BRAPI_NOT_FOUND)
+    return calls
+
+def stale_tickers(tickers: Set[str]) -> List[str]:
+    return sorted(t for t in tickers if cache_get_fresh(quote_key(t)) is None and not known_not_found(t))
+
+class QuotePoller:
+    def __init__(self, interval: float):
+        self.interval = max(1.0, interval)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[str] = None
+        self.last_calls = 0
+        self.last_tickers = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="quote-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        # Poll now instead of at the end of the interval (a list gained
+        # tickers nobody had a quote for).
+        self._wake.set()
+
+    def poll_once(self) -> None:
+        # Only tickers whose shared quote has expired; anything refreshed by
+        # the homepage in the meantime is skipped.
+        due = stale_tickers(STORE.active_union())
+        self.last_calls = refresh_quotes(due) if due else 0
+        self.last_tickers = len(due)
+        self.last_run = iso_now()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling watchlist quotes: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # however often it is woken, at most one poll per second
+            self._stop.wait(1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"last_run": self.last_run, "last_tickers": self.last_tickers, "last_calls": self.last_calls, "interval_seconds": self.interval}
+
+POLLER = QuotePoller(TTL_BRAPI_QUOTE)
+
+def watchlist_view(user_id: str) -> Optional[Dict[str, Any]]:
+    tickers = STORE.get(user_id)
+    if tickers is None:
+        return None
+
+    # Reads never go upstream. A ticker nobody watched before has no shared
+    # quote yet: it is served as pending and the poller is woken to fill it.
+    if any(cache_get_last_known(quote_key(t)) is None and not known_not_found(t) for t in tickers):
+        POLLER.wake()
+
+    items = []
+    for t in tickers:
+        entry = cache_entry(quote_key(t))
+        not_found = entry is None and known_not_found(t)
+        items.append({
+            "ticker": t,
+            "quote": entry.value if entry is not None else None,
+            "stale": not not_found and (entry is None or not entry.fresh()),
+            "pending": entry is None and not not_found,
+            "not_found": not_found,
+            "last_known_at": entry.stored_at_iso() if entry is not None else None,
+        })
+    return {
+        "user_id": user_id,
+        "items": items,
+        "meta": {
+            "generated_at": iso_now(),
+            "stale": any(x["stale"] for x in items),
+            "pending": any(x["pending"] for x in items),
+        },
+    }
+
+def watchlist_stats() -> Dict[str, Any]:
+    return dict(STORE.stats(), poller=POLLER.stats())
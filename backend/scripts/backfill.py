@@ -0,0 +1,30 @@
+# Runs the warehouse backfill in the foreground until every job is done.
+# Safe to interrupt: each step is checkpointed and the next run resumes.
+#   cd backend && PYTHONPATH=. python scripts/backfill.py
+from __future__ import annotations
+
+import json
+import sys
+import time
+
+from app.core.warehouse import WAREHOUSE, warehouse_stats
+from app.services.backfill import Backfiller
+
+def main() -> int:
+    if WAREHOUSE is None:
+        print("warehouse disabled (WAREHOUSE_ENABLED=0)")
+        return 1
+    runner = Backfiller(step_seconds=0, retry_seconds=30)
+    try:
+        while runner.run_once():
+            print(f"steps={runner.steps} errors={runner.errors}", end="\r", flush=True)
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        print("\ninterrupted; progress is checkpointed")
+        return 130
+    print()
+    print(json.dumps(warehouse_stats()["checkpoints"], indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# Multi-threaded stress test for the in-process cache (app.core.cache).
+# Mixed reads/writes over a shared key space, checking every read returns a
+# self-consistent entry, against a single-lock dict as the baseline.
+#   cd backend && PYTHONPATH=. python scripts/bench_cache.py [--threads 1,4,16] [--ops 200000]
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import CacheEntry, StripedCache
+
+class GlobalLockCache:
+    # One lock around every access: the design striping replaces.
+    def __init__(self) -> None:
+        self._map: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._map.get(key)
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(value, now + ttl_seconds, now)
+        with self._lock:
+            self._map[key] = entry
+        return entry
+
+def worker(cache: Any, keys: List[str], ops: int, write_ratio: float, seed: int, errors: List[str]) -> None:
+    rnd = random.Random(seed)
+    for i in range(ops):
+        key = keys[rnd.randrange(len(keys))]
+        if rnd.random() < write_ratio:
+            # the TTL travels inside the value, so a torn entry is detectable
+            ttl = 60 + rnd.randrange(1000)
+            cache.set(key, (key, ttl), ttl)
+            continue
+        entry = cache.get(key)
+        if entry is None:
+            continue
+        if entry.value[0] != key or abs((entry.expires_at - entry.stored_at) - entry.value[1]) > 1e-3:
+            errors.append(f"inconsistent entry for {key}: {entry}")
+
+def run(make: Any, threads: int, ops: int, keys: int, write_ratio: float) -> Dict[str, Any]:
+    cache = make()
+    names = [f"sgs:{i}:2020-01-01:2026-01-01" for i in range(keys)]
+    errors: List[str] = []
+    per = ops // threads
+    pool = [threading.Thread(target=worker, args=(cache, names, per, write_ratio, i, errors)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {"ops_per_s": per * threads / elapsed, "errors": len(errors), "first_error": errors[0] if errors else None}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=512)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--stripes", type=int, default=64)
+    args = parser.parse_args()
+
+    variants = {
+        "global-lock": GlobalLockCache,
+        "striped-1": lambda: StripedCache(1),
+        f"striped-{args.stripes}": lambda: StripedCache(args.stripes),
+    }
+    print(f"{'threads':>8} " + " ".join(f"{name:>16}" for name in variants))
+    failed = False
+    for threads in [int(t) for t in args.threads.split(",")]:
+        row = []
+        for name, make in variants.items():
+            res = run(make, threads, args.ops, args.keys, args.write_ratio)
+            row.append(f"{res['ops_per_s']:>14,.0f}/s")
+            if res["errors"]:
+                failed = True
+                print(f"  {name}: {res['errors']} inconsistent reads, e.g. {res['first_error']}")
+        print(f"{threads:>8} " + " ".join(row))
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Concurrency benchmark for /api/homepage/v1 (or --path) against a running server:
+#   uvicorn app.main:app --port 8000 &
+#   PYTHONPATH=. python scripts/bench_concurrency.py --url http://127.0.0.1:8000 --clients 10,100,1000
+# Reports latency percentiles and the server's peak thread count (sampled
+# from /api/status/upstream) at each concurrency level. Needs httpx.
+from __future__ import annotations
+
+from typing import Dict, List
+import argparse
+import asyncio
+import time
+
+import httpx
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+async def sample_threads(client: httpx.AsyncClient, url: str, peak: Dict[str, int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            r = await client.get(f"{url}/api/status/upstream")
+            ex = r.json().get("executor", {})
+            peak["threads"] = max(peak["threads"], ex.get("process_threads", 0))
+            peak["workers"] = max(peak["workers"], ex.get("workers", 0))
+            peak["queued"] = max(peak["queued"], ex.get("queued", 0))
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.1)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_level(url: str, path: str, clients: int, per_client: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients + 1, max_keepalive_connections=clients + 1)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for _ in range(per_client):
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(f"{url}{path}")
+                    if r.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        peak = {"threads": 0, "workers": 0, "queued": 0}
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_threads(client, url, peak, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    return {
+        "clients": clients, "requests": len(latencies), "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50), "p99": percentile(latencies, 0.99),
+        "threads": peak["threads"], "workers": peak["workers"], "queued": peak["queued"],
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    url = args.url.rstrip("/")
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        await client.get(f"{url}{args.path}")  # warm caches and the pool
+    print(f"{'clients':>8} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'threads':>8} {'workers':>8} {'queued':>7}")
+    for clients in args.clients:
+        r = await run_level(url, args.path, clients, args.requests)
+        print(
+            f"{r['clients']:>8} {r['requests']:>6} {r['errors']:>4} {r['rps']:>8.0f} {r['p50']:>8.1f} {r['p99']:>8.1f}"
+            f" {r['threads']:>8} {r['workers']:>8} {r['queued']:>7}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/homepage/v1")
+    parser.add_argument("--clients", type=lambda s: [int(x) for x in s.split(",")], default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+# Compares homepage serialization paths on a representative payload.
+#   cd backend && PYTHONPATH=. python scripts/bench_serialize.py [iterations]
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.homepage import (
+    HomepagePayload, Meta, SignalItem, Signals, TopCard, WhatChangedItem, encode_payload, payload_to_dict
+)
+
+def sample_payload() -> HomepagePayload:
+    ts = "2025-01-02T18:00:00Z"
+    cache = {"hit": True, "stale": False, "from_fallback": False, "last_success_at": ts}
+    vol = {"windows": {"20": 18.2, "60": 17.9, "120": 19.4, "252": 21.0}, "ewma": 17.5, "as_of": "2025-01-02", "unit": "% a.a."}
+    cards = [TopCard(key=f"card{i}", label=f"Card {i}", value=100.0 + i, unit="%", change_1d=0.12, change_1d_unit="p.p.", last_update=ts) for i in range(4)]
+    changed = [
+        WhatChangedItem(key=f"chg{i}", label=f"Change {i}", value=-0.5 + i, unit="%", last_update=ts, period_label="1d", extra={"delta": 1.25, "unit": "%"})
+        for i in range(6)
+    ]
+    sig = lambda k, **kw: SignalItem(key=k, label=k, value=12.34, unit="%", last_update=ts, **kw)
+    return HomepagePayload(
+        top_cards=cards,
+        what_changed_today=changed,
+        signals=Signals(
+            real_rate_approx=sig("real_rate_approx", components={"selic": 12.25, "ipca_12m_approx": 4.8}),
+            inflation_expectations_12m=sig("inflation_expectations_12m", source="BCB Olinda", method="median", cache=cache),
+            ibov_vol_20d_annualized=sig("ibov_vol_20d_annualized", cache=cache, extra=vol),
+            usdbrl_vol_20d_annualized=sig("usdbrl_vol_20d_annualized", cache=cache, extra=vol),
+            unemployment_latest=sig("unemployment_latest"),
+            gdp_latest=sig("gdp_latest"),
+        ),
+        meta=Meta(generated_at=ts, stale=False, sources={
+            "sgs": {k: cache for k in ("selic", "ipca", "usdbrl", "unemployment", "gdp")},
+            "brapi": {k: cache for k in ("ibov_quote", "ibov_history", "usd_history")},
+            "expectations": cache,
+        }),
+    )
+
+def main(argv) -> None:
+    n = int(argv[0]) if argv else 20000
+    payload = sample_payload()
+    as_dict = payload_to_dict(payload)
+
+    cases = {
+        # what FastAPI does for a returned dict: jsonable_encoder walk + json.dumps
+        "fastapi_default": lambda: json.dumps(jsonable_encoder(as_dict), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8"),
+        # previous route: hand-built dict straight into json.dumps
+        "json_dumps_dict": lambda: json.dumps(as_dict, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8"),
+        "msgspec_struct": lambda: encode_payload(payload),
+    }
+    assert json.loads(cases["json_dumps_dict"]()) == json.loads(cases["msgspec_struct"]())
+
+    size = len(encode_payload(payload))
+    print(f"payload {size} bytes, {n} iterations")
+    base = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=n, repeat=3)) / n * 1e6
+        base = base or best
+        print(f"{name:18s} {best:8.2f} us/op  {base / best:5.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,120 @@
+# Regenerates the homepage JSON schema shared with the frontend, and the Zod
+# schemas the client validates responses with (derived from that JSON schema,
+# so the two can't drift apart).
+#   cd backend && PYTHONPATH=. python scripts/gen_homepage_schema.py [--check]
+# --check exits 1 when either committed file is out of date (for CI).
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+from app.models.homepage import homepage_schema
+
+SHARED_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "shared")
+SCHEMA_PATH = os.path.join(SHARED_DIR, "homepage.schema.json")
+ZOD_PATH = os.path.join(SHARED_DIR, "homepage.zod.ts")
+
+def render() -> str:
+    return json.dumps(homepage_schema(), indent=2, sort_keys=True, ensure_ascii=False) + "\n"
+
+def _ref_name(ref: str) -> str:
+    return ref.rsplit("/", 1)[-1]
+
+def _zod(node: Dict[str, Any], indent: str) -> str:
+    # Covers the subset msgspec emits for the homepage Structs.
+    if "$ref" in node:
+        return _ref_name(node["$ref"]) + "Schema"
+    if "anyOf" in node:
+        variants = [v for v in node["anyOf"] if v.get("type") != "null"]
+        inner = _zod(variants[0], indent) if len(variants) == 1 else \
+            "z.union([" + ", ".join(_zod(v, indent) for v in variants) + "])"
+        return inner + ".nullable()" if len(variants) < len(node["anyOf"]) else inner
+    t = node.get("type")
+    if t == "string":
+        return "z.string()"
+    if t in ("number", "integer"):
+        return "z.number()"
+    if t == "boolean":
+        return "z.boolean()"
+    if t == "array":
+        return f"z.array({_zod(node.get('items', {}), indent)})"
+    if t == "object" and "properties" in node:
+        return _zod_object(node, indent)
+    if t == "object":
+        return f"z.record(z.string(), {_zod(node.get('additionalProperties', {}), indent)})"
+    return "z.any()"
+
+def _zod_object(node: Dict[str, Any], indent: str) -> str:
+    required = set(node.get("required", ()))
+    lines = ["z.object({"]
+    for name, prop in node["properties"].items():
+        expr = _zod(prop, indent + "  ")
+        if name not in required:
+            expr += ".optional()"
+        lines.append(f"{indent}  {name}: {expr},")
+    lines.append(indent + "})")
+    return "\n".join(lines)
+
+def _def_order(schema: Dict[str, Any]) -> List[str]:
+    # Definitions before their users, starting from the root.
+    defs = schema["$defs"]
+    order: List[str] = []
+
+    def refs(node: Any) -> List[str]:
+        if isinstance(node, dict):
+            found = [_ref_name(node["$ref"])] if "$ref" in node else []
+            for v in node.values():
+                found.extend(refs(v))
+            return found
+        if isinstance(node, list):
+            return [r for v in node for r in refs(v)]
+        return []
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        for dep in refs(defs[name]):
+            visit(dep)
+        order.append(name)
+
+    visit(_ref_name(schema["$ref"]))
+    return order
+
+def render_zod() -> str:
+    schema = json.loads(render())
+    lines = [
+        "// Generated from homepage.schema.json by backend/scripts/gen_homepage_schema.py; do not edit.",
+        'import { z } from "zod";',
+        "",
+    ]
+    for name in _def_order(schema):
+        lines.append(f"export const {name}Schema = {_zod_object(schema['$defs'][name], '')};")
+        lines.append("")
+    return "\n".join(lines)
+
+def _stale(path: str, text: str) -> bool:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read() != text
+    except FileNotFoundError:
+        return True
+
+def main(argv) -> int:
+    outputs = [(SCHEMA_PATH, render()), (ZOD_PATH, render_zod())]
+    if "--check" in argv:
+        status = 0
+        for path, text in outputs:
+            if _stale(path, text):
+                print(f"{os.path.normpath(path)} is out of date; rerun scripts/gen_homepage_schema.py")
+                status = 1
+        return status
+    for path, text in outputs:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"wrote {os.path.normpath(path)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,22 @@
+# Issues a bearer token for the watchlist routes (signed with AUTH_SECRET).
+#   cd backend && AUTH_SECRET=... PYTHONPATH=. python scripts/issue_user_token.py <user_id> [ttl_seconds]
+from __future__ import annotations
+
+import sys
+
+from app.core.auth import auth_enabled, issue_token
+from app.core.config import AUTH_TOKEN_TTL
+
+def main(argv) -> int:
+    if not argv:
+        print("usage: issue_user_token.py <user_id> [ttl_seconds]")
+        return 2
+    if not auth_enabled():
+        print("AUTH_SECRET is not set")
+        return 1
+    ttl = int(argv[1]) if len(argv) > 1 else AUTH_TOKEN_TTL
+    print(issue_token(argv[0], ttl))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,51 @@
+# Writes .br and .gz siblings for the built frontend so the app can serve
+# them without compressing per request (picked up by app.core.static at startup).
+#   cd backend && PYTHONPATH=. python scripts/precompress.py [dist_dir]
+from __future__ import annotations
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # gzip-only when the wheel isn't installed
+    brotli = None
+
+from app.core.config import FRONTEND_DIST_DIR
+
+COMPRESSIBLE = (".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml", ".map", ".webmanifest", ".ico", ".wasm")
+MIN_SIZE = 1024
+
+def _write(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def precompress(root: str) -> int:
+    count = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                raw = f.read()
+            if len(raw) < MIN_SIZE:
+                continue
+            # mtime=0 keeps the .gz bytes reproducible across builds
+            gz = gzip.compress(raw, compresslevel=9, mtime=0)
+            if len(gz) < len(raw):
+                _write(path + ".gz", gz)
+            if brotli is not None:
+                br = brotli.compress(raw, quality=11)
+                if len(br) < len(raw):
+                    _write(path + ".br", br)
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else FRONTEND_DIST_DIR
+    n = precompress(root)
+    print(f"precompressed {n} files under {root}" + ("" if brotli else " (gzip only; brotli not installed)"))
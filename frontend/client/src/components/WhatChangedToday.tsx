@@ -8,6 +8,8 @@ interface WhatChangedItem {
   value: number | null;
   unit: string;
   period_label: string;
+  zscore?: number | null;
+  percentile?: number | null;
 }
 
 interface WhatChangedTodayProps {
@@ -36,6 +38,8 @@ export function WhatChangedToday({ items }: WhatChangedTodayProps) {
                 </span>
                 <span className="text-xs text-muted-foreground/70 uppercase tracking-wider">
                   {item.period_label}
+                  {item.percentile != null && ` · p${Math.round(item.percentile)}`}
+                  {item.zscore != null && Math.abs(item.zscore) >= 2 && ` · ${item.zscore > 0 ? "+" : ""}${item.zscore.toFixed(1)}σ`}
                 </span>
               </div>
               <div className="flex items-center space-x-2">
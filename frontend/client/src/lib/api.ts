@@ -1,66 +1,35 @@
 import { z } from "zod";
+// Generated from shared/homepage.schema.json (itself generated from
+// backend/app/models/homepage.py) by backend/scripts/gen_homepage_schema.py.
+import { HomepagePayloadSchema } from "@shared/homepage.zod";
 
-// Define Zod schemas for type safety based on the API contract
+export const HomepageResponseSchema = HomepagePayloadSchema;
 
-const TopCardSchema = z.object({
-  key: z.string(),
-  label: z.string(),
-  value: z.number().nullable(),
-  unit: z.string(),
-  change_1d: z.number().nullable(),
-  change_1d_unit: z.string(),
-  last_update: z.string(),
-});
-
-const WhatChangedItemSchema = z.object({
-  key: z.string(),
-  label: z.string(),
-  value: z.number().nullable(),
-  unit: z.string(),
-  extra: z.record(z.string(), z.any()).optional(),
-  last_update: z.string(),
-  period_label: z.string(),
-});
-
-const SignalItemSchema = z.object({
-  key: z.string(),
-  label: z.string(),
-  value: z.number().nullable(),
-  unit: z.string(),
-  last_update: z.string(),
-  source: z.string().optional(),
-  method: z.string().optional(),
-  components: z.record(z.string(), z.any()).optional(),
-  cache: z.record(z.string(), z.any()).optional(),
-  extra: z.record(z.string(), z.any()).optional(),
-});
-
-const SignalsSchema = z.object({
-  real_rate_approx: SignalItemSchema,
-  inflation_expectations_12m: SignalItemSchema,
-  ibov_vol_20d_annualized: SignalItemSchema,
-  usdbrl_vol_20d_annualized: SignalItemSchema,
-  unemployment_latest: SignalItemSchema,
-  gdp_latest: SignalItemSchema,
-});
-
-const MetaSchema = z.object({
-  generated_at: z.string(),
-  stale: z.boolean(),
-  sources: z.record(z.string(), z.any()),
-});
+export type HomepageData = z.infer<typeof HomepageResponseSchema>;
 
-export const HomepageResponseSchema = z.object({
-  top_cards: z.array(TopCardSchema),
-  what_changed_today: z.array(WhatChangedItemSchema),
-  signals: SignalsSchema,
-  meta: MetaSchema,
-});
+// The backend inlines the current snapshot into index.html. It is only used
+// for the first render after page load; later mounts fetch fresh data.
+const BOOTSTRAP_ELEMENT_ID = "homepage-bootstrap";
+const BOOTSTRAP_MAX_AGE_MS = 60_000;
 
-export type HomepageData = z.infer<typeof HomepageResponseSchema>;
+export function readBootstrapData(): HomepageData | null {
+  if (typeof document === "undefined" || performance.now() > BOOTSTRAP_MAX_AGE_MS) {
+    return null;
+  }
+  const el = document.getElementById(BOOTSTRAP_ELEMENT_ID);
+  if (!el?.textContent) {
+    return null;
+  }
+  try {
+    const parsed = HomepageResponseSchema.safeParse(JSON.parse(el.textContent));
+    return parsed.success ? parsed.data : null;
+  } catch {
+    return null;
+  }
+}
 
 export async function fetchHomepageData(): Promise<HomepageData> {
-  // Use relative path. The Node.js server (in prod) or Vite (in dev) will proxy this to the backend.
+  // Use relative path. FastAPI serves the app in prod; Vite proxies /api in dev.
   const response = await fetch("/api/homepage/v1");
   if (!response.ok) {
     throw new Error(`Failed to fetch homepage data: ${response.statusText}`);
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { fetchHomepageData, HomepageData } from "@/lib/api";
+import { fetchHomepageData, HomepageData, readBootstrapData } from "@/lib/api";
 import { TopCard } from "@/components/TopCard";
 import { WhatChangedToday } from "@/components/WhatChangedToday";
 import { Signals } from "@/components/Signals";
@@ -8,25 +8,34 @@ import { Button } from "@/components/ui/button";
 import { Alert, AlertDescription, AlertTitle } from "@/components/ui/alert";
 
 export default function Home() {
-  const [data, setData] = useState<HomepageData | null>(null);
-  const [loading, setLoading] = useState(true);
+  // Inlined snapshot (if any) renders immediately, without a first fetch
+  const [data, setData] = useState<HomepageData | null>(readBootstrapData);
+  const [loading, setLoading] = useState(data === null);
   const [error, setError] = useState<string | null>(null);
 
-  const loadData = async () => {
-    setLoading(true);
-    setError(null);
+  // In the background the current data stays on screen, even if the fetch fails
+  const loadData = async (background = false) => {
+    if (!background) {
+      setLoading(true);
+      setError(null);
+    }
     try {
       const result = await fetchHomepageData();
       setData(result);
     } catch (err) {
-      setError(err instanceof Error ? err.message : "Failed to load data");
+      if (!background) {
+        setError(err instanceof Error ? err.message : "Failed to load data");
+      }
     } finally {
-      setLoading(false);
+      if (!background) {
+        setLoading(false);
+      }
     }
   };
 
   useEffect(() => {
-    loadData();
+    // The inlined snapshot may be older than the API's data: always revalidate
+    loadData(data !== null);
   }, []);
 
   if (loading && !data) {
@@ -49,7 +58,7 @@ export default function Home() {
           <AlertDescription className="mt-2">
             {error}
             <div className="mt-4">
-              <Button onClick={loadData} variant="outline" className="w-full border-destructive/30 hover:bg-destructive/20">
+              <Button onClick={() => loadData()} variant="outline" className="w-full border-destructive/30 hover:bg-destructive/20">
                 Tentar Novamente
               </Button>
             </div>
@@ -103,7 +112,7 @@ export default function Home() {
             <Button 
               variant="ghost" 
               size="sm" 
-              onClick={loadData} 
+              onClick={() => loadData()} 
               disabled={loading}
               className="text-xs font-mono hover:bg-secondary"
             >
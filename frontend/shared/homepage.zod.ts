@@ -0,0 +1,61 @@
+// Generated from homepage.schema.json by backend/scripts/gen_homepage_schema.py; do not edit.
+import { z } from "zod";
+
+export const MetaSchema = z.object({
+  generated_at: z.string(),
+  history: z.record(z.string(), z.string()).nullable().optional(),
+  sources: z.record(z.string(), z.any()),
+  stale: z.boolean(),
+  timings: z.any().optional(),
+});
+
+export const SignalItemSchema = z.object({
+  cache: z.record(z.string(), z.any()).nullable().optional(),
+  components: z.record(z.string(), z.number().nullable()).nullable().optional(),
+  extra: z.record(z.string(), z.any()).nullable().optional(),
+  key: z.string(),
+  label: z.string(),
+  last_update: z.string(),
+  method: z.string().nullable().optional(),
+  source: z.string().nullable().optional(),
+  unit: z.string(),
+  value: z.number().nullable(),
+});
+
+export const SignalsSchema = z.object({
+  gdp_latest: SignalItemSchema,
+  ibov_vol_20d_annualized: SignalItemSchema,
+  inflation_expectations_12m: SignalItemSchema,
+  real_rate_approx: SignalItemSchema,
+  unemployment_latest: SignalItemSchema,
+  usdbrl_vol_20d_annualized: SignalItemSchema,
+});
+
+export const TopCardSchema = z.object({
+  change_1d: z.number().nullable(),
+  change_1d_unit: z.string(),
+  key: z.string(),
+  label: z.string(),
+  last_update: z.string(),
+  unit: z.string(),
+  value: z.number().nullable(),
+});
+
+export const WhatChangedItemSchema = z.object({
+  extra: z.record(z.string(), z.any()).nullable().optional(),
+  key: z.string(),
+  label: z.string(),
+  last_update: z.string().nullable(),
+  percentile: z.number().nullable().optional(),
+  period_label: z.string(),
+  unit: z.string(),
+  value: z.number().nullable(),
+  zscore: z.number().nullable().optional(),
+});
+
+export const HomepagePayloadSchema = z.object({
+  meta: MetaSchema,
+  signals: SignalsSchema,
+  top_cards: z.array(TopCardSchema),
+  what_changed_today: z.array(WhatChangedItemSchema),
+});